@@ -1,6 +1,14 @@
-from fastapi import FastAPI
+import os
+import time
+import uvicorn
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routes import cleaning
+from services.compute import compute, ComputeQueueFull
+from services.result_cache import result_cache
+from services.browse import preview_indexes
+from services.metrics import REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE, render_metrics
 
 app = FastAPI(title="SmartClean Studio API", version="1.0.0")
 
@@ -13,6 +21,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Labelled by route template, so session and job ids do not create new series
+        route = request.scope.get('route')
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.method,
+                                getattr(route, 'path', 'unmatched'), str(status))
+
+
 # Include routers
 app.include_router(cleaning.router, prefix="/api", tags=["cleaning"])
 
@@ -28,11 +51,51 @@ async def root():
             "clean": "POST /api/clean",
             "report": "GET /api/report/{session_id}",
             "preview": "GET /api/preview/{session_id}",
-            "download": "POST /api/download/{session_id}/{format}"
+            "download": "POST /api/download/{session_id}/{format}",
+            "job": "GET /api/jobs/{job_id}",
+            "job_events": "GET /api/jobs/{job_id}/events",
+            "cancel_job": "DELETE /api/jobs/{job_id}",
+            "session_memory": "GET /api/sessions/{session_id}/memory",
+            "profile": "GET /api/profile/{session_id}",
+            "metrics": "GET /metrics"
         }
     }
 
 
+@app.exception_handler(ComputeQueueFull)
+async def compute_queue_full(request: Request, exc: ComputeQueueFull):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.on_event("shutdown")
+async def flush_sessions():
+    # Persist in-memory sessions so they survive a restart
+    cleaning.sessions.flush()
+
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "compute": compute.stats(), "result_cache": result_cache.stats(),
+            "preview_indexes": preview_indexes.stats()}
+
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage and request latency histograms, plus component stats, in the Prometheus text format"""
+    return PlainTextResponse(render_metrics({
+        'compute': compute.stats(),
+        'result_cache': result_cache.stats(),
+        'preview_indexes': preview_indexes.stats(),
+    }), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    # Sessions live on disk in shared mode, so any worker can serve any request.
+    # WEB_CONCURRENCY > 1 switches the session store to shared mode automatically.
+    uvicorn.run(
+        "main:app",
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8000")),
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from enum import Enum
 
 
@@ -9,6 +9,7 @@ class IssueType(str, Enum):
     INCONSISTENCY = "inconsistency"
     DUPLICATES = "duplicates"
     RARE_CATEGORIES = "rare_categories"
+    NEAR_DUPLICATES = "near_duplicates"
 
 
 class Issue(BaseModel):
@@ -39,10 +40,15 @@ class DatasetInfo(BaseModel):
     quality_score: QualityScore
 
 
+class ColumnarData(BaseModel):
+    columns: List[str]
+    data: List[List[Any]]  # one list of values per column
+
+
 class AnalysisResult(BaseModel):
     dataset_info: DatasetInfo
     issues: List[Issue]
-    preview_data: List[Dict[str, Any]]
+    preview_data: Union[List[Dict[str, Any]], ColumnarData]
     session_id: str
 
 
@@ -63,7 +69,7 @@ class CleaningConfig(BaseModel):
 
 class CleaningResult(BaseModel):
     session_id: str
-    cleaned_data: List[Dict[str, Any]]
+    cleaned_data: Union[List[Dict[str, Any]], ColumnarData]
     quality_before: QualityScore
     quality_after: QualityScore
     operations_applied: List[CleaningOperation]
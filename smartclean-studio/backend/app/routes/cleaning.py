@@ -1,78 +1,203 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import pandas as pd
-import io
+import asyncio
+import json
 import time
 import tempfile
 import os
 from uuid import uuid4
 from models.schemas import (
-    AnalysisResult, CleaningConfig, CleaningResult, CleaningOperation
+    AnalysisResult, CleaningConfig, CleaningResult, CleaningOperation, ColumnarData
+)
+from typing import List, Optional
+from services.analyzer import (
+    DataAnalyzer, quality_score_from_profiles, ANALYSIS_MODE, ANALYSIS_MODES, PREVIEW_ROWS
 )
-from services.analyzer import DataAnalyzer, convert_to_native_types
 from services.cleaner import DataCleaner
+from services.planner import compile_plan
+from services.result_cache import result_cache
 from services.rule_engine import RuleEngine
 from services.reporter import Reporter
+from services.ingest import spool_upload, read_dataset, SUPPORTED_EXTENSIONS
+from services.columnar import write_parquet, write_arrow
+from services.export import iter_csv, negotiate_encoding, encode_stream, write_excel
+from services.browse import (
+    BrowseError, BrowseQuery, browse, decode_cursor, encode_cursor, preview_indexes
+)
+from services.serialize import (
+    FastJSONResponse, frame_to_preview, frame_to_records, PREVIEW_ORIENTS
+)
+from services.profiler import update_profiles
+from services.sketches import DatasetSketch
+from services.duplicates import DuplicateTracker
+from services.session_store import SessionStore, estimate_frame_nbytes
+from services.compaction import compact_frame, COMPACT_SESSIONS
+from services.compute import compute, ComputeQueueFull
+from services.jobs import jobs, TERMINAL_STATUSES
+from services.metrics import stage, timed_iter, collect_breakdown
+from services.request_profiler import StackSampler, should_profile
 
 router = APIRouter()
 
-# Session storage (in-memory for now)
-sessions = {}
+# Session storage (memory-bounded, spills to disk)
+sessions = SessionStore()
 
+# Interval at which job event streams check for progress
+JOB_POLL_SECONDS = 0.25
+
+# Rows of cleaned data returned with a cleaning result
+RESULT_PREVIEW_ROWS = 100
+
+
+def _preview_payload(df: pd.DataFrame, orient: str):
+    """Preview rows as records, or as a `ColumnarData` that skips per-row dicts"""
+    preview = frame_to_preview(df, orient)
+    return ColumnarData.model_construct(**preview) if orient == 'columns' else preview
+
+
+def _check_orient(orient: str):
+    if orient not in PREVIEW_ORIENTS:
+        raise HTTPException(status_code=400, detail="orient must be 'records' or 'columns'")
 
-@router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...)):
-    """Upload and analyze dataset"""
-    try:
-        # Read file
-        contents = await file.read()
-        
-        # Determine file type
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents), dtype=str)  # Read all as strings first
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="File must be CSV or Excel")
 
-        # Convert all columns to native Python types immediately
-        for col in df.columns:
-            # Try to convert numeric columns
-            try:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except:
-                # Keep as string if conversion fails
-                df[col] = df[col].astype(str)
+def _column_list(columns: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated column list query parameter"""
+    return [col.strip() for col in columns.split(',') if col.strip()] if columns else None
+
+
+def _compact(df: pd.DataFrame):
+    """Store a session frame in compact dtypes, with its estimated memory before and after"""
+    before = estimate_frame_nbytes(df)
+    if COMPACT_SESSIONS:
+        with stage('compact'):
+            df = compact_frame(df)
+    return df, {'before_bytes': before, 'after_bytes': estimate_frame_nbytes(df)}
+
+
+def _profiled(request: str, fn, *args):
+    """Run `fn(*args)` under the stack sampler and keep the profile with the session it returns"""
+    with StackSampler(request) as profile:
+        result = fn(*args)
+    # Kept in the order they were recorded, latest last
+    profiles = sessions[result.session_id].setdefault('request_profiles', {})
+    profiles.pop(request, None)
+    profiles[request] = profile
+    sessions.save(result.session_id)
+    return result
+
+
+def _analyze_upload(spool_path: str, filename: str, size_bytes: int, mode: str,
+                    columns: Optional[List[str]] = None, fuzzy_columns: Optional[List[str]] = None, progress=None,
+                    orient: str = 'records', profile: bool = False) -> AnalysisResult:
+    """Parse and analyze a spooled upload, then create its session"""
+    if profile:
+        return _profiled('upload', _analyze_upload, spool_path, filename, size_bytes, mode, columns, fuzzy_columns,
+                         progress, orient)
+    report = progress or (lambda done, total, message: None)
+    sketch = DatasetSketch() if mode == 'approximate' else None
+    # Rows are fingerprinted while parsing, so duplicates are counted without rehashing the frame
+    duplicates = DuplicateTracker()
+
+    with collect_breakdown() as breakdown:
+        report(0, 3, 'Parsing file')
+        df, memory = _compact(read_dataset(spool_path, filename, sketch, columns, duplicates))
 
         # Calculate file size
-        size_kb = len(contents) / 1024
+        size_kb = size_bytes / 1024
 
         # Analyze dataset
-        analyzer = DataAnalyzer(df, file.filename, size_kb)
+        report(1, 3, 'Analyzing columns')
+        analyzer = DataAnalyzer(df, filename, size_kb, mode=mode, sketch=sketch, duplicates=duplicates,
+                                fuzzy_columns=fuzzy_columns)
         dataset_info, issues, preview = analyzer.analyze()
 
-        # Create session
-        session_id = str(uuid4())
-        sessions[session_id] = {
-            'df': df,
-            'filename': file.filename,
-            'dataset_info': dataset_info,
-            'issues': issues,
-            'preview': preview,
-            'quality_before': dataset_info.quality_score,
-            'cleaning_config': None
-        }
+    # Create session
+    report(2, 3, 'Creating session')
+    session_id = str(uuid4())
+    sessions[session_id] = {
+        'df': df,
+        'filename': filename,
+        'dataset_info': dataset_info,
+        'issues': issues,
+        'preview': preview,
+        'profiles': analyzer.get_profiles(),
+        'quality_before': dataset_info.quality_score,
+        'cleaning_config': None,
+        'memory': {'dataset': memory},
+        'timings': {'upload': breakdown.to_list()}
+    }
+
+    # Built from validated parts, so the preview cells are not validated again
+    return AnalysisResult.model_construct(
+        dataset_info=dataset_info,
+        issues=issues,
+        preview_data=preview if orient == 'records' else _preview_payload(df.head(PREVIEW_ROWS), orient),
+        session_id=session_id
+    )
 
-        return AnalysisResult(
-            dataset_info=dataset_info,
-            issues=issues,
-            preview_data=preview,
-            session_id=session_id
-        )
+
+def _analyze_upload_job(job, spool_path: str, filename: str, size_bytes: int, mode: str,
+                        columns: Optional[List[str]] = None, fuzzy_columns: Optional[List[str]] = None,
+                        orient: str = 'records', profile: bool = False) -> AnalysisResult:
+    """Background variant of `_analyze_upload` that owns (and removes) the spool file"""
+    try:
+        return _analyze_upload(spool_path, filename, size_bytes, mode, columns, fuzzy_columns, progress=job.report,
+                               orient=orient, profile=profile)
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
+
+@router.post("/upload")
+async def upload_dataset(file: UploadFile = File(...), analysis_mode: Optional[str] = None,
+                         background: bool = False, columns: Optional[str] = None,
+                         fuzzy_columns: Optional[str] = None, orient: str = 'records',
+                         x_smartclean_profile: Optional[str] = Header(None)):
+    """Upload and analyze dataset; with `background=true` analysis runs as a job.
+
+    `columns` is an optional comma-separated list of the columns to load,
+    and `fuzzy_columns` one of the text columns to search for near-duplicate values;
+    `orient=columns` returns the preview as one value list per column.
+    An `X-SmartClean-Profile: 1` header profiles the analysis (see `/profile`).
+    """
+    if not file.filename.endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="File must be CSV, Excel, Parquet or Arrow")
+    column_list = _column_list(columns)
+    fuzzy_column_list = _column_list(fuzzy_columns)
+
+    mode = analysis_mode or ANALYSIS_MODE
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="analysis_mode must be 'exact' or 'approximate'")
+    _check_orient(orient)
+    profile = should_profile(x_smartclean_profile)
+
+    spool_path = None
+    try:
+        # Spool the upload to disk in chunks, then parse it incrementally
+        spool_path, size_bytes = await spool_upload(file, suffix=os.path.splitext(file.filename)[1])
+
+        if background:
+            job = jobs.start('upload', _analyze_upload_job, spool_path, file.filename, size_bytes, mode,
+                             column_list, fuzzy_column_list, orient, profile)
+            spool_path = None
+            return JSONResponse(status_code=202, content=job.to_dict())
+
+        result = await compute.run(_analyze_upload, spool_path, file.filename, size_bytes, mode, column_list,
+                                   fuzzy_column_list, None, orient, profile)
+        return FastJSONResponse(result)
+
+    except (HTTPException, ComputeQueueFull):
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    finally:
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+
 
 @router.post("/configure")
 async def configure_cleaning(config: CleaningConfig):
@@ -87,7 +212,9 @@ async def configure_cleaning(config: CleaningConfig):
 
     # If auto_clean is True, generate automatic operations
     if config.auto_clean:
-        auto_operations = RuleEngine.generate_auto_cleaning_plan(df, session['issues'])
+        auto_operations = RuleEngine.generate_auto_cleaning_plan(
+            df, session['issues'], session.get('profiles')
+        )
         config.operations = [
             CleaningOperation(
                 column=op['column'],
@@ -104,36 +231,26 @@ async def configure_cleaning(config: CleaningConfig):
     for operation in config.operations:
         if not RuleEngine.validate_operation({
             'column': operation.column,
-            'operation': operation.operation_type
-        }, df):
+            'operation': operation.operation_type,
+            'parameters': operation.parameters
+        }, df, session.get('profiles')):
             return {
                 'status': 'error',
                 'message': f'Invalid operation on column {operation.column}'
             }
 
     session['cleaning_config'] = config
-    return {'status': 'configured', 'operations_count': len(config.operations)}
-
+    sessions.save(session_id, session)
+    return {
+        'status': 'configured',
+        'operations_count': len(config.operations),
+        'plan': compile_plan(_operation_dicts(config), ordered=True).explain()
+    }
 
-@router.post("/clean")
-async def apply_cleaning(session_id: str):
-    """Apply cleaning operations and return results"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    session = sessions[session_id]
-    df = session['df']
-    config = session.get('cleaning_config')
 
-    if not config:
-        raise HTTPException(status_code=400, detail="No cleaning config found. Please configure first.")
-
-    start_time = time.time()
-
-    # Apply cleaning
-    cleaner = DataCleaner(df)
-    
-    operations_dicts = [
+def _operation_dicts(config: CleaningConfig) -> list:
+    """Configured operations in the form the cleaner and planner take"""
+    return [
         {
             'column': op.column,
             'operation': op.operation_type,
@@ -141,42 +258,63 @@ async def apply_cleaning(session_id: str):
         }
         for op in config.operations
     ]
-    
-    cleaned_df = cleaner.apply_operations(operations_dicts, auto_mode=config.auto_clean)
-    operations_applied = cleaner.get_operations_log()
 
-    processing_time_ms = (time.time() - start_time) * 1000
 
-    # Calculate quality after cleaning
-    analyzer_after = DataAnalyzer(cleaned_df, session['filename'], 0)
-    quality_after = analyzer_after._calculate_quality_score()
+def _clean_session(session_id: str, session: dict, progress=None, orient: str = 'records',
+                   profile: bool = False) -> CleaningResult:
+    """Run the configured cleaning operations for a session and store the results"""
+    if profile:
+        return _profiled('clean', _clean_session, session_id, session, progress, orient)
+    df = session['df']
+    config = session['cleaning_config']
+
+    with collect_breakdown() as breakdown:
+        start_time = time.time()
 
-    # Prepare cleaned data for JSON serialization
-    cleaned_data_preview = cleaned_df.head(100).copy()
-    cleaned_data_preview = convert_to_native_types(cleaned_data_preview)
-    
-    # Prepare report data
-    report_data_preview = cleaned_df.head(10).copy()
-    report_data_preview = convert_to_native_types(report_data_preview)
+        # Apply cleaning, resuming from cached results of an unchanged operation prefix
+        cleaner = DataCleaner(df, cache=result_cache, fingerprint=session.get('fingerprint'))
+
+        cleaned_df = cleaner.apply_operations(_operation_dicts(config), auto_mode=config.auto_clean, progress=progress)
+        operations_applied = cleaner.get_operations_log()
+        session['fingerprint'] = cleaner.fingerprint
+
+        processing_time_ms = (time.time() - start_time) * 1000
+
+        cleaned_df, session.setdefault('memory', {})['cleaned'] = _compact(cleaned_df)
+
+        # Calculate quality after cleaning, reprofiling only the columns cleaning rewrote
+        with stage('rescore'):
+            profiles_after, _ = update_profiles(cleaned_df, df, session.get('profiles'))
+            quality_after = quality_score_from_profiles(profiles_after, len(cleaned_df))
+
+        sample = frame_to_records(cleaned_df.head(10))
+
+    timings = dict(session.get('timings', {}), clean=breakdown.to_list())
+    session['timings'] = timings
 
     # Generate report
     report = Reporter.generate_report(
-        report_data_preview.to_dict(orient='records'),
+        sample,
         operations_applied,
         session['quality_before'],
         quality_after,
-        processing_time_ms
+        processing_time_ms,
+        timings
     )
 
     # Store result
     session['cleaned_df'] = cleaned_df
     session['quality_after'] = quality_after
+    session['profiles_after'] = profiles_after
     session['operations_applied'] = operations_applied
     session['report'] = report
+    # Other requests may have evicted the session while it was cleaning
+    sessions.save(session_id, session)
 
-    return CleaningResult(
+    # Built from validated parts, so the preview cells are not validated again
+    return CleaningResult.model_construct(
         session_id=session_id,
-        cleaned_data=cleaned_data_preview.to_dict(orient='records'),
+        cleaned_data=_preview_payload(cleaned_df.head(RESULT_PREVIEW_ROWS), orient),
         quality_before=session['quality_before'],
         quality_after=quality_after,
         operations_applied=operations_applied,
@@ -185,6 +323,114 @@ async def apply_cleaning(session_id: str):
     )
 
 
+def _clean_session_job(job, session_id: str, session: dict, orient: str = 'records',
+                       profile: bool = False) -> CleaningResult:
+    """Background variant of `_clean_session` reporting per-operation progress"""
+    return _clean_session(session_id, session, progress=job.report, orient=orient, profile=profile)
+
+
+@router.post("/clean")
+async def apply_cleaning(session_id: str, background: bool = False, orient: str = 'records',
+                         x_smartclean_profile: Optional[str] = Header(None)):
+    """Apply cleaning operations and return results; with `background=true` they run as a job.
+
+    An `X-SmartClean-Profile: 1` header profiles the cleaning (see `/profile`).
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    _check_orient(orient)
+
+    session = sessions[session_id]
+    if not session.get('cleaning_config'):
+        raise HTTPException(status_code=400, detail="No cleaning config found. Please configure first.")
+
+    profile = should_profile(x_smartclean_profile)
+    if background:
+        job = jobs.start('clean', _clean_session_job, session_id, session, orient, profile, session_id=session_id)
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    result = await compute.run(_clean_session, session_id, session, None, orient, profile)
+    return FastJSONResponse(result)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status, progress and (once finished) result of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as server-sent events until the job finishes"""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        version = None
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                return
+            if job['version'] != version:
+                version = job['version']
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            if job['status'] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a background job; it stops before its next operation"""
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.get(job_id)
+
+
+@router.get("/sessions/{session_id}/memory")
+async def get_session_memory(session_id: str):
+    """Estimated memory of a session's frames before and after compaction, with their dtypes"""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session = sessions[session_id]
+    frames = {'dataset': session['df'], 'cleaned': session.get('cleaned_df')}
+    return {
+        name: dict(session.get('memory', {}).get(name, {}), dtypes={str(col): str(dtype) for col, dtype in df.dtypes.items()})
+        for name, df in frames.items() if df is not None
+    }
+
+
+@router.get("/profile/{session_id}")
+async def get_profile(session_id: str, request: Optional[str] = None):
+    """Sampled call stacks of a session's profiled upload or clean request, in collapsed format.
+
+    The text feeds flamegraph.pl, speedscope or inferno directly. Without
+    `request`, the most recently profiled request is returned.
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    profiles = sessions[session_id].get('request_profiles', {})
+    if request is None and profiles:
+        request = next(reversed(profiles))
+    profile = profiles.get(request)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile recorded for this session")
+
+    return PlainTextResponse(profile.collapsed(), headers={
+        'X-Profile-Request': profile.request,
+        'X-Profile-Duration-Ms': str(profile.duration_ms),
+        'X-Profile-Samples': str(profile.samples),
+        'X-Profile-Interval-Ms': str(profile.interval_ms),
+    })
+
+
 @router.get("/report/{session_id}")
 async def get_report(session_id: str):
     """Get detailed cleaning report"""
@@ -195,8 +441,16 @@ async def get_report(session_id: str):
 
 
 @router.get("/preview/{session_id}")
-async def get_data_preview(session_id: str, limit: int = 100):
-    """Get preview of cleaned data"""
+async def get_data_preview(session_id: str, limit: int = 100, offset: int = 0, cursor: Optional[str] = None,
+                           sort: Optional[str] = None, descending: bool = False,
+                           filter_column: Optional[str] = None, filter_op: str = 'eq',
+                           filter_value: Optional[str] = None, orient: str = 'records'):
+    """Get a page of cleaned data, optionally sorted and filtered on any column.
+
+    Follow `next_cursor` to read the next page of the same query; a cursor
+    overrides the sort, filter and offset parameters.
+    """
+    _check_orient(orient)
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -204,13 +458,54 @@ async def get_data_preview(session_id: str, limit: int = 100):
     if 'cleaned_df' not in session:
         raise HTTPException(status_code=400, detail="Data not cleaned yet")
 
-    data = session['cleaned_df'].head(limit).to_dict(orient='records')
-    return {'data': data, 'total_rows': len(session['cleaned_df'])}
+    df = session['cleaned_df']
+    try:
+        if cursor:
+            query, offset = decode_cursor(cursor)
+        else:
+            query = BrowseQuery(sort, descending, filter_column, filter_op, filter_value)
+        # Sort orders and indexes are built on first use (off the event loop) and cached
+        page, matched_rows = await compute.run(browse, preview_indexes, session_id, df, query, offset, limit)
+    except BrowseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_offset = offset + len(page)
+    return FastJSONResponse({
+        'data': frame_to_preview(page, orient),
+        'columns': [str(col) for col in df.columns],
+        'total_rows': len(df),
+        'matched_rows': matched_rows,
+        'offset': offset,
+        'limit': limit,
+        'next_cursor': encode_cursor(query, next_offset) if next_offset < matched_rows else None,
+    })
+
+
+def _write_file_export(df: pd.DataFrame, writer, suffix: str) -> str:
+    """Write the cleaned data to a temporary file with one of the export writers"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    temp_file.close()
+    try:
+        writer(df, temp_file.name)
+    except Exception:
+        os.remove(temp_file.name)
+        raise
+    return temp_file.name
+
+
+# File-based download formats: (writer, suffix, media type)
+FILE_EXPORTS = {
+    'excel': (write_excel, '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'xlsx': (write_excel, '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': (write_parquet, '.parquet', 'application/vnd.apache.parquet'),
+    'arrow': (write_arrow, '.arrow', 'application/vnd.apache.arrow.file'),
+    'feather': (write_arrow, '.feather', 'application/vnd.apache.arrow.file'),
+}
 
 
 @router.post("/download/{session_id}/{format}")
-async def download_data(session_id: str, format: str):
-    """Download cleaned data in CSV or Excel format"""
+async def download_data(session_id: str, format: str, request: Request):
+    """Download cleaned data in CSV, Excel, Parquet or Arrow format"""
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -219,59 +514,33 @@ async def download_data(session_id: str, format: str):
         raise HTTPException(status_code=400, detail="Data not cleaned yet")
 
     # Get the cleaned dataframe - DO NOT convert to native types for export
-    df = session['cleaned_df'].copy()
-    
-    # Only fill NaN with "N/A" string for display
-    df = df.fillna("N/A")
-    
+    df = session['cleaned_df']
+
     if format == 'csv':
-        # Generate CSV in memory
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
-        
-        # Create temporary file for streaming
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv', mode='w', encoding='utf-8')
-        temp_path = temp_file.name
-        temp_file.write(csv_content)
-        temp_file.close()
-        
-        try:
-            return FileResponse(
-                path=temp_path,
-                media_type="text/csv",
-                filename="cleaned_data.csv"
-            )
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise HTTPException(status_code=500, detail=f"CSV export failed: {str(e)}")
-    
-    elif format == 'excel' or format == 'xlsx':
+        # Encoded in row batches straight to the socket, compressed when the client accepts it
+        encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+        headers = {'Content-Disposition': 'attachment; filename="cleaned_data.csv"', 'Vary': 'Accept-Encoding'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return StreamingResponse(timed_iter('export.csv', encode_stream(iter_csv(df), encoding)),
+                                 media_type="text/csv", headers=headers)
+
+    elif format in FILE_EXPORTS:
+        writer, suffix, media_type = FILE_EXPORTS[format]
         try:
-            # Generate Excel in memory
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name='Cleaned Data', index=False)
-            
-            excel_buffer.seek(0)
-            excel_bytes = excel_buffer.getvalue()
-            
-            # Create temporary file for streaming
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx', mode='wb')
-            temp_path = temp_file.name
-            temp_file.write(excel_bytes)
-            temp_file.close()
-            
-            return FileResponse(
-                path=temp_path,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                filename="cleaned_data.xlsx"
-            )
+            temp_path = await compute.run(_write_file_export, df, writer, suffix)
+        except ComputeQueueFull:
+            raise
         except Exception as e:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise HTTPException(status_code=500, detail=f"Excel export failed: {str(e)}")
-    
+            raise HTTPException(status_code=500, detail=f"{format.capitalize()} export failed: {str(e)}")
+
+        # Streamed from disk in chunks; the temporary file is removed once the response has been sent
+        return FileResponse(
+            path=temp_path,
+            media_type=media_type,
+            filename=f"cleaned_data{suffix}",
+            background=BackgroundTask(os.remove, temp_path)
+        )
+
     else:
-        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv' or 'excel'")
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv', 'excel', 'parquet' or 'arrow'")
@@ -0,0 +1,5 @@
+import pandas as pd
+
+# Copy-on-write lets the services pass frames around and derive new ones
+# without defensive copies: a column is only duplicated when it is written.
+pd.set_option('mode.copy_on_write', True)
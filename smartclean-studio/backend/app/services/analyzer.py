@@ -1,47 +1,95 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from models.schemas import (
     Issue, IssueType, QualityScore, DatasetInfo
 )
+from services.profiler import ColumnProfile, profile_frame
+from services.sketches import DatasetSketch
+from services.duplicates import DuplicateTracker
+from services.fuzzy import FUZZY_THRESHOLD, find_near_duplicates
+from services.serialize import frame_to_records
+from services.metrics import stage
 
+# 'exact' profiles every value; 'approximate' uses mergeable sketches (see services.sketches)
+ANALYSIS_MODE = os.environ.get('SMARTCLEAN_ANALYSIS_MODE', 'exact')
+ANALYSIS_MODES = ('exact', 'approximate')
 
-def convert_to_native_types(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert dataframe to native Python types for JSON serialization"""
-    df = df.copy()
-    for col in df.columns:
-        dtype_str = str(df[col].dtype).lower()
-        
-        # Handle string/object types
-        if 'string' in dtype_str or df[col].dtype == 'object':
-            # Force to regular Python strings via astype to object first
-            df[col] = df[col].astype(object).apply(lambda x: str(x) if pd.notna(x) else None)
-        # Handle numeric types
-        elif pd.api.types.is_numeric_dtype(df[col]):
-            df[col] = df[col].apply(lambda x: float(x) if pd.notna(x) else None)
-        # Handle datetime types
-        elif pd.api.types.is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].astype(str).apply(lambda x: x if x != 'NaT' else None)
-    
-    # Replace remaining NaN/None with "N/A" for display
-    df = df.fillna("N/A")
-    return df
+# Rows included in the analysis preview
+PREVIEW_ROWS = 5
+
+# Text columns with more distinct values than this are not searched for near-duplicates during analysis
+NEAR_DUPLICATE_MAX_DISTINCT = int(os.environ.get('SMARTCLEAN_FUZZY_MAX_DISTINCT', 1_000_000))
+
+
+def quality_score_from_profiles(profiles: Dict[str, ColumnProfile], rows: int) -> QualityScore:
+    """Quality score as the sum of per-column contributions, so cached column profiles can be reused"""
+    columns = len(profiles)
+    if rows == 0 or columns == 0:
+        return QualityScore(completeness=0.0, uniqueness=100.0, consistency=100.0,
+                            accuracy=100.0, overall=75.0)
+
+    total_cells = rows * columns
+    # Percentage of non-null values
+    completeness = sum(p.non_null_count for p in profiles.values()) / total_cells * 100
+    # Percentage of unique values vs total
+    uniqueness = sum(p.distinct_count for p in profiles.values()) / total_cells * 100
+    # Every column holds a single type after ingestion
+    consistency = 100.0
+    # Numeric columns with under 5% outliers, plus every non-numeric column
+    accurate_cols = sum(
+        1 for p in profiles.values() if not p.is_numeric or p.outlier_count / rows * 100 < 5
+    )
+    accuracy = accurate_cols / columns * 100
+
+    overall = (completeness + uniqueness + consistency + accuracy) / 4
+
+    return QualityScore(
+        completeness=completeness,
+        uniqueness=uniqueness,
+        consistency=consistency,
+        accuracy=accuracy,
+        overall=overall
+    )
 
 
 class DataAnalyzer:
     """Analyzes datasets for data quality issues"""
 
-    def __init__(self, df: pd.DataFrame, filename: str, size_kb: float):
+    def __init__(self, df: pd.DataFrame, filename: str, size_kb: float,
+                 profiles: Optional[Dict[str, ColumnProfile]] = None, executor: Optional[str] = None,
+                 mode: Optional[str] = None, sketch: Optional[DatasetSketch] = None,
+                 duplicates: Optional[DuplicateTracker] = None, fuzzy_columns: Optional[List[str]] = None):
         self.df = df
         self.filename = filename
         self.size_kb = size_kb
-        self.original_df = df.copy()
+        self.executor = executor
+        self.mode = mode or ANALYSIS_MODE
+        self.sketch = sketch
+        self.duplicates = duplicates
+        self.fuzzy_columns = set(fuzzy_columns or ())
+        self._profiles = profiles
+
+    def get_profiles(self) -> Dict[str, ColumnProfile]:
+        """Column profiles shared by scoring and issue detection, computed once"""
+        if self._profiles is None:
+            if self.mode == 'approximate':
+                self._profiles = (self.sketch or DatasetSketch()).to_profiles(self.df)
+            else:
+                self._profiles = profile_frame(self.df, executor=self.executor)
+        return self._profiles
 
     def analyze(self) -> Tuple[DatasetInfo, List[Issue], List[Dict[str, Any]]]:
         """Run complete analysis on dataset"""
-        dataset_info = self._get_dataset_info()
-        issues = self._detect_issues()
-        preview = self._get_preview()
+        with stage('analyze.profiles'):
+            self.get_profiles()
+        with stage('analyze.dataset_info'):
+            dataset_info = self._get_dataset_info()
+        with stage('analyze.issues'):
+            issues = self._detect_issues()
+        with stage('analyze.preview'):
+            preview = self._get_preview()
 
         return dataset_info, issues, preview
 
@@ -50,8 +98,12 @@ class DataAnalyzer:
         dtypes = {}
         for col in self.df.columns:
             dtype_str = str(self.df[col].dtype).lower()
-            if 'object' in dtype_str or 'string' in dtype_str:
+            if 'object' in dtype_str or 'string' in dtype_str or 'category' in dtype_str:
                 dtypes[col] = 'categorical'
+            elif 'bool' in dtype_str:
+                dtypes[col] = 'boolean'
+            elif 'datetime' in dtype_str:
+                dtypes[col] = 'datetime'
             elif any(x in dtype_str for x in ['int', 'float', 'decimal']):
                 dtypes[col] = 'numeric'
             else:
@@ -69,87 +121,68 @@ class DataAnalyzer:
             quality_score=quality_score
         )
 
+    @stage('analyze.quality_score')
     def _calculate_quality_score(self) -> QualityScore:
         """Calculate data quality metrics"""
-        completeness = self._calculate_completeness()
-        uniqueness = self._calculate_uniqueness()
-        consistency = self._calculate_consistency()
-        accuracy = self._calculate_accuracy()
-
-        overall = (completeness + uniqueness + consistency + accuracy) / 4
-
-        return QualityScore(
-            completeness=completeness,
-            uniqueness=uniqueness,
-            consistency=consistency,
-            accuracy=accuracy,
-            overall=overall
-        )
-
-    def _calculate_completeness(self) -> float:
-        """Percentage of non-null values"""
-        if len(self.df) == 0:
-            return 0.0
-        non_null = self.df.count().sum()
-        total = len(self.df) * len(self.df.columns)
-        return (non_null / total) * 100 if total > 0 else 0.0
-
-    def _calculate_uniqueness(self) -> float:
-        """Percentage of unique values vs total"""
-        if len(self.df) == 0:
-            return 100.0
-        unique_count = 0
-        for col in self.df.columns:
-            unique_count += self.df[col].nunique()
-        total_cells = len(self.df) * len(self.df.columns)
-        return (unique_count / total_cells) * 100
-
-    def _calculate_consistency(self) -> float:
-        """Check for consistent data types within columns"""
-        if len(self.df) == 0:
-            return 100.0
+        return quality_score_from_profiles(self.get_profiles(), len(self.df))
 
-        consistent_cols = 0
-        for col in self.df.columns:
-            if self.df[col].dtype != 'object':
-                # Numeric column - check for NaN consistency
-                consistent_cols += 1
-            else:
-                # String column - just mark as consistent
-                consistent_cols += 1
-
-        return (consistent_cols / len(self.df.columns)) * 100
-
-    def _calculate_accuracy(self) -> float:
-        """Check for outliers and anomalies"""
-        if len(self.df) == 0:
-            return 100.0
-
-        accurate_cols = 0
-        for col in self.df.columns:
-            if np.issubdtype(self.df[col].dtype, np.number):
-                # Check for extreme outliers
-                Q1 = self.df[col].quantile(0.25)
-                Q3 = self.df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - 1.5 * IQR
-                upper = Q3 + 1.5 * IQR
-                outliers = ((self.df[col] < lower) | (self.df[col] > upper)).sum()
-                outlier_pct = (outliers / len(self.df)) * 100
-                if outlier_pct < 5:  # Less than 5% outliers is good
-                    accurate_cols += 1
-            else:
-                accurate_cols += 1
+    @stage('analyze.duplicates')
+    def count_duplicates(self) -> int:
+        """Rows that exactly repeat an earlier row, from the upload's fingerprints when complete"""
+        tracker = self.duplicates
+        if tracker is None or not tracker.complete or tracker.rows != len(self.df):
+            tracker = DuplicateTracker()
+            tracker.update(self.df)
+        return tracker.count()
 
-        return (accurate_cols / len(self.df.columns)) * 100
+    @stage('analyze.near_duplicates')
+    def _near_duplicate_issue(self, col: str) -> Optional[Issue]:
+        """Issue for values of `col` that are near-duplicates of a more frequent value, if any"""
+        frame = self.df[[col]]
+        matches = find_near_duplicates(frame)
+        changed = int(matches.changed.sum())
+        if changed == 0:
+            return None
+        changed_pct = (changed / len(self.df)) * 100
+        severity = "high" if changed_pct > 10 else "medium" if changed_pct > 1 else "low"
+        example = ' ~ '.join(repr(value) for value in matches.variants(frame, limit=1)[0][:3])
+        return Issue(
+            column=col,
+            issue_type=IssueType.NEAR_DUPLICATES,
+            affected_count=changed,
+            affected_percentage=changed_pct,
+            severity=severity,
+            suggested_fix=f"Column '{col}' has {matches.clusters} groups of near-duplicate values, e.g. {example}",
+            recommended_operation={
+                "operation": "merge_near_duplicates",
+                "threshold": FUZZY_THRESHOLD
+            }
+        )
 
     def _detect_issues(self) -> List[Issue]:
         """Detect all data quality issues"""
         issues = []
 
-        for col in self.df.columns:
+        duplicate_count = self.count_duplicates()
+        if duplicate_count > 0:
+            duplicate_pct = (duplicate_count / len(self.df)) * 100
+            severity = "high" if duplicate_pct > 10 else "medium" if duplicate_pct > 1 else "low"
+            issues.append(Issue(
+                column='all',
+                issue_type=IssueType.DUPLICATES,
+                affected_count=duplicate_count,
+                affected_percentage=duplicate_pct,
+                severity=severity,
+                suggested_fix=f"{duplicate_pct:.1f}% of rows are exact duplicates of an earlier row",
+                recommended_operation={
+                    "operation": "remove_duplicates",
+                    "keep": "first"
+                }
+            ))
+
+        for col, profile in self.get_profiles().items():
             # Missing values
-            missing_count = self.df[col].isnull().sum()
+            missing_count = profile.null_count
             if missing_count > 0:
                 missing_pct = (missing_count / len(self.df)) * 100
                 severity = "high" if missing_pct > 30 else "medium" if missing_pct > 10 else "low"
@@ -162,18 +195,15 @@ class DataAnalyzer:
                     suggested_fix=f"Column '{col}' has {missing_pct:.1f}% missing values",
                     recommended_operation={
                         "operation": "impute_missing",
-                        "strategy": "mean" if np.issubdtype(self.df[col].dtype, np.number) else "mode"
+                        "strategy": "mean" if profile.is_numeric else "mode"
                     }
                 ))
 
             # Outliers for numeric columns
-            if np.issubdtype(self.df[col].dtype, np.number):
-                Q1 = self.df[col].quantile(0.25)
-                Q3 = self.df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - 1.5 * IQR
-                upper = Q3 + 1.5 * IQR
-                outliers = ((self.df[col] < lower) | (self.df[col] > upper)).sum()
+            if profile.is_numeric:
+                lower = profile.lower_bound
+                upper = profile.upper_bound
+                outliers = profile.outlier_count
 
                 if outliers > 0:
                     outlier_pct = (outliers / len(self.df)) * 100
@@ -193,14 +223,19 @@ class DataAnalyzer:
                         }
                     ))
 
+            # Near-duplicate values, searched only in the columns the user asked for
+            if (col in self.fuzzy_columns and profile.is_text
+                    and 1 < profile.distinct_count <= NEAR_DUPLICATE_MAX_DISTINCT):
+                near_duplicates = self._near_duplicate_issue(col)
+                if near_duplicates is not None:
+                    issues.append(near_duplicates)
+
             # Rare categories
-            if self.df[col].dtype == 'object':
-                value_counts = self.df[col].value_counts()
-                total_count = len(self.df)
-                rare_count = (value_counts / total_count < 0.01).sum()  # Less than 1%
-                
+            if profile.is_text:
+                rare_count = profile.rare_count  # Less than 1%
+
                 if rare_count > 0:
-                    rare_rows = (self.df[col].isin(value_counts[value_counts / total_count < 0.01].index)).sum()
+                    rare_rows = profile.rare_rows
                     rare_pct = (rare_rows / len(self.df)) * 100
                     if rare_pct > 0:
                         issues.append(Issue(
@@ -219,8 +254,6 @@ class DataAnalyzer:
 
         return issues
 
-    def _get_preview(self, n_rows: int = 5) -> List[Dict[str, Any]]:
+    def _get_preview(self, n_rows: int = PREVIEW_ROWS) -> List[Dict[str, Any]]:
         """Get preview of data"""
-        preview_df = self.df.head(n_rows).copy()
-        preview_df = convert_to_native_types(preview_df)
-        return preview_df.to_dict(orient='records')
+        return frame_to_records(self.df.head(n_rows))
@@ -0,0 +1,270 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Memory budget for cached column indexes and sorted/filtered row orders
+PREVIEW_INDEX_MB = float(os.environ.get('SMARTCLEAN_PREVIEW_INDEX_MB', 256))
+
+# Largest page the preview endpoint returns
+MAX_PAGE_ROWS = 1000
+
+# Filter operators; comparisons never match missing values
+FILTER_OPS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains', 'null', 'notnull')
+
+
+class BrowseError(ValueError):
+    """Invalid sort, filter or cursor parameters"""
+
+
+@dataclass(frozen=True)
+class BrowseQuery:
+    """Which rows of a frame to page through, and in what order"""
+    sort: Optional[str] = None
+    descending: bool = False
+    filter_column: Optional[str] = None
+    filter_op: str = 'eq'
+    filter_value: Optional[str] = None
+
+
+@dataclass
+class ColumnIndex:
+    """Row positions ordered by one column's values (stable, missing values last).
+
+    `keys` holds the sorted non-missing values for binary search; for text
+    columns they are ranks into the sorted distinct values in `labels`.
+    """
+    order: np.ndarray
+    keys: np.ndarray
+    labels: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.order.nbytes + self.keys.nbytes + (self.labels.nbytes if self.labels is not None else 0)
+
+    def bounds(self, value) -> Tuple[int, int]:
+        """Range of `order` holding the rows equal to `value`"""
+        if self.labels is None:
+            return (int(np.searchsorted(self.keys, value, side='left')),
+                    int(np.searchsorted(self.keys, value, side='right')))
+        first = np.searchsorted(self.labels, value, side='left')
+        last = np.searchsorted(self.labels, value, side='right')
+        return (int(np.searchsorted(self.keys, first, side='left')),
+                int(np.searchsorted(self.keys, last, side='left')))
+
+
+def encode_cursor(query: BrowseQuery, offset: int) -> str:
+    """Opaque token for the page starting at `offset` of a query"""
+    state = dict(query.__dict__, offset=offset)
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[BrowseQuery, int]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset = int(state.pop('offset'))
+        return BrowseQuery(**state), offset
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        raise BrowseError("Invalid cursor")
+
+
+def _sort_keys(series: pd.Series) -> np.ndarray:
+    """Values of a column as a numpy array that sorts in the column's natural order"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return series.to_numpy(dtype=bool, na_value=False)
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return series.to_numpy()
+    if pd.api.types.is_integer_dtype(dtype) and not series.hasnans:
+        return series.to_numpy(dtype='int64')
+    if pd.api.types.is_numeric_dtype(dtype):
+        return series.to_numpy(dtype='float64', na_value=np.nan)
+    return series.to_numpy(dtype=object)
+
+
+def build_column_index(series: pd.Series) -> ColumnIndex:
+    """Sort a column once so it can serve sorting and range/equality filters by binary search"""
+    missing = series.isna().to_numpy()
+    valid = np.flatnonzero(~missing)
+    keys = _sort_keys(series)[valid]
+    labels = None
+    if keys.dtype == object:
+        # Sort the distinct values only, then order the rows by integer rank
+        codes, labels = pd.factorize(keys)
+        try:
+            label_order = np.argsort(labels, kind='stable')
+        except TypeError:
+            # Mixed-type text columns are ordered by their string form
+            labels = labels.astype(str).astype(object)
+            codes, labels = pd.factorize(labels[codes])
+            label_order = np.argsort(labels, kind='stable')
+        ranks = np.empty(len(labels), dtype=np.int32)
+        ranks[label_order] = np.arange(len(labels), dtype=np.int32)
+        keys = ranks[codes]
+        labels = labels[label_order]
+    order = np.argsort(keys, kind='stable')
+    position_dtype = np.int32 if len(series) < 2 ** 31 else np.int64
+    return ColumnIndex(
+        order=np.concatenate([valid[order], np.flatnonzero(missing)]).astype(position_dtype),
+        keys=keys[order],
+        labels=labels,
+    )
+
+
+def _coerce_value(value: Optional[str], keys: np.ndarray):
+    """Parse a filter value from the query string into the type of a column's sort keys"""
+    if value is None:
+        raise BrowseError("filter_value is required for this filter")
+    try:
+        if keys.dtype.kind == 'b':
+            if value.lower() not in ('true', 'false', '1', '0'):
+                raise ValueError(value)
+            return value.lower() in ('true', '1')
+        if keys.dtype.kind in 'iuf':
+            return float(value)
+        if keys.dtype.kind == 'M':
+            timestamp = pd.Timestamp(value)
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+            return timestamp.to_datetime64().astype(keys.dtype)
+    except ValueError:
+        raise BrowseError(f"Cannot compare '{value}' with this column")
+    return value
+
+
+def _filter_positions(df: pd.DataFrame, index: ColumnIndex, query: BrowseQuery) -> Tuple[np.ndarray, bool]:
+    """Rows matching the filter, and whether they come out in the column's sort order"""
+    op = query.filter_op
+    valid = len(index.keys)
+    if op == 'null':
+        return index.order[valid:], True
+    if op == 'notnull':
+        return index.order[:valid], True
+    if op == 'contains':
+        column = df[query.filter_column]
+        matches = column.astype(str).str.contains(query.filter_value or '', case=False, regex=False)
+        return np.flatnonzero(matches.to_numpy(dtype=bool) & column.notna().to_numpy()), False
+
+    value = _coerce_value(query.filter_value, index.keys if index.labels is None else index.labels)
+    lo, hi = index.bounds(value)
+    ranges = {
+        'eq': [(lo, hi)], 'ne': [(0, lo), (hi, valid)],
+        'lt': [(0, lo)], 'le': [(0, hi)], 'gt': [(hi, valid)], 'ge': [(lo, valid)],
+    }[op]
+    return np.concatenate([index.order[start:stop] for start, stop in ranges]), True
+
+
+def _reverse_present(index: ColumnIndex) -> np.ndarray:
+    """Descending order of a column, keeping missing values last"""
+    valid = len(index.keys)
+    return np.concatenate([index.order[:valid][::-1], index.order[valid:]])
+
+
+class PreviewIndexCache:
+    """Per-session column indexes and row orders, LRU-evicted under a byte budget.
+
+    Entries are tied to the frame they were built from by weak reference,
+    so re-cleaning a session (or reloading it from disk) starts afresh
+    and the cache never keeps a frame alive.
+    """
+
+    def __init__(self, memory_budget_bytes: int = int(PREVIEW_INDEX_MB * 1024 * 1024)):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries: 'OrderedDict[Tuple[str, Any], Tuple[Any, int]]' = OrderedDict()
+        self._frames: Dict[str, weakref.ref] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, df: pd.DataFrame, key: Any, build: Callable[[], Any]):
+        with self._lock:
+            # Release the indexes of frames that no longer exist
+            for stale in [sid for sid, ref in self._frames.items() if ref() is None]:
+                self._drop_session(stale)
+                del self._frames[stale]
+            frame = self._frames.get(session_id)
+            if frame is None or frame() is not df:
+                self._drop_session(session_id)
+                self._frames[session_id] = weakref.ref(df)
+            entry = self._entries.get((session_id, key))
+            if entry is not None:
+                self._entries.move_to_end((session_id, key))
+                return entry[0]
+
+        value = build()
+        nbytes = value.nbytes
+        with self._lock:
+            self._entries[(session_id, key)] = (value, nbytes)
+            while len(self._entries) > 1 and self._nbytes() > self.memory_budget_bytes:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._nbytes(),
+                'memory_budget_bytes': self.memory_budget_bytes,
+            }
+
+    def _nbytes(self) -> int:
+        return sum(nbytes for _, nbytes in self._entries.values())
+
+    def _drop_session(self, session_id: str):
+        for key in [key for key in self._entries if key[0] == session_id]:
+            del self._entries[key]
+
+
+def _view(cache: PreviewIndexCache, session_id: str, df: pd.DataFrame, query: BrowseQuery) -> Optional[np.ndarray]:
+    """Row positions of a query in display order; None means every row in its original order"""
+    def index(column):
+        return cache.get(session_id, df, ('index', column), lambda: build_column_index(df[column]))
+
+    if query.filter_column is None:
+        if query.sort is None:
+            return None
+        if not query.descending:
+            return index(query.sort).order
+        return cache.get(session_id, df, ('view', query), lambda: _reverse_present(index(query.sort)))
+
+    def build():
+        positions, index_ordered = _filter_positions(df, index(query.filter_column), query)
+        if query.sort is None:
+            return np.sort(positions) if index_ordered else positions
+        if query.sort == query.filter_column and index_ordered:
+            # Missing values (the 'null' filter) keep their original order either way
+            return positions[::-1].copy() if query.descending and query.filter_op != 'null' else positions
+        order = index(query.sort).order if not query.descending else _reverse_present(index(query.sort))
+        selected = np.zeros(len(df), dtype=bool)
+        selected[positions] = True
+        return order[selected[order]]
+
+    return cache.get(session_id, df, ('view', query), build)
+
+
+def browse(cache: PreviewIndexCache, session_id: str, df: pd.DataFrame, query: BrowseQuery,
+           offset: int, limit: int) -> Tuple[pd.DataFrame, int]:
+    """One page of a frame under a sort/filter query, as (rows, total matching rows)"""
+    for column in (query.sort, query.filter_column):
+        if column is not None and column not in df.columns:
+            raise BrowseError(f"Column '{column}' not found")
+    if query.filter_column is not None and query.filter_op not in FILTER_OPS:
+        raise BrowseError(f"filter_op must be one of {', '.join(FILTER_OPS)}")
+    if offset < 0 or not 0 < limit <= MAX_PAGE_ROWS:
+        raise BrowseError(f"offset must be >= 0 and limit between 1 and {MAX_PAGE_ROWS}")
+
+    positions = _view(cache, session_id, df, query)
+    if positions is None:
+        return df.iloc[offset:offset + limit], len(df)
+    return df.take(positions[offset:offset + limit]), len(positions)
+
+
+# Shared cache used by the preview route
+preview_indexes = PreviewIndexCache()
@@ -1,138 +1,297 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from models.schemas import CleaningOperation, QualityScore
+from services.type_inference import is_numeric_column, is_text_column
+from services.compaction import expand_column
+from services.duplicates import row_hashes, duplicated
+from services.fuzzy import FUZZY_THRESHOLD, find_near_duplicates
+from services.metrics import stage
+from services.planner import CleaningPlan, PlanStep, compile_plan
+from services.result_cache import ResultCache, Checkpoint, frame_fingerprint, prefix_keys
+
+# Statistics a plan step can request, computed on the rows still selected
+STATISTICS = {
+    'mean': lambda s: s.mean(),
+    'median': lambda s: s.median(),
+    'mode': lambda s: s.mode(),
+    'quartiles': lambda s: tuple(s.quantile([0.25, 0.75])),
+    'min': lambda s: s.min(),
+    'max': lambda s: s.max(),
+    'std': lambda s: s.std(),
+    'value_counts': lambda s: s.value_counts(),
+}
+
+
+def _map_distinct(series: pd.Series, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Apply a value-by-value `transform` to each distinct value once and map the results back.
+
+    The column is factorized into integer codes, so the transform works on
+    the few hundred distinct labels of a million-row column instead of on
+    every row. Missing values are left as they are.
+    """
+    codes, uniques = pd.factorize(series)
+    mapped = transform(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    values = mapped.take(np.maximum(codes, 0)) if len(mapped) else np.empty(len(codes), dtype=object)
+    missing = codes < 0
+    if missing.any():
+        values[missing] = series.to_numpy(dtype=object)[missing]
+    return pd.Series(values, index=series.index, name=series.name)
 
 
 class DataCleaner:
     """Applies cleaning operations to datasets"""
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
-        self.original_df = df.copy()
+    def __init__(self, df: pd.DataFrame, cache: Optional[ResultCache] = None,
+                 fingerprint: Optional[str] = None):
+        # Shallow under copy-on-write: operations replace whole columns,
+        # so the caller's frame is never modified and untouched columns are shared
+        self.df = df.copy(deep=False)
+        self.base_df = df
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.plan: Optional[CleaningPlan] = None
+        self.operations_reused = 0
         self.operations_log: List[CleaningOperation] = []
 
-    def apply_operations(self, operations: List[Dict[str, Any]], auto_mode: bool = True) -> pd.DataFrame:
-        """Apply a series of cleaning operations"""
-        for op in operations:
-            self._apply_operation(op, applied_by="auto" if auto_mode else "user")
+    def apply_operations(self, operations: List[Dict[str, Any]], auto_mode: bool = True,
+                         progress: Optional[Callable[[int, int, str], None]] = None) -> pd.DataFrame:
+        """Apply a series of cleaning operations, calling `progress(done, total, message)` after each.
+
+        The operations are compiled into a staged plan (see services.planner):
+        each stage computes its statistics in one batch, folds its filters
+        into a row mask and replaces the columns it transforms. Rows are
+        selected once at the end, so the result matches running the
+        operations one by one without rebuilding the frame per filter.
+
+        With a cache, the run resumes from the longest already-cleaned
+        prefix of `operations` and stores a checkpoint after every stage.
+        """
+        keys = []
+        if self.cache is not None:
+            self.fingerprint = self.fingerprint or frame_fingerprint(self.base_df)
+            keys = prefix_keys(self.fingerprint, operations)
+        start, checkpoint = self.cache.lookup(keys) if keys else (0, None)
+
+        keep: Optional[np.ndarray] = None
+        rows_affected = [0] * len(operations)
+        if checkpoint is not None:
+            self.df = checkpoint.df.copy(deep=False)
+            keep = checkpoint.keep
+            rows_affected[:start] = checkpoint.rows_affected
+            self.operations_reused = start
+            if progress:
+                progress(start, len(operations), f"Reused {start} cached operations")
+
+        self.plan = compile_plan(operations[start:], ordered=self.cache is not None)
+        applied_by = "auto" if auto_mode else "user"
+        done = start
+
+        for plan_stage in self.plan.stages:
+            applicable = [step for step in plan_stage if self._applies(step)]
+            with stage('clean.statistics'):
+                stats = self._compute_statistics(applicable, keep)
+            stage_keep = keep
+
+            for step in applicable:
+                if step.kind == 'filter':
+                    with stage(f'clean.{step.operation}'):
+                        rows_before = len(self.df) if keep is None else int(keep.sum())
+                        step_keep = self._filter_rows(step, stats.get(step.column, {}), keep)
+                        keep = step_keep if keep is None else keep & step_keep
+                        rows_affected[start + step.index] = rows_before - int(keep.sum())
+
+            for step in applicable:
+                if step.kind == 'filter':
+                    continue
+                with stage(f'clean.{step.operation}'):
+                    self._expand(step.column)
+                    if step.operation == 'impute_missing':
+                        self._impute_missing(step.column, step.parameters, stats[step.column])
+                    elif step.operation == 'handle_outliers':
+                        self._handle_outliers(step.column, step.parameters, stats.get(step.column, {}))
+                    elif step.operation == 'group_rare_categories':
+                        self._group_rare_categories(step.column, step.parameters, stats[step.column])
+                    elif step.operation == 'standardize_column':
+                        self._standardize_column(step.column, step.parameters)
+                    elif step.operation == 'normalize_values':
+                        self._normalize_values(step.column, step.parameters, stats[step.column])
+                    elif step.operation == 'merge_near_duplicates':
+                        # Clustered on the rows selected when the stage started, like the statistics
+                        rows_affected[start + step.index] = self._merge_near_duplicates(
+                            step.column, step.parameters, stage_keep
+                        )
+
+            for step in plan_stage:
+                done += 1
+                if progress:
+                    progress(done, len(operations),
+                             self._get_operation_description(step.operation, step.column, step.parameters))
+
+            if keys:
+                self.cache.store(
+                    keys[done - 1], Checkpoint(self.df.copy(deep=False), keep, rows_affected[:done]),
+                    self.base_df, self.fingerprint
+                )
+
+        if keep is not None and not keep.all():
+            with stage('clean.select_rows'):
+                self.df = self.df[keep]
+
+        for index, op in enumerate(operations):
+            op_type = op.get('operation')
+            col = op.get('column')
+            params = op.get('parameters', {})
+            self.operations_log.append(CleaningOperation(
+                column=col,
+                operation_type=op_type,
+                parameters=params,
+                applied_by=applied_by,
+                rows_affected=rows_affected[index],
+                description=self._get_operation_description(op_type, col, params)
+            ))
         return self.df
 
-    def _apply_operation(self, operation: Dict[str, Any], applied_by: str = "auto"):
-        """Apply single cleaning operation"""
-        op_type = operation.get('operation')
-        col = operation.get('column')
-        params = operation.get('parameters', {})
+    def _applies(self, step: PlanStep) -> bool:
+        """Whether a step changes anything given the current columns and dtypes"""
+        if step.kind == 'noop':
+            return False
+        if step.operation == 'remove_duplicates':
+            return all(col in self.df.columns for col in step.parameters.get('subset') or [])
+        if step.operation == 'merge_near_duplicates':
+            return all(col in self.df.columns for col in step.parameters.get('columns') or [step.column])
+        if step.column not in self.df.columns:
+            return False
+        if step.operation == 'impute_missing' and step.kind == 'transform':
+            return step.parameters.get('strategy', 'mean') == 'mode' or is_numeric_column(self.df[step.column])
+        if step.operation in ('handle_outliers', 'normalize_values'):
+            return is_numeric_column(self.df[step.column])
+        if step.operation == 'group_rare_categories':
+            return is_text_column(self.df[step.column])
+        return True
 
-        rows_before = len(self.df)
+    def _expand(self, column: str):
+        """Give a compacted column its computing dtype before an operation rewrites it"""
+        series = self.df[column]
+        expanded = expand_column(series)
+        if expanded is not series:
+            self.df[column] = expanded
 
-        if op_type == 'impute_missing':
-            self._impute_missing(col, params)
-        elif op_type == 'handle_outliers':
-            self._handle_outliers(col, params)
-        elif op_type == 'group_rare_categories':
-            self._group_rare_categories(col, params)
-        elif op_type == 'standardize_column':
-            self._standardize_column(col, params)
-        elif op_type == 'normalize_values':
-            self._normalize_values(col, params)
+    def _compute_statistics(self, steps: List[PlanStep], keep: Optional[np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        """Compute every statistic a stage needs, selecting each column's rows once"""
+        needed: Dict[str, set] = {}
+        for step in steps:
+            if step.statistics:
+                needed.setdefault(step.column, set()).update(step.statistics)
 
-        rows_after = len(self.df)
-        rows_affected = rows_before - rows_after
+        stats = {}
+        for column, names in needed.items():
+            series = expand_column(self.df[column])
+            if keep is not None:
+                series = series[keep]
+            stats[column] = {name: STATISTICS[name](series) for name in names}
+            stats[column]['rows'] = len(series)
+        return stats
 
-        self.operations_log.append(CleaningOperation(
-            column=col,
-            operation_type=op_type,
-            parameters=params,
-            applied_by=applied_by,
-            rows_affected=max(0, rows_affected),
-            description=self._get_operation_description(op_type, col, params)
-        ))
+    def _filter_rows(self, step: PlanStep, stats: Dict[str, Any], keep: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask of the rows a filter step keeps, given the rows still selected"""
+        if step.operation == 'remove_duplicates':
+            return self._unique_rows(step.parameters, keep)
+        series = expand_column(self.df[step.column])
+        if step.operation == 'impute_missing':
+            return series.notna().to_numpy()
+        lower_bound, upper_bound = self._outlier_bounds(step.parameters, stats)
+        return ((series >= lower_bound) & (series <= upper_bound)).to_numpy()
 
-    def _impute_missing(self, column: str, params: Dict[str, Any]):
-        """Fill missing values using specified strategy"""
-        strategy = params.get('strategy', 'mean')
+    def _unique_rows(self, params: Dict[str, Any], keep: Optional[np.ndarray]) -> np.ndarray:
+        """Mask dropping every selected row whose values repeat another selected row's"""
+        hashes = row_hashes(self.df, params.get('subset') or None)
+        if keep is None:
+            return ~duplicated(hashes, params.get('keep', 'first'))
+        positions = np.flatnonzero(keep)
+        unique = np.ones(len(hashes), dtype=bool)
+        unique[positions[duplicated(hashes[positions], params.get('keep', 'first'))]] = False
+        return unique
 
-        if column not in self.df.columns:
-            return
-
-        if strategy == 'mean':
-            if np.issubdtype(self.df[column].dtype, np.number):
-                fill_value = self.df[column].mean()
-                self.df[column] = self.df[column].fillna(fill_value)
-        elif strategy == 'median':
-            if np.issubdtype(self.df[column].dtype, np.number):
-                fill_value = self.df[column].median()
-                self.df[column] = self.df[column].fillna(fill_value)
-        elif strategy == 'mode':
-            fill_value = self.df[column].mode()[0] if not self.df[column].mode().empty else 'Unknown'
-            self.df[column] = self.df[column].fillna(fill_value)
-        elif strategy == 'remove':
-            self.df = self.df[self.df[column].notna()].copy()
-
-    def _handle_outliers(self, column: str, params: Dict[str, Any]):
-        """Handle outliers using IQR method"""
-        if column not in self.df.columns or not np.issubdtype(self.df[column].dtype, np.number):
-            return
-
-        strategy = params.get('strategy', 'cap')
+    def _outlier_bounds(self, params: Dict[str, Any], stats: Dict[str, Any]):
+        """IQR fences from the parameters, or from the stage's quartiles"""
         lower_bound = params.get('lower_bound')
         upper_bound = params.get('upper_bound')
 
         if lower_bound is None or upper_bound is None:
-            Q1 = self.df[column].quantile(0.25)
-            Q3 = self.df[column].quantile(0.75)
+            Q1, Q3 = stats['quartiles']
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
+        return lower_bound, upper_bound
 
-        if strategy == 'cap':
-            self.df[column] = self.df[column].clip(lower=lower_bound, upper=upper_bound)
-        elif strategy == 'remove':
-            self.df = self.df[(self.df[column] >= lower_bound) & (self.df[column] <= upper_bound)]
+    def _impute_missing(self, column: str, params: Dict[str, Any], stats: Dict[str, Any]):
+        """Fill missing values using specified strategy"""
+        strategy = params.get('strategy', 'mean')
 
-    def _group_rare_categories(self, column: str, params: Dict[str, Any]):
-        """Replace rare categories with 'Other'"""
-        if column not in self.df.columns or self.df[column].dtype != 'object':
-            return
+        if strategy == 'mode':
+            fill_value = stats['mode'][0] if not stats['mode'].empty else 'Unknown'
+        else:
+            fill_value = stats[strategy]
+        self.df[column] = self.df[column].fillna(fill_value)
+
+    def _handle_outliers(self, column: str, params: Dict[str, Any], stats: Dict[str, Any]):
+        """Cap outliers at the IQR fences"""
+        lower_bound, upper_bound = self._outlier_bounds(params, stats)
+        self.df[column] = self.df[column].clip(lower=lower_bound, upper=upper_bound)
 
+    def _group_rare_categories(self, column: str, params: Dict[str, Any], stats: Dict[str, Any]):
+        """Replace rare categories with 'Other'"""
         threshold = params.get('threshold', 0.01)
         group_label = params.get('group_label', 'Other')
 
-        value_counts = self.df[column].value_counts()
-        rare_categories = value_counts[value_counts / len(self.df) < threshold].index
+        value_counts = stats['value_counts']
+        rare_categories = value_counts[value_counts / stats['rows'] < threshold].index
+
+        if len(rare_categories):
+            self.df[column] = _map_distinct(
+                self.df[column], lambda values: values.mask(values.isin(rare_categories), group_label)
+            )
 
-        self.df[column] = self.df[column].replace(rare_categories, group_label)
+    def _merge_near_duplicates(self, column: str, params: Dict[str, Any], keep: Optional[np.ndarray]) -> int:
+        """Rewrite near-duplicate keys to their cluster's most frequent one, returning the rows changed"""
+        columns = params.get('columns') or [column]
+        positions = np.arange(len(self.df)) if keep is None else np.flatnonzero(keep)
+        frame = self.df[columns] if keep is None else self.df[columns].iloc[positions]
+        matches = find_near_duplicates(frame, params.get('threshold', FUZZY_THRESHOLD))
+
+        changed = np.flatnonzero(matches.changed)
+        rows, sources = positions[changed], positions[matches.canonical[changed]]
+        for col in columns:
+            self._expand(col)
+            values = self.df[col].array.copy()
+            values[rows] = values.take(sources)
+            self.df[col] = values
+        return len(rows)
 
     def _standardize_column(self, column: str, params: Dict[str, Any]):
         """Standardize column names and values"""
-        if column not in self.df.columns:
-            return
-
         # Standardize column name
         new_name = column.lower().strip().replace(' ', '_')
         if new_name != column:
-            self.df.rename(columns={column: new_name}, inplace=True)
+            self.df = self.df.rename(columns={column: new_name})
 
         # Standardize values for categorical columns
         if self.df[new_name].dtype == 'object':
-            self.df[new_name] = self.df[new_name].str.strip().str.lower()
+            self.df[new_name] = _map_distinct(self.df[new_name], lambda values: values.str.strip().str.lower())
 
-    def _normalize_values(self, column: str, params: Dict[str, Any]):
+    def _normalize_values(self, column: str, params: Dict[str, Any], stats: Dict[str, Any]):
         """Normalize numeric values"""
-        if column not in self.df.columns or not np.issubdtype(self.df[column].dtype, np.number):
-            return
-
         method = params.get('method', 'minmax')
 
         if method == 'minmax':
-            min_val = self.df[column].min()
-            max_val = self.df[column].max()
+            min_val = stats['min']
+            max_val = stats['max']
             if max_val != min_val:
                 self.df[column] = (self.df[column] - min_val) / (max_val - min_val)
         elif method == 'zscore':
-            mean = self.df[column].mean()
-            std = self.df[column].std()
+            mean = stats['mean']
+            std = stats['std']
             if std != 0:
                 self.df[column] = (self.df[column] - mean) / std
 
@@ -149,6 +308,14 @@ class DataCleaner:
                 return f"Removed outliers from '{column}'"
         elif op_type == 'group_rare_categories':
             return f"Grouped rare categories in '{column}' to 'Other'"
+        elif op_type == 'remove_duplicates':
+            subset = params.get('subset')
+            over = f" in {', '.join(subset)}" if subset else ''
+            return f"Removed duplicate rows{over}, keeping the {params.get('keep', 'first')} occurrence"
+        elif op_type == 'merge_near_duplicates':
+            columns = ', '.join(params.get('columns') or [column])
+            threshold = params.get('threshold', FUZZY_THRESHOLD)
+            return f"Merged near-duplicate values in {columns} (trigram similarity >= {threshold})"
         elif op_type == 'standardize_column':
             return f"Standardized column name and values in '{column}'"
         elif op_type == 'normalize_values':
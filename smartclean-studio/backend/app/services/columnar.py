@@ -0,0 +1,72 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from typing import List, Optional
+from services.metrics import stage
+from services.type_inference import INFERENCE_SAMPLE_ROWS, infer_column_types, apply_column_types
+
+# Compression codec for Parquet and Arrow exports
+COLUMNAR_COMPRESSION = os.environ.get('SMARTCLEAN_COLUMNAR_COMPRESSION', 'zstd')
+
+# Text columns with at most this share of distinct values are dictionary-encoded in Arrow exports
+DICTIONARY_MAX_RATIO = 0.5
+
+# Rows per Parquet row group
+PARQUET_ROW_GROUP_ROWS = 1_000_000
+
+
+def _table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to the dtypes the services work with"""
+    df = table.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
+
+    # Dictionary-encoded columns arrive as categoricals; the services expect text as object
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+
+    # Typed formats can still carry dates or numbers stored as text
+    text_columns = [col for col in df.columns if df[col].dtype == object]
+    column_types = infer_column_types(df[text_columns].head(INFERENCE_SAMPLE_ROWS))
+    return apply_column_types(df, column_types)
+
+
+def read_parquet(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a Parquet file through a memory map, decoding only the requested columns"""
+    return _table_to_frame(pq.read_table(path, columns=columns, memory_map=True))
+
+
+def read_arrow(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read an Arrow IPC / Feather file through a memory map, decoding only the requested columns"""
+    return _table_to_frame(feather.read_table(path, columns=columns, memory_map=True))
+
+
+def frame_to_table(df: pd.DataFrame, dictionary_encode: bool = False) -> pa.Table:
+    """Convert a frame to an Arrow table, optionally dictionary-encoding repetitive text columns"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if not dictionary_encode:
+        return table
+
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            encoded = table.column(i).dictionary_encode()
+            distinct = max((len(chunk.dictionary) for chunk in encoded.chunks), default=0)
+            if distinct <= DICTIONARY_MAX_RATIO * max(len(table), 1):
+                table = table.set_column(i, field.name, encoded)
+    return table
+
+
+@stage('export.parquet')
+def write_parquet(df: pd.DataFrame, path: str):
+    """Write a frame as compressed Parquet; text columns use Parquet's dictionary encoding"""
+    pq.write_table(
+        frame_to_table(df), path, compression=COLUMNAR_COMPRESSION, use_dictionary=True,
+        row_group_size=PARQUET_ROW_GROUP_ROWS
+    )
+
+
+@stage('export.arrow')
+def write_arrow(df: pd.DataFrame, path: str):
+    """Write a frame as a compressed, dictionary-encoded Arrow IPC (Feather v2) file"""
+    feather.write_feather(frame_to_table(df, dictionary_encode=True), path, compression=COLUMNAR_COMPRESSION)
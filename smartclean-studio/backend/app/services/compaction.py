@@ -0,0 +1,149 @@
+import os
+import numpy as np
+import pandas as pd
+from services.type_inference import is_text_column
+
+# Store session frames in compact dtypes after ingestion and after cleaning
+COMPACT_SESSIONS = os.environ.get('SMARTCLEAN_COMPACT_SESSIONS', '1') == '1'
+
+# Text columns with at most this share of distinct values become categoricals;
+# the others are stored as Arrow-backed strings
+CATEGORY_MAX_RATIO = float(os.environ.get('SMARTCLEAN_CATEGORY_MAX_RATIO', 0.5))
+
+# Narrower integer types tried, smallest first
+INTEGER_DTYPES = (np.int8, np.int16, np.int32)
+
+# Nullable integer types tried for whole-number float columns, smallest first
+NULLABLE_INTEGER_DTYPES = (pd.Int8Dtype(), pd.Int16Dtype(), pd.Int32Dtype())
+
+ARROW_STRING = pd.StringDtype('pyarrow')
+
+
+def _compact_integers(series: pd.Series) -> pd.Series:
+    if series.empty:
+        return series
+    low, high = series.min(), series.max()
+    for dtype in INTEGER_DTYPES:
+        if np.dtype(dtype).itemsize >= series.dtype.itemsize:
+            break
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+    return series
+
+
+def _compact_whole_floats(series: pd.Series, values: np.ndarray, float32_exact: bool) -> pd.Series:
+    """Whole-number floats as a nullable integer type, which expands back to float64 unchanged"""
+    numbers = values[~np.isnan(values)]
+    if not numbers.size or not np.isfinite(numbers).all() or (numbers % 1 != 0).any():
+        return series
+    if np.signbit(numbers[numbers == 0]).any():
+        return series
+    low, high = numbers.min(), numbers.max()
+    for dtype in NULLABLE_INTEGER_DTYPES:
+        # Each value also takes a mask byte, so it must beat float32 when that is exact
+        if float32_exact and dtype.itemsize + 1 >= np.dtype(np.float32).itemsize:
+            break
+        info = np.iinfo(dtype.numpy_dtype)
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+    return series
+
+
+def _compact_floats(series: pd.Series) -> pd.Series:
+    values = series.to_numpy()
+    with np.errstate(over='ignore'):
+        narrow = values.astype(np.float32)
+    float32_exact = np.array_equal(narrow.astype(np.float64), values, equal_nan=True)
+    compacted = _compact_whole_floats(series, values, float32_exact)
+    if compacted is not series:
+        return compacted
+    if float32_exact:
+        return series.astype(np.float32)
+    return series
+
+
+def _compact_text(series: pd.Series) -> pd.Series:
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return series
+    codes, uniques = series.factorize()
+    if len(uniques) > CATEGORY_MAX_RATIO * max(int((codes >= 0).sum()), 1):
+        return series if series.dtype == ARROW_STRING else series.astype(ARROW_STRING)
+
+    # Categories in sorted order, so the categorical sorts like the text it replaces
+    categories = np.asarray(uniques, dtype=object)
+    order = np.argsort(categories, kind='stable')
+    ranks = np.empty(len(order), dtype=codes.dtype)
+    ranks[order] = np.arange(len(order), dtype=codes.dtype)
+    codes = np.where(codes >= 0, ranks[np.maximum(codes, 0)], -1)
+    categorical = pd.Categorical.from_codes(codes, categories=pd.Index(categories[order], dtype=object))
+    return pd.Series(categorical, index=series.index, name=series.name)
+
+
+def compact_column(series: pd.Series) -> pd.Series:
+    """The column in the narrowest dtype that holds exactly the same values (or `series` itself)"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if isinstance(dtype, np.dtype) and dtype.kind == 'i':
+        return _compact_integers(series)
+    if isinstance(dtype, np.dtype) and dtype == np.float64:
+        return _compact_floats(series)
+    if is_text_column(series):
+        return _compact_text(series)
+    return series
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Shallow copy of a frame with every column in its compact dtype"""
+    compacted = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        narrowed = compact_column(series)
+        if narrowed is not series:
+            compacted[col] = narrowed
+    return compacted
+
+
+def expand_column(series: pd.Series) -> pd.Series:
+    """The column in the dtype the services compute with: int64, float64 or object text.
+
+    Nullable integers only come from whole-number float columns, so they
+    expand to float64.
+
+    Statistics, comparisons and formatted output on float32 or small
+    integer columns would otherwise run at the narrow precision.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == object:
+        return series.astype(object)
+    if isinstance(dtype, pd.StringDtype):
+        return pd.Series(series.to_numpy(dtype=object, na_value=np.nan), index=series.index, name=series.name)
+    if isinstance(dtype, np.dtype) and dtype.kind == 'i' and dtype.itemsize < 8:
+        return series.astype(np.int64)
+    if isinstance(dtype, np.dtype) and dtype == np.float32:
+        return series.astype(np.float64)
+    if not isinstance(dtype, np.dtype) and pd.api.types.is_integer_dtype(dtype):
+        return pd.Series(series.to_numpy(dtype=np.float64, na_value=np.nan), index=series.index, name=series.name)
+    return series
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Shallow copy of a frame with every compacted column expanded"""
+    expanded = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        widened = expand_column(series)
+        if widened is not series:
+            expanded[col] = widened
+    return expanded
+
+
+def shares_memory(left: pd.Series, right: pd.Series) -> bool:
+    """Whether two columns are views of the same data"""
+    # Extension arrays (categoricals, Arrow strings, nullable types) survive shallow copies as the same object
+    if left.array is right.array:
+        return True
+    if isinstance(left.dtype, np.dtype) and isinstance(right.dtype, np.dtype):
+        return np.may_share_memory(left.to_numpy(), right.to_numpy())
+    return False
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Any
+
+# Threads running CPU-bound pandas work
+COMPUTE_WORKERS = int(os.environ.get('SMARTCLEAN_COMPUTE_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Requests allowed to wait for a worker before new ones are rejected
+COMPUTE_QUEUE_LIMIT = int(os.environ.get('SMARTCLEAN_COMPUTE_QUEUE_LIMIT', 32))
+
+
+class ComputeQueueFull(Exception):
+    """Raised when the compute queue is at its limit"""
+
+
+class ComputeExecutor:
+    """Bounded thread pool that keeps heavy service calls off the event loop.
+
+    Each call takes a queue slot until it finishes; once `queue_limit`
+    calls are waiting for a worker, further calls fail fast with
+    `ComputeQueueFull` instead of piling up behind the running ones.
+    """
+
+    def __init__(self, max_workers: int = COMPUTE_WORKERS, queue_limit: int = COMPUTE_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='compute')
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on a compute thread and await its result"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue `fn(*args, **kwargs)` on a compute thread, raising `ComputeQueueFull` at the limit"""
+        with self._lock:
+            if self._waiting >= self.queue_limit:
+                self._rejected += 1
+                raise ComputeQueueFull(f"Compute queue is full ({self._waiting} requests waiting)")
+            self._waiting += 1
+
+        queued_at = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def task():
+            wait = time.perf_counter() - queued_at
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            return self._pool.submit(task)
+        except Exception:
+            with self._lock:
+                self._waiting -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                'workers': self.max_workers,
+                'queue_limit': self.queue_limit,
+                'queue_depth': self._waiting,
+                'running': self._running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(self._total_wait / started * 1000, 2) if started else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 2),
+            }
+
+
+# Shared executor used by all routes
+compute = ComputeExecutor()
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+# `keep` options of the remove_duplicates operation
+KEEP_OPTIONS = ('first', 'last')
+
+# Hash given to missing values, so None, NaN and NaT all match each other as in `DataFrame.duplicated`
+NA_HASH = np.uint64(np.iinfo(np.uint64).max)
+
+# Mixing constants for folding column hashes into one row hash
+ROW_HASH_SEED = np.uint64(0x9E3779B97F4A7C15)
+ROW_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, spreading structured hash values over all 64 bits"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _object_hashes(values: np.ndarray) -> np.ndarray:
+    # Python's own hashes are cached on str objects and agree for values that compare equal
+    # (as the object hash tables behind DataFrame.duplicated do), so this avoids re-encoding every string
+    return mix64(np.fromiter(map(hash, values), dtype=np.int64, count=len(values)).view(np.uint64))
+
+
+def column_hashes(series: pd.Series) -> np.ndarray:
+    """64-bit hash of every value of a column, equal for values that compare equal.
+
+    Text hashes come from Python's per-process string hash, so they are
+    only comparable within one process.
+    """
+    missing = series.isna().to_numpy()
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        category_hashes = column_hashes(pd.Series(dtype.categories))
+        hashes = category_hashes[np.maximum(series.cat.codes.to_numpy(), 0)] if len(category_hashes) else None
+    elif dtype == object or isinstance(dtype, pd.StringDtype):
+        try:
+            hashes = _object_hashes(series.to_numpy(dtype=object))
+        except TypeError:
+            # Unhashable cells (lists, dicts): hash their text form
+            hashes = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+    else:
+        if pd.api.types.is_float_dtype(dtype):
+            # -0.0 and 0.0 compare equal, so they must hash equal
+            series = series + 0.0
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    if hashes is None:
+        return np.full(len(series), NA_HASH, dtype=np.uint64)
+    return np.where(missing, NA_HASH, hashes)
+
+
+def row_hashes(df: pd.DataFrame, columns: Optional[List[str]] = None,
+               initial: Optional[np.ndarray] = None) -> np.ndarray:
+    """One uint64 fingerprint per row over `columns` (default: all), computed column by column.
+
+    Rows with equal values get equal fingerprints; distinct rows collide
+    with probability around n^2 / 2^65, so exact duplicates are found with
+    hash lookups instead of comparing every cell. `initial` continues the
+    fingerprints of earlier columns.
+    """
+    hashes = np.full(len(df), ROW_HASH_SEED, dtype=np.uint64) if initial is None else initial
+    for col in df.columns if columns is None else columns:
+        hashes = (hashes ^ column_hashes(df[col])) * ROW_HASH_MULTIPLIER
+    return hashes
+
+
+def duplicated(hashes: np.ndarray, keep: str = 'first') -> np.ndarray:
+    """Mask of the rows whose fingerprint already occurs earlier ('first') or later ('last')"""
+    return pd.Series(hashes, copy=False).duplicated(keep=keep).to_numpy()
+
+
+class DuplicateTracker:
+    """Row fingerprints of a dataset that arrives in chunks.
+
+    Each chunk is hashed as it is parsed, so duplicates are counted
+    without a second pass over the loaded frame; only 8 bytes per row
+    are kept. Columns converted only after reading (dates, or columns the
+    parser had to read as text) are deferred and folded in by `finish`,
+    so fingerprints always reflect the final values.
+    """
+
+    def __init__(self):
+        self._chunks: List[np.ndarray] = []
+        self.rows = 0
+        self.deferred: List[str] = []
+
+    @property
+    def complete(self) -> bool:
+        """Whether every row and column has been fingerprinted"""
+        return not self.deferred
+
+    def defer(self, columns: List[str]):
+        self.deferred = list(columns)
+
+    def update(self, chunk: pd.DataFrame):
+        self._chunks.append(row_hashes(chunk, [col for col in chunk.columns if col not in self.deferred]))
+        self.rows += len(chunk)
+
+    def finish(self, df: pd.DataFrame):
+        """Fold the deferred columns of the fully loaded frame into the fingerprints"""
+        if self.deferred:
+            self._chunks = [row_hashes(df, self.deferred, initial=self.hashes())]
+            self.deferred = []
+
+    def reset(self):
+        self._chunks = []
+        self.rows = 0
+        self.deferred = []
+
+    def hashes(self) -> np.ndarray:
+        if len(self._chunks) != 1:
+            self._chunks = [np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=np.uint64)]
+        return self._chunks[0]
+
+    def duplicated(self, keep: str = 'first') -> np.ndarray:
+        return duplicated(self.hashes(), keep)
+
+    def count(self) -> int:
+        """Rows that repeat an earlier row"""
+        return int(self.duplicated().sum())
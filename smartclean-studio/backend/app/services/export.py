@@ -0,0 +1,117 @@
+import os
+import zlib
+import pandas as pd
+import pyarrow as pa
+import xlsxwriter
+from services.compaction import expand_frame
+from services.metrics import stage
+from typing import Iterable, Iterator, List, Optional
+
+# Rows encoded per CSV chunk of a streamed download
+EXPORT_BATCH_ROWS = int(os.environ.get('SMARTCLEAN_EXPORT_BATCH_ROWS', 50_000))
+
+# Compression levels for streamed downloads (favouring speed over ratio)
+EXPORT_GZIP_LEVEL = int(os.environ.get('SMARTCLEAN_EXPORT_GZIP_LEVEL', 5))
+EXPORT_ZSTD_LEVEL = int(os.environ.get('SMARTCLEAN_EXPORT_ZSTD_LEVEL', 3))
+
+# Placeholder written for missing values
+NA_REP = 'N/A'
+
+# Excel's row limit per worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+# Base name of the worksheets in Excel exports
+EXCEL_SHEET_NAME = 'Cleaned Data'
+
+
+def iter_csv(df: pd.DataFrame, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """Encode a frame as UTF-8 CSV one row batch at a time"""
+    yield df.head(0).to_csv(index=False).encode('utf-8')
+    for start in range(0, len(df), batch_rows):
+        # Expanded so compact float32 columns print exactly as their float64 values would
+        batch = expand_frame(df.iloc[start:start + batch_rows])
+        yield batch.to_csv(index=False, header=False, na_rep=NA_REP).encode('utf-8')
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the content-encoding for a download from the client's Accept-Encoding header"""
+    accepted = {
+        token.split(';')[0].strip().lower()
+        for token in accept_encoding.split(',')
+        if not token.strip().endswith(';q=0')
+    }
+    if 'zstd' in accepted:
+        return 'zstd'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def encode_stream(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Compress a byte stream incrementally with the given content-encoding"""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    elif encoding == 'zstd':
+        # One frame per chunk; concatenated zstd frames decode as a single stream
+        codec = pa.Codec('zstd', compression_level=EXPORT_ZSTD_LEVEL)
+        for chunk in chunks:
+            if chunk:
+                yield codec.compress(chunk, asbytes=True)
+    else:
+        yield from chunks
+
+
+def _excel_cells(batch: pd.DataFrame) -> List[list]:
+    """Native Python values for a row batch, column by column, with missing values as N/A"""
+    columns = []
+    for col in batch.columns:
+        series = batch[col]
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            series = series.dt.tz_localize(None)
+        columns.append(series.astype(object).where(series.notna(), NA_REP).tolist())
+    return columns
+
+
+@stage('export.excel')
+def write_excel(df: pd.DataFrame, path: str, batch_rows: int = EXPORT_BATCH_ROWS,
+                max_rows: int = EXCEL_MAX_ROWS):
+    """Write a frame to xlsx in constant memory, starting a new worksheet at Excel's row limit.
+
+    xlsxwriter's constant_memory mode flushes each row to disk as soon as
+    the next one starts, so only the current row batch is held in memory.
+    """
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        # Cell text is data: never turn it into formulas or hyperlinks
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'nan_inf_to_errors': True,
+    })
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+    column_formats = [
+        date_format if pd.api.types.is_datetime64_any_dtype(df[col]) else None for col in df.columns
+    ]
+    rows_per_sheet = max_rows - 1
+
+    try:
+        for sheet_number, sheet_start in enumerate(range(0, max(len(df), 1), rows_per_sheet), start=1):
+            name = EXCEL_SHEET_NAME if sheet_number == 1 else f'{EXCEL_SHEET_NAME} ({sheet_number})'
+            worksheet = workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+            sheet_end = min(sheet_start + rows_per_sheet, len(df))
+            row = 1
+            for start in range(sheet_start, sheet_end, batch_rows):
+                columns = _excel_cells(df.iloc[start:min(start + batch_rows, sheet_end)])
+                for values in zip(*columns):
+                    for col, value in enumerate(values):
+                        worksheet.write(row, col, value, column_formats[col])
+                    row += 1
+    finally:
+        workbook.close()
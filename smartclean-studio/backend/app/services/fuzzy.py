@@ -0,0 +1,250 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+from services.duplicates import mix64, row_hashes, ROW_HASH_SEED, ROW_HASH_MULTIPLIER
+
+# Trigram Jaccard similarity at which two keys count as near-duplicates
+FUZZY_THRESHOLD = float(os.environ.get('SMARTCLEAN_FUZZY_THRESHOLD', 0.75))
+
+# MinHash signature length; more permutations catch more borderline pairs at a higher cost
+MINHASH_PERMUTATIONS = int(os.environ.get('SMARTCLEAN_MINHASH_PERMUTATIONS', 32))
+
+# Share of key pairs at exactly the threshold that the LSH bands must propose for comparison
+LSH_RECALL = 0.95
+
+# Characters of each normalized key that are compared
+MAX_KEY_CHARS = 64
+
+# Keys turned into trigrams at once, bounding the working memory of a batch
+KEY_BATCH = 50_000
+
+# Trigrams gathered per batch of candidate pairs being verified
+PAIR_BATCH_GRAMS = 1 << 22
+
+_SHIFT = np.uint64(21)  # every Unicode code point fits in 21 bits
+_MULTIPLIER = np.uint64(0xD6E8FEB86659FD93)
+_PUNCTUATION = re.compile(r'[\W_]+')
+_NUMBERS = re.compile(r'\d+')
+
+
+def valid_threshold(threshold) -> bool:
+    """Whether a merge_near_duplicates threshold is a similarity in (0, 1]"""
+    return isinstance(threshold, (int, float)) and not isinstance(threshold, bool) and 0 < threshold <= 1
+
+
+def normalize_keys(frame: pd.DataFrame) -> np.ndarray:
+    """Comparable text of each row's values: lower case, punctuation dropped, whitespace collapsed.
+
+    'Acme Inc' and 'ACME, Inc.' both become 'acme inc'; rows whose values
+    are all missing get ''.
+    """
+    values = [frame[col].astype(object).where(frame[col].notna(), '').to_numpy() for col in frame.columns]
+    if not values:
+        return np.full(len(frame), '', dtype=object)
+    keys = values[0] if len(values) == 1 else map(' '.join, zip(*[map(str, column) for column in values]))
+    return np.fromiter((_PUNCTUATION.sub(' ', str(key).lower()).strip()[:MAX_KEY_CHARS] for key in keys),
+                       dtype=object, count=len(frame))
+
+
+def _trigrams(keys: np.ndarray) -> np.ndarray:
+    """Character trigrams of non-empty keys padded with a space each side, one row per key.
+
+    Each trigram is its three code points packed into 63 bits. Rows of
+    shorter keys are filled up with their own first trigram, which leaves
+    the set of trigrams in the row unchanged.
+    """
+    padded = np.array([' ' + key + ' ' for key in keys], dtype=str)
+    width = padded.dtype.itemsize // 4
+    codes = padded.view(np.uint32).reshape(len(keys), width).astype(np.uint64)
+    grams = (codes[:, :-2] << (_SHIFT + _SHIFT)) | (codes[:, 1:-1] << _SHIFT) | codes[:, 2:]
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    return np.where(np.arange(width - 2) < lengths[:, None], grams, grams[:, :1])
+
+
+def trigram_sets(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Trigram set of every non-empty key as (offsets, grams): key i owns the sorted
+    32-bit trigram hashes grams[offsets[i]:offsets[i + 1]]"""
+    sets, sizes = [], []
+    for start in range(0, len(keys), KEY_BATCH):
+        grams = np.sort((mix64(_trigrams(keys[start:start + KEY_BATCH])) >> np.uint64(32)).astype(np.uint32), axis=1)
+        first = np.ones(grams.shape, dtype=bool)
+        first[:, 1:] = grams[:, 1:] != grams[:, :-1]
+        sets.append(grams[first])
+        sizes.append(first.sum(axis=1))
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    if sets:
+        np.cumsum(np.concatenate(sizes), out=offsets[1:])
+    return offsets, np.concatenate(sets) if sets else np.empty(0, dtype=np.uint32)
+
+
+def minhash_signatures(offsets: np.ndarray, grams: np.ndarray,
+                       permutations: int = MINHASH_PERMUTATIONS) -> np.ndarray:
+    """MinHash signature of each trigram set; two sets agree on a permutation
+    with probability equal to their Jaccard similarity"""
+    salts = mix64(np.arange(1, permutations + 1, dtype=np.uint64))
+    hashed = mix64(grams.astype(np.uint64))
+    signatures = np.empty((len(offsets) - 1, permutations), dtype=np.uint64)
+    for index, salt in enumerate(salts):
+        permuted = (hashed ^ salt) * _MULTIPLIER
+        signatures[:, index] = np.minimum.reduceat(permuted ^ (permuted >> np.uint64(32)), offsets[:-1])
+    return signatures
+
+
+def lsh_band_rows(threshold: float, permutations: int = MINHASH_PERMUTATIONS) -> int:
+    """Signature rows per LSH band: the most selective banding that still proposes
+    at least LSH_RECALL of the pairs at the threshold"""
+    for rows in range(permutations, 0, -1):
+        if permutations % rows == 0 and 1 - (1 - threshold ** rows) ** (permutations // rows) >= LSH_RECALL:
+            return rows
+    return 1
+
+
+def candidate_pairs(signatures: np.ndarray, rows: int, blocks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs of keys worth comparing, found through LSH buckets instead of all pairs.
+
+    Keys in the same block whose signatures agree on every row of some
+    band share that band's bucket. Within a bucket each key is paired
+    with its neighbour and with the bucket's first key (a sorted
+    neighbourhood over the bucket), so a bucket of n keys costs at most
+    2n comparisons.
+    """
+    count = len(signatures)
+    pairs = []
+    for start in range(0, signatures.shape[1], rows):
+        band = (ROW_HASH_SEED ^ blocks.astype(np.uint64)) * ROW_HASH_MULTIPLIER
+        for index in range(start, start + rows):
+            band = (band ^ signatures[:, index]) * ROW_HASH_MULTIPLIER
+        order = np.argsort(band, kind='stable')
+        band = band[order]
+        same = band[1:] == band[:-1]
+        bucket = np.cumsum(np.r_[True, ~same]) - 1
+        first = order[np.flatnonzero(np.r_[True, ~same])][bucket]
+        member = order[1:][same]
+        pairs.append(np.minimum(order[:-1][same], member) * count + np.maximum(order[:-1][same], member))
+        star = same & (first[1:] != order[:-1])
+        pairs.append(first[1:][star] * count + order[1:][star])
+    pairs = np.unique(np.concatenate(pairs)) if pairs else np.empty(0, dtype=np.int64)
+    return pairs // count, pairs % count
+
+
+def _gather(offsets: np.ndarray, grams: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Trigram sets of `keys` concatenated, each hash prefixed with its position in `keys`,
+    so the result is sorted and one binary search finds a (pair, trigram) match"""
+    sizes = offsets[keys + 1] - offsets[keys]
+    ends = np.cumsum(sizes)
+    positions = np.repeat(offsets[keys] - (ends - sizes), sizes) + np.arange(ends[-1] if len(ends) else 0)
+    owners = np.repeat(np.arange(len(keys), dtype=np.uint64), sizes)
+    return (owners << np.uint64(32)) | grams[positions]
+
+
+def similarities(offsets: np.ndarray, grams: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Trigram Jaccard similarity of each pair of keys"""
+    result = np.empty(len(left))
+    sizes = np.diff(offsets)
+    batches = np.cumsum(sizes[left] + sizes[right]) // PAIR_BATCH_GRAMS
+    for batch in np.split(np.arange(len(left)), np.flatnonzero(np.diff(batches)) + 1):
+        if not len(batch):
+            continue
+        left_grams = _gather(offsets, grams, left[batch])
+        right_grams = _gather(offsets, grams, right[batch])
+        found = np.minimum(np.searchsorted(right_grams, left_grams), len(right_grams) - 1)
+        hits = right_grams[found] == left_grams
+        shared = np.bincount((left_grams[hits] >> np.uint64(32)).astype(np.int64), minlength=len(batch))
+        result[batch] = shared / (sizes[left[batch]] + sizes[right[batch]] - shared)
+    return result
+
+
+def connected_components(count: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Smallest node of the component of every node, by hooking roots and pointer jumping"""
+    labels = np.arange(count)
+    while True:
+        a, b = labels[left], labels[right]
+        differ = a != b
+        if not differ.any():
+            return labels
+        a, b = a[differ], b[differ]
+        np.minimum.at(labels, np.maximum(a, b), np.minimum(a, b))
+        while True:
+            parents = labels[labels]
+            if (parents == labels).all():
+                break
+            labels = parents
+
+
+@dataclass
+class NearDuplicates:
+    """Clusters of rows whose keys are near-duplicates of each other.
+
+    A cluster holds at least two distinct key values; `canonical` is the
+    position of a row holding the cluster's most frequent value.
+    """
+    labels: np.ndarray  # cluster of each row, -1 for rows without a near-duplicate
+    canonical: np.ndarray  # canonical row of each row's cluster, -1 outside clusters
+    changed: np.ndarray  # rows whose key differs from their cluster's canonical key
+    clusters: int
+
+    def variants(self, frame: pd.DataFrame, limit: int = 3) -> List[List[str]]:
+        """Distinct key values of the first `limit` clusters, most frequent first"""
+        examples = []
+        for cluster in range(min(limit, self.clusters)):
+            rows = frame.iloc[np.flatnonzero(self.labels == cluster)]
+            values = rows.astype(str).agg(' | '.join, axis=1).value_counts()
+            examples.append(list(values.index))
+        return examples
+
+
+def find_near_duplicates(frame: pd.DataFrame, threshold: float = FUZZY_THRESHOLD) -> NearDuplicates:
+    """Cluster the rows of `frame` whose values are near-duplicates, comparing every column.
+
+    Work is done per distinct normalized key rather than per row, and
+    candidate pairs come from MinHash LSH buckets, so the cost grows with
+    the number of distinct keys and of similar pairs, not with all pairs.
+    Keys are only compared with keys that contain the same numbers, as
+    'Store 12' and 'Store 13' are different stores rather than a typo;
+    this also keeps columns of similar-looking identifiers cheap.
+    """
+    count = len(frame)
+    variants, _ = pd.factorize(row_hashes(frame))
+    first = np.flatnonzero(~pd.Series(variants).duplicated().to_numpy())
+    key_codes, keys = pd.factorize(normalize_keys(frame.iloc[first]))
+    keys = np.asarray(keys, dtype=object)
+
+    numbers, _ = pd.factorize(np.fromiter((' '.join(_NUMBERS.findall(key)) for key in keys),
+                                          dtype=object, count=len(keys)))
+    # Keys whose numbers no other key has cannot match anything
+    compared = np.flatnonzero((keys != '') & (np.bincount(numbers, minlength=1)[numbers] > 1))
+    labels = np.arange(len(keys))
+    if len(compared) > 1:
+        offsets, grams = trigram_sets(keys[compared])
+        signatures = minhash_signatures(offsets, grams)
+        left, right = candidate_pairs(signatures, lsh_band_rows(threshold, signatures.shape[1]), numbers[compared])
+        similar = similarities(offsets, grams, left, right) >= threshold
+        components = connected_components(len(compared), left[similar], right[similar])
+        labels[compared] = compared[components]
+
+    # Clusters of a single distinct value only hold exact duplicates
+    variant_cluster = labels[key_codes]
+    variant_cluster[keys[key_codes] == ''] = -1
+    in_cluster = (variant_cluster >= 0) & (np.bincount(variant_cluster[variant_cluster >= 0],
+                                                       minlength=len(keys))[variant_cluster] > 1)
+    clusters, dense = np.unique(variant_cluster[in_cluster], return_inverse=True)
+    variant_cluster[:] = -1
+    variant_cluster[in_cluster] = dense
+
+    # Canonical value: the cluster's most frequent, ties going to the earliest
+    frequency = np.bincount(variants, minlength=len(first))
+    members = np.flatnonzero(in_cluster)
+    members = members[np.lexsort((members, -frequency[members], variant_cluster[members]))]
+    leaders = members[np.r_[True, variant_cluster[members][1:] != variant_cluster[members][:-1]]] \
+        if len(members) else members
+
+    row_labels = variant_cluster[variants]
+    inside = row_labels >= 0
+    canonical = np.full(count, -1, dtype=np.int64)
+    canonical[inside] = first[leaders[row_labels[inside]]]
+    changed = np.zeros(count, dtype=bool)
+    changed[inside] = variants[inside] != leaders[row_labels[inside]]
+    return NearDuplicates(labels=row_labels, canonical=canonical, changed=changed, clusters=len(clusters))
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from services.type_inference import (
+    INFERENCE_SAMPLE_ROWS, infer_column_types, reader_dtypes, apply_column_types
+)
+from services.sketches import DatasetSketch
+from services.duplicates import DuplicateTracker
+from services.columnar import read_parquet, read_arrow
+from services.metrics import stage
+
+# Size of each read from the multipart body while spooling to disk
+UPLOAD_CHUNK_BYTES = int(os.environ.get('SMARTCLEAN_UPLOAD_CHUNK_BYTES', 1024 * 1024))
+
+# Number of CSV rows parsed per chunk
+CSV_CHUNK_ROWS = int(os.environ.get('SMARTCLEAN_CSV_CHUNK_ROWS', 100_000))
+
+# Directory for spooled uploads (system temp dir by default)
+UPLOAD_SPOOL_DIR = os.environ.get('SMARTCLEAN_UPLOAD_DIR') or None
+
+# File extensions accepted on upload
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.parquet', '.feather', '.arrow')
+
+
+async def spool_upload(file, suffix: str = '') -> Tuple[str, int]:
+    """Copy an uploaded file to a temporary file in fixed-size chunks.
+
+    Returns the path of the spooled file and the number of bytes written.
+    The caller is responsible for removing the file.
+    """
+    size = 0
+    spool = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    try:
+        with spool:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                spool.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(spool.name)
+        raise
+    return spool.name, size
+
+
+def _read_typed_chunks(path: str, column_types: Dict[str, str], chunk_rows: int,
+                       sketch: Optional[DatasetSketch] = None, usecols: Optional[List[str]] = None,
+                       duplicates: Optional[DuplicateTracker] = None) -> pd.DataFrame:
+    """Read a CSV in chunks with the parser producing the final dtypes directly.
+
+    Each chunk is split into per-column pieces as it arrives and the columns
+    are joined one at a time, so on top of the result the peak is one chunk
+    while reading and one column while joining, rather than a second copy
+    of the whole frame.
+    """
+    dtypes = reader_dtypes(column_types)
+    pieces: Dict[str, List[pd.Series]] = {}
+    with pd.read_csv(path, dtype=dtypes, usecols=usecols, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            if sketch is not None:
+                sketch.update(chunk)
+            if duplicates is not None:
+                duplicates.update(chunk)
+            # Chunks hold their columns in shared blocks; copies let each chunk be freed
+            for col in chunk.columns:
+                pieces.setdefault(col, []).append(chunk[col].copy())
+            del chunk
+
+    if not pieces:
+        return pd.read_csv(path, dtype=dtypes, usecols=usecols, nrows=0)
+    columns = {}
+    for col in list(pieces):
+        parts = pieces.pop(col)
+        columns[col] = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+        del parts
+    # Built from the column dict without consolidating it into 2-D blocks (another full copy)
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_csv_chunked(path: str, chunk_rows: int = CSV_CHUNK_ROWS,
+                     sketch: Optional[DatasetSketch] = None, columns: Optional[List[str]] = None,
+                     duplicates: Optional[DuplicateTracker] = None) -> pd.DataFrame:
+    """Parse a CSV file incrementally using types inferred from a leading sample.
+
+    Numeric and boolean columns are converted by the parser itself, so no
+    chunk ever holds a full column of raw strings for them. If a value
+    further down the file contradicts the sample, the file is re-read:
+    with integer columns as floats when the value is a fraction, else with
+    those columns as text, converted only where no values would be lost.
+
+    When a sketch or duplicate tracker is given it is updated with every
+    chunk as it is parsed. Only `columns` are parsed when given.
+    """
+    sample = pd.read_csv(path, dtype=str, usecols=columns, nrows=INFERENCE_SAMPLE_ROWS)
+    column_types = infer_column_types(sample)
+    del sample
+
+    attempts = [column_types]
+    if 'integer' in column_types.values():
+        # A fraction after the sample: integer columns are read as floats
+        attempts.append({col: 'numeric' if kind == 'integer' else kind for col, kind in column_types.items()})
+    # Text after the sample: numbers and booleans are read as text
+    attempts.append({
+        col: 'categorical' if kind in ('integer', 'numeric', 'boolean') else kind
+        for col, kind in column_types.items()
+    })
+
+    for attempt, parser_types in enumerate(attempts):
+        if attempt:
+            if sketch is not None:
+                sketch.reset()
+            if duplicates is not None:
+                duplicates.reset()
+        if duplicates is not None:
+            duplicates.defer([
+                col for col, kind in column_types.items()
+                if kind == 'datetime' or parser_types[col] != kind
+            ])
+        try:
+            df = _read_typed_chunks(path, parser_types, chunk_rows, sketch, columns, duplicates)
+            break
+        except (ValueError, TypeError):
+            # The nullable integer reader raises TypeError for fractions
+            if attempt == len(attempts) - 1:
+                raise
+
+    # Datetimes, integers (and any columns demoted above) are converted once, after reading
+    df = apply_column_types(df, {
+        col: kind for col, kind in column_types.items()
+        if kind != 'categorical' and (df[col].dtype == object or kind == 'integer')
+    })
+    if duplicates is not None:
+        duplicates.finish(df)
+    return df
+
+
+def read_excel(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Parse an Excel file and infer types for its text columns"""
+    df = pd.read_excel(path, usecols=columns)
+    text_columns = [col for col in df.columns if df[col].dtype == object]
+    column_types = infer_column_types(df[text_columns].head(INFERENCE_SAMPLE_ROWS))
+    return apply_column_types(df, column_types)
+
+
+@stage('parse')
+def read_dataset(path: str, filename: str, sketch: Optional[DatasetSketch] = None,
+                 columns: Optional[List[str]] = None,
+                 duplicates: Optional[DuplicateTracker] = None) -> pd.DataFrame:
+    """Parse a spooled upload based on its file extension, keeping only `columns` if given.
+
+    CSV rows are fingerprinted into `duplicates` as they are parsed; other
+    formats leave it empty.
+    """
+    if filename.endswith('.csv'):
+        return read_csv_chunked(path, sketch=sketch, columns=columns, duplicates=duplicates)
+    if filename.endswith(('.xlsx', '.xls')):
+        return read_excel(path, columns)
+    if filename.endswith('.parquet'):
+        return read_parquet(path, columns)
+    if filename.endswith(('.feather', '.arrow')):
+        return read_arrow(path, columns)
+    raise ValueError("File must be CSV, Excel, Parquet or Arrow")
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from fastapi.encoders import jsonable_encoder
+from typing import Callable, Dict, Any, Optional
+from uuid import uuid4
+from services.compute import compute
+from services.session_store import SESSION_DIR, SESSION_SHARED
+
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = float(os.environ.get('SMARTCLEAN_JOB_RETENTION_SECONDS', 3600))
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class Job:
+    """State of one background job; `report` is called from the compute thread"""
+
+    def __init__(self, kind: str, session_id: Optional[str], state_dir: Optional[str]):
+        self.id = str(uuid4())
+        self.kind = kind
+        self.session_id = session_id
+        self.status = 'queued'
+        self.progress = 0.0
+        self.step = 0
+        self.total_steps = 0
+        self.message = 'Queued'
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+        self._cancel = threading.Event()
+        self._state_dir = state_dir
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        if self._cancel.is_set():
+            return True
+        if self._state_dir and os.path.exists(os.path.join(self._state_dir, f'{self.id}.cancel')):
+            self._cancel.set()
+        return self._cancel.is_set()
+
+    def report(self, step: int, total_steps: int, message: str):
+        """Record progress; raises JobCancelled if the job should stop"""
+        if self.cancel_requested:
+            raise JobCancelled()
+        self._update(
+            step=step, total_steps=total_steps, message=message,
+            progress=step / total_steps if total_steps else 1.0
+        )
+
+    def _update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.updated_at = time.time()
+            self.version += 1
+            snapshot = self.to_dict()
+        if self._state_dir:
+            path = os.path.join(self._state_dir, f'{self.id}.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'session_id': self.session_id,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'step': self.step,
+            'total_steps': self.total_steps,
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'version': self.version,
+        }
+
+
+class JobManager:
+    """Runs long operations on the compute executor and tracks their progress.
+
+    In shared session mode job state is mirrored to JSON files next to the
+    sessions, so any worker can report on or cancel any job.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._jobs: Dict[str, Job] = {}
+
+    def start(self, kind: str, fn: Callable, *args, session_id: Optional[str] = None) -> Job:
+        """Queue `fn(job, *args)` on the compute executor and return its job immediately.
+
+        Raises `ComputeQueueFull` straight away when the executor is saturated.
+        """
+        self._forget_finished()
+        job = Job(kind, session_id, self.state_dir)
+
+        def guarded():
+            # Terminal states are recorded on the compute thread, so jobs
+            # finish even if the event loop that started them has gone away
+            try:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                job._update(status='running', message='Running')
+                result = fn(job, *args)
+                job._update(status='completed', progress=1.0, message='Completed',
+                            result=jsonable_encoder(result))
+            except JobCancelled:
+                job._update(status='cancelled', message='Cancelled')
+            except Exception as e:
+                job._update(status='failed', message='Failed', error=getattr(e, 'detail', None) or str(e))
+
+        self._jobs[job.id] = job
+        job._update()
+        try:
+            compute.submit(guarded)
+        except Exception:
+            del self._jobs[job.id]
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self._jobs:
+            return self._jobs[job_id].to_dict()
+        if self.state_dir:
+            path = os.path.join(self.state_dir, f'{job_id}.json')
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; the job stops at its next progress report"""
+        state = self.get(job_id)
+        if state is None:
+            return False
+        if state['status'] in TERMINAL_STATUSES:
+            return True
+        if job_id in self._jobs:
+            self._jobs[job_id]._cancel.set()
+        if self.state_dir:
+            open(os.path.join(self.state_dir, f'{job_id}.cancel'), 'w').close()
+        return True
+
+    def _forget_finished(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.status in TERMINAL_STATUSES and job.updated_at < cutoff:
+                del self._jobs[job_id]
+                if self.state_dir:
+                    for suffix in ('.json', '.cancel'):
+                        path = os.path.join(self.state_dir, job_id + suffix)
+                        if os.path.exists(path):
+                            os.remove(path)
+
+
+# Shared job manager used by all routes
+jobs = JobManager(os.path.join(SESSION_DIR, 'jobs') if SESSION_SHARED else None)
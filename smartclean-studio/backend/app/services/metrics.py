@@ -0,0 +1,218 @@
+import bisect
+import contextvars
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Also record each stage's peak traced memory. tracemalloc is process-wide and
+# slows allocation-heavy code, so this is meant for diagnosis rather than always-on use
+TRACE_MEMORY = os.environ.get('SMARTCLEAN_TRACE_MEMORY', '0') == '1'
+
+# Histogram buckets for stage and request durations, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Histogram buckets for stage peak memory, in bytes (1 MiB to 16 GiB)
+MEMORY_BUCKETS = tuple(float(2 ** power) for power in range(20, 35, 2))
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _le(bound: float) -> str:
+    return 'le="+Inf"' if math.isinf(bound) else f'le="{bound:g}"'
+
+
+class Histogram:
+    """Prometheus histogram with one series per combination of label values"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        """Exposition lines for every series, with cumulative bucket counts"""
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total, count)
+                              for labels, (counts, total, count) in self._series.items())
+
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, counts, total, count in snapshot:
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{",".join(pairs + [_le(bound)])}}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{",".join(pairs + [_le(math.inf)])}}} {count}')
+            suffix = f'{{{",".join(pairs)}}}' if pairs else ''
+            lines.append(f'{self.name}_sum{suffix} {_number(total)}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+class Breakdown:
+    """Calls, time and peak traced memory per stage within one request.
+
+    Stages nest (a 'parse' stage contains its 'parse.infer_types'), and
+    each stage's time includes the stages inside it.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, peak_bytes: Optional[int] = None):
+        with self._lock:
+            entry = self._stages.setdefault(name, [0, 0.0, None])
+            entry[0] += 1
+            entry[1] += seconds
+            if peak_bytes is not None:
+                entry[2] = max(entry[2] or 0, peak_bytes)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Stages in the order they first ran"""
+        with self._lock:
+            items = [(name, list(entry)) for name, entry in self._stages.items()]
+        breakdown = []
+        for name, (calls, seconds, peak_bytes) in items:
+            stage = {'stage': name, 'calls': calls, 'time_ms': round(seconds * 1000, 2)}
+            if peak_bytes is not None:
+                stage['peak_memory_mb'] = round(peak_bytes / 2 ** 20, 2)
+            breakdown.append(stage)
+        return breakdown
+
+
+STAGE_SECONDS = Histogram(
+    'smartclean_stage_duration_seconds', 'Time spent in each pipeline stage', ('stage',), DURATION_BUCKETS
+)
+STAGE_PEAK_MEMORY = Histogram(
+    'smartclean_stage_peak_memory_bytes', 'Peak traced memory above the starting allocation of each pipeline stage',
+    ('stage',), MEMORY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'smartclean_http_request_duration_seconds', 'Time until the response headers of each request',
+    ('method', 'route', 'status'), DURATION_BUCKETS
+)
+
+# Breakdown of the request being handled, if one is being collected
+_breakdown: contextvars.ContextVar[Optional[Breakdown]] = contextvars.ContextVar('breakdown', default=None)
+
+# [allocation at the start, highest peak seen] of the innermost stage tracing memory
+_traced_stage: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar('traced_stage', default=None)
+
+
+def record_stage(name: str, seconds: float, peak_bytes: Optional[int] = None):
+    """Add one run of a stage to the histograms and the current request's breakdown"""
+    STAGE_SECONDS.observe(seconds, name)
+    if peak_bytes is not None:
+        STAGE_PEAK_MEMORY.observe(peak_bytes, name)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.add(name, seconds, peak_bytes)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block (or, as a decorator, each call of a function) as pipeline stage `name`"""
+    tracing = TRACE_MEMORY and tracemalloc.is_tracing()
+    if tracing:
+        # The peak is global, so fold the enclosing stage's peak so far into it before resetting
+        parent = _traced_stage.get()
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent[1] = max(parent[1], peak)
+        tracemalloc.reset_peak()
+        traced = [current, current]
+        token = _traced_stage.set(traced)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak_bytes = None
+        if tracing:
+            traced[1] = max(traced[1], tracemalloc.get_traced_memory()[1])
+            _traced_stage.reset(token)
+            if parent is not None:
+                parent[1] = max(parent[1], traced[1])
+            peak_bytes = traced[1] - traced[0]
+        record_stage(name, seconds, peak_bytes)
+
+
+def timed_iter(name: str, chunks: Iterable[Any]) -> Iterator[Any]:
+    """Pass a lazily produced stream through, recording the time spent producing it as one stage run"""
+    iterator = iter(chunks)
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield chunk
+    finally:
+        record_stage(name, seconds)
+
+
+@contextmanager
+def collect_breakdown() -> Iterator[Breakdown]:
+    """Collect the stages run inside the block, including on compute threads it submits to"""
+    breakdown = Breakdown()
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def render_metrics(gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """Every histogram in the Prometheus text format, plus numeric component stats as gauges.
+
+    `gauges` maps a component name to its stats dict; each numeric value
+    is exposed as `smartclean_<component>_<key>`.
+    """
+    lines = []
+    for histogram in (STAGE_SECONDS, STAGE_PEAK_MEMORY, REQUEST_SECONDS):
+        lines.extend(histogram.render())
+    for component, stats in (gauges or {}).items():
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f'smartclean_{component}_{key}'
+            lines.extend([f'# TYPE {name} gauge', f'{name} {_number(value)}'])
+    return '\n'.join(lines) + '\n'
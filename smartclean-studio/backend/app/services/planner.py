@@ -0,0 +1,186 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, FrozenSet, Tuple
+from services.duplicates import KEEP_OPTIONS
+from services.fuzzy import FUZZY_THRESHOLD, valid_threshold
+
+# Token for the pending row selection in read/write sets
+ROW_MASK = '<rows>'
+
+# Token for every column, read by steps that compare whole rows
+ALL_COLUMNS = '<all columns>'
+
+
+@dataclass
+class PlanStep:
+    """One cleaning operation with the data it reads and writes"""
+    index: int
+    operation: str
+    column: str
+    parameters: Dict[str, Any]
+    kind: str  # 'filter', 'transform', 'rename' or 'noop'
+    statistics: Tuple[str, ...] = ()
+    reads: FrozenSet[str] = frozenset()
+    writes: FrozenSet[str] = frozenset()
+    target: str = ''
+    stage: int = 0
+
+    def describe(self) -> str:
+        """Short description of the step for `CleaningPlan.explain`"""
+        strategy = self.parameters.get('strategy')
+        if self.kind == 'filter' and self.operation == 'impute_missing':
+            return f"keep rows where '{self.column}' is present"
+        if self.operation == 'remove_duplicates':
+            subset = self.parameters.get('subset')
+            over = f" of {', '.join(repr(col) for col in subset)}" if subset else ''
+            return f"keep the {self.parameters.get('keep', 'first')} of each set of rows with equal values{over}"
+        if self.operation == 'merge_near_duplicates':
+            columns = ', '.join(repr(col) for col in self.parameters.get('columns') or [self.column])
+            return f"merge near-duplicate values of {columns} into their most frequent spelling"
+        if self.kind == 'filter':
+            return f"keep rows where '{self.column}' is within the IQR fences"
+        if self.operation == 'impute_missing':
+            return f"fill '{self.column}' with its {strategy}"
+        if self.operation == 'handle_outliers':
+            return f"clip '{self.column}' to the IQR fences"
+        if self.operation == 'group_rare_categories':
+            return f"group rare values of '{self.column}'"
+        if self.operation == 'standardize_column':
+            return f"rename '{self.column}' to '{self.target}' and normalize its text"
+        if self.operation == 'normalize_values':
+            return f"scale '{self.column}' ({self.parameters.get('method', 'minmax')})"
+        return f"{self.operation} on '{self.column}' has no effect"
+
+
+@dataclass
+class CleaningPlan:
+    """Operations grouped into stages that can each run in one sweep.
+
+    Within a stage no step reads anything an earlier step of the same
+    stage writes, so the executor can compute every statistic of the
+    stage in one batch, then fold all filters into the row mask, then
+    replace the transformed columns. Rows are only selected once, after
+    the last stage.
+    """
+    steps: List[PlanStep]
+    stages: List[List[PlanStep]] = field(default_factory=list)
+
+    def explain(self) -> str:
+        """Human-readable description of the optimized plan"""
+        filters = sum(step.kind == 'filter' for step in self.steps)
+        lines = [f"Cleaning plan: {len(self.steps)} operations in {len(self.stages)} stages"]
+        for number, stage in enumerate(self.stages, start=1):
+            lines.append(f"Stage {number}:")
+            statistics = [
+                f"{'/'.join(step.statistics)}({step.column})" for step in stage if step.statistics
+            ]
+            if statistics:
+                lines.append(f"  statistics: {', '.join(statistics)}")
+            for kind in ('filter', 'transform', 'rename', 'noop'):
+                for step in stage:
+                    if step.kind == kind:
+                        lines.append(f"  {kind}: {step.describe()} [op {step.index + 1}]")
+        if filters:
+            lines.append(f"Materialize: {filters} filters applied as one row selection")
+        else:
+            lines.append("Materialize: no rows removed")
+        return '\n'.join(lines)
+
+
+def _compile_step(index: int, operation: Dict[str, Any]) -> PlanStep:
+    """Classify an operation by what it reads, writes and needs computed"""
+    op_type = operation.get('operation')
+    column = operation.get('column')
+    params = operation.get('parameters', {}) or {}
+    step = PlanStep(index=index, operation=op_type, column=column, parameters=params, kind='noop')
+
+    if op_type == 'impute_missing':
+        strategy = params.get('strategy', 'mean')
+        if strategy == 'remove':
+            step.kind = 'filter'
+        elif strategy in ('mean', 'median', 'mode'):
+            step.kind = 'transform'
+            step.statistics = (strategy,)
+    elif op_type == 'handle_outliers':
+        strategy = params.get('strategy', 'cap')
+        if strategy in ('cap', 'remove'):
+            step.kind = 'transform' if strategy == 'cap' else 'filter'
+            if params.get('lower_bound') is None or params.get('upper_bound') is None:
+                step.statistics = ('quartiles',)
+    elif op_type == 'group_rare_categories':
+        step.kind = 'transform'
+        step.statistics = ('value_counts',)
+    elif op_type == 'remove_duplicates':
+        if params.get('keep', 'first') in KEEP_OPTIONS:
+            step.kind = 'filter'
+    elif op_type == 'merge_near_duplicates':
+        if valid_threshold(params.get('threshold', FUZZY_THRESHOLD)):
+            step.kind = 'transform'
+    elif op_type == 'standardize_column':
+        step.kind = 'rename'
+        step.target = str(column).lower().strip().replace(' ', '_')
+    elif op_type == 'normalize_values':
+        method = params.get('method', 'minmax')
+        if method in ('minmax', 'zscore'):
+            step.kind = 'transform'
+            step.statistics = ('min', 'max') if method == 'minmax' else ('mean', 'std')
+
+    if step.kind == 'noop':
+        return step
+
+    reads = {column}
+    if op_type == 'remove_duplicates':
+        # Compares the rows still selected on the subset columns (or all of them)
+        reads = set(params.get('subset') or [ALL_COLUMNS]) | {ROW_MASK}
+    elif op_type == 'merge_near_duplicates':
+        # Clusters the rows still selected on the key columns, and rewrites all of them
+        reads = set(params.get('columns') or [column]) | {ROW_MASK}
+    if step.statistics:
+        # Statistics are taken over the rows still selected
+        reads.add(ROW_MASK)
+    if step.kind == 'filter':
+        writes = {ROW_MASK}
+    elif step.kind == 'rename':
+        reads.add(step.target)
+        writes = {column, step.target}
+    elif op_type == 'merge_near_duplicates':
+        writes = reads - {ROW_MASK}
+    else:
+        writes = {column}
+    step.reads = frozenset(reads)
+    step.writes = frozenset(writes)
+    return step
+
+
+def _overlaps(left: FrozenSet[str], right: FrozenSet[str]) -> bool:
+    """Whether two read/write sets share anything, with ALL_COLUMNS matching any column"""
+    if left & right:
+        return True
+    return ((ALL_COLUMNS in left and bool(right - {ROW_MASK}))
+            or (ALL_COLUMNS in right and bool(left - {ROW_MASK})))
+
+
+def compile_plan(operations: List[Dict[str, Any]], ordered: bool = False) -> CleaningPlan:
+    """Compile cleaning operations into a staged plan with the same result as running them in order.
+
+    Each step is placed in the earliest stage that comes after every
+    step it depends on (it reads what they write) and no earlier than
+    steps it would overwrite. Independent operations therefore share a
+    stage even when they are far apart in the list. With `ordered`,
+    steps never move ahead of earlier operations, so every stage
+    boundary is also the end of a prefix of the operation list.
+    """
+    steps = [_compile_step(i, op) for i, op in enumerate(operations)]
+
+    for step in steps:
+        if ordered and step.index:
+            step.stage = steps[step.index - 1].stage
+        for previous in steps[:step.index]:
+            if _overlaps(step.reads, previous.writes):
+                step.stage = max(step.stage, previous.stage + 1)
+            elif _overlaps(step.writes, previous.reads | previous.writes):
+                step.stage = max(step.stage, previous.stage)
+
+    stages: List[List[PlanStep]] = [[] for _ in range(max((s.stage for s in steps), default=-1) + 1)]
+    for step in steps:
+        stages[step.stage].append(step)
+    return CleaningPlan(steps=steps, stages=stages)
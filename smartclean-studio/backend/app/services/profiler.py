@@ -0,0 +1,162 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+from services.type_inference import is_numeric_column, is_text_column
+from services.compaction import shares_memory
+
+# Number of most frequent values kept per column
+TOP_K = 10
+
+# Categories below this share of rows are considered rare
+RARE_THRESHOLD = 0.01
+
+# How columns are profiled: 'serial', 'thread' or 'process'
+PROFILER_EXECUTOR = os.environ.get('SMARTCLEAN_PROFILER_EXECUTOR', 'thread')
+
+# Worker count for the profiling pools
+PROFILER_WORKERS = int(os.environ.get('SMARTCLEAN_PROFILER_WORKERS', os.cpu_count() or 1))
+
+# Frames smaller than this many cells are always profiled serially
+PARALLEL_MIN_CELLS = int(os.environ.get('SMARTCLEAN_PARALLEL_MIN_CELLS', 200_000))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class ColumnProfile:
+    """Statistics for one column, computed in a single pass"""
+    name: str
+    dtype: str
+    rows: int
+    null_count: int
+    distinct_count: int
+    is_numeric: bool
+    is_text: bool
+    top_values: Dict[Any, int] = field(default_factory=dict)
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    q1: Optional[float] = None
+    q3: Optional[float] = None
+    outlier_count: int = 0
+    rare_count: int = 0
+    rare_rows: int = 0
+
+    @property
+    def non_null_count(self) -> int:
+        return self.rows - self.null_count
+
+    @property
+    def lower_bound(self) -> Optional[float]:
+        """Lower IQR fence (Q1 - 1.5 * IQR)"""
+        if self.q1 is None:
+            return None
+        return self.q1 - 1.5 * (self.q3 - self.q1)
+
+    @property
+    def upper_bound(self) -> Optional[float]:
+        """Upper IQR fence (Q3 + 1.5 * IQR)"""
+        if self.q3 is None:
+            return None
+        return self.q3 + 1.5 * (self.q3 - self.q1)
+
+
+def profile_column(series: pd.Series, rare_threshold: float = RARE_THRESHOLD, top_k: int = TOP_K) -> ColumnProfile:
+    """Profile a column: one hash pass for counts, one sort-based pass for numeric statistics"""
+    rows = len(series)
+    value_counts = series.value_counts(dropna=True)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Categoricals also count categories that no longer occur
+        value_counts = value_counts[value_counts > 0]
+
+    profile = ColumnProfile(
+        name=series.name,
+        dtype=str(series.dtype),
+        rows=rows,
+        null_count=int(rows - value_counts.sum()),
+        distinct_count=int(len(value_counts)),
+        is_numeric=is_numeric_column(series),
+        is_text=is_text_column(series),
+        top_values={key: int(count) for key, count in value_counts.head(top_k).items()},
+    )
+
+    if profile.is_numeric:
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        if valid.size:
+            profile.q1, profile.q3 = (float(q) for q in np.percentile(valid, [25, 75]))
+            profile.min = float(valid.min())
+            profile.max = float(valid.max())
+            profile.mean = float(valid.mean())
+            profile.std = float(valid.std(ddof=1)) if valid.size > 1 else None
+            profile.outlier_count = int(
+                ((valid < profile.lower_bound) | (valid > profile.upper_bound)).sum()
+            )
+
+    if profile.is_text and rows:
+        rare = value_counts[value_counts / rows < rare_threshold]
+        profile.rare_count = int(len(rare))
+        profile.rare_rows = int(rare.sum())
+
+    return profile
+
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Lazily start the shared process pool used for object columns"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+    return _process_pool
+
+
+def profile_frame(df: pd.DataFrame, rare_threshold: float = RARE_THRESHOLD,
+                  executor: Optional[str] = None, max_workers: Optional[int] = None) -> Dict[str, ColumnProfile]:
+    """Profile every column of a dataframe, in parallel when the frame is large enough.
+
+    With the 'thread' executor every column runs on a thread pool; the
+    numeric kernels (hashing, sorting, reductions) release the GIL. The
+    'process' executor additionally sends object columns, whose hashing
+    holds the GIL, to a process pool.
+    """
+    executor = executor or PROFILER_EXECUTOR
+    max_workers = max_workers or PROFILER_WORKERS
+    columns = list(df.columns)
+
+    if (executor == 'serial' or max_workers <= 1 or len(columns) < 2
+            or df.size < PARALLEL_MIN_CELLS):
+        return {col: profile_column(df[col], rare_threshold) for col in columns}
+
+    process_pool = _get_process_pool(max_workers) if executor == 'process' else None
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(columns))) as thread_pool:
+        futures = {}
+        for col in columns:
+            series = df[col]
+            pool = process_pool if process_pool is not None and series.dtype == 'object' else thread_pool
+            futures[col] = pool.submit(profile_column, series, rare_threshold)
+        return {col: futures[col].result() for col in columns}
+
+
+def update_profiles(df: pd.DataFrame, base_df: pd.DataFrame, base_profiles: Optional[Dict[str, ColumnProfile]],
+                    rare_threshold: float = RARE_THRESHOLD, executor: Optional[str] = None) -> Tuple[Dict[str, ColumnProfile], List[str]]:
+    """Profiles for `df` that reuse `base_profiles` for columns unchanged since `base_df`.
+
+    Under copy-on-write a column still sharing data with the base
+    column of the same name holds the same values, so its profile is
+    still valid. Columns that were rewritten or renamed are reprofiled,
+    and every column is when rows were removed. Returns the profiles and
+    the names of the columns that were reprofiled.
+    """
+    if base_profiles is None or len(df) != len(base_df):
+        return profile_frame(df, rare_threshold, executor=executor), list(df.columns)
+
+    changed = [
+        col for col in df.columns
+        if col not in base_profiles or col not in base_df.columns
+        or not shares_memory(df[col], base_df[col])
+    ]
+    fresh = profile_frame(df[changed], rare_threshold, executor=executor) if changed else {}
+    return {col: fresh[col] if col in fresh else base_profiles[col] for col in df.columns}, changed
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models.schemas import CleaningOperation, QualityScore, CleaningResult
 
 
@@ -11,9 +11,14 @@ class Reporter:
         operations_applied: List[CleaningOperation],
         quality_before: QualityScore,
         quality_after: QualityScore,
-        processing_time_ms: float
+        processing_time_ms: float,
+        timings: Optional[Dict[str, List[Dict[str, Any]]]] = None
     ) -> Dict[str, Any]:
-        """Generate comprehensive cleaning report"""
+        """Generate comprehensive cleaning report.
+
+        `timings` maps each request of the session ('upload', 'clean') to
+        its per-stage breakdown (see services.metrics).
+        """
         
         issues_resolved = len(operations_applied)
         improvement_pct = quality_after.overall - quality_before.overall
@@ -49,7 +54,8 @@ class Reporter:
                     'improvement': round(quality_after.accuracy - quality_before.accuracy, 1)
                 }
             },
-            'operations': [Reporter._format_operation(op) for op in operations_applied]
+            'operations': [Reporter._format_operation(op) for op in operations_applied],
+            'performance': timings or {}
         }
 
         return report
@@ -103,5 +109,14 @@ CLEANING OPERATIONS APPLIED
    Rows Affected: {op['rows_affected']}
    Applied By: {op['applied_by']}
 """
+
+        clean_timings = report.get('performance', {}).get('clean')
+        if clean_timings:
+            text += f"""
+CLEANING STAGES
+{'-'*60}
+"""
+            for timing in clean_timings:
+                text += f"{timing['stage']:<40} {timing['calls']:>4}x {timing['time_ms']:>10.1f}ms\n"
         
         return text
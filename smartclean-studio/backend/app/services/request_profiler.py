@@ -0,0 +1,107 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Share of upload and clean requests profiled without being asked (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get('SMARTCLEAN_PROFILE_SAMPLE_RATE', 0))
+
+# Interval between stack samples of a profiled request
+PROFILE_INTERVAL_MS = float(os.environ.get('SMARTCLEAN_PROFILE_INTERVAL_MS', 5))
+
+# Request header that turns profiling on for one request
+PROFILE_HEADER = 'X-SmartClean-Profile'
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """Whether to profile a request, given its profiling header (if any)"""
+    if header_value is not None and header_value.strip().lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _frame_label(code) -> str:
+    """'function (path:first line)', with paths relative to the app or site-packages"""
+    path = code.co_filename
+    if 'site-packages' + os.sep in path:
+        path = path.rsplit('site-packages' + os.sep, 1)[1]
+    elif path.startswith(_APP_DIR + os.sep):
+        path = os.path.relpath(path, _APP_DIR)
+    else:
+        path = os.path.basename(path)
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+@dataclass
+class RequestProfile:
+    """Sampled call stacks of one profiled request"""
+    request: str
+    started_at: str
+    interval_ms: float
+    duration_ms: float = 0.0
+    samples: int = 0
+    # Collapsed stack (root;...;leaf) -> number of samples it was on top
+    stacks: Dict[str, int] = field(default_factory=dict)
+
+    def collapsed(self) -> str:
+        """The stacks in the collapsed format read by flamegraph.pl, speedscope and inferno"""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+class StackSampler:
+    """Samples the calling thread's stack on a background thread while the block runs.
+
+    Only frames from the one that entered the block inward are kept, so
+    the stacks start at the profiled function rather than at the thread
+    pool machinery above it.
+    """
+
+    def __init__(self, request: str, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.profile = RequestProfile(
+            request=request, started_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            interval_ms=interval_ms
+        )
+        self._interval = interval_ms / 1000
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+
+    def __enter__(self) -> RequestProfile:
+        self._target = threading.get_ident()
+        self._root = sys._getframe(1)
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self.profile
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._root = None
+        self.profile.duration_ms = round((time.perf_counter() - self._start) * 1000, 1)
+        self.profile.samples = sum(self._stacks.values())
+        self.profile.stacks = dict(self._stacks)
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                stack.append(label)
+                if frame is self._root:
+                    break
+                frame = frame.f_back
+            if stack:
+                self._stacks[';'.join(reversed(stack))] += 1
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+from services.session_store import estimate_frame_nbytes
+from services.compaction import shares_memory
+
+# Memory budget for cached intermediate cleaning results
+RESULT_CACHE_MB = float(os.environ.get('SMARTCLEAN_RESULT_CACHE_MB', 512))
+
+
+@dataclass
+class Checkpoint:
+    """Cleaner state after a prefix of operations, before rows are selected"""
+    df: pd.DataFrame
+    keep: Optional[np.ndarray]
+    rows_affected: List[int]
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame's values, index, column names and dtypes"""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def prefix_keys(fingerprint: str, operations: List[Dict[str, Any]]) -> List[str]:
+    """Cache keys for each operation prefix; `keys[k - 1]` identifies the first k operations"""
+    keys = []
+    key = fingerprint
+    for op in operations:
+        key = hashlib.sha256((key + json.dumps(op, sort_keys=True, default=str)).encode()).hexdigest()
+        keys.append(key)
+    return keys
+
+
+class ResultCache:
+    """LRU cache of cleaner checkpoints under a byte budget.
+
+    Checkpoints share unchanged columns with the dataset they were
+    cleaned from (copy-on-write), so each one is charged only for the
+    columns it rewrote; the dataset itself is charged once while any of
+    its checkpoints is cached.
+    """
+
+    def __init__(self, memory_budget_bytes: int = int(RESULT_CACHE_MB * 1024 * 1024)):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries: 'OrderedDict[str, Tuple[Checkpoint, str, int]]' = OrderedDict()
+        self._bases: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.operations_reused = 0
+
+    def lookup(self, keys: List[str]) -> Tuple[int, Optional[Checkpoint]]:
+        """Longest cached prefix of `keys`, as (operation count, checkpoint)"""
+        with self._lock:
+            for count in range(len(keys), 0, -1):
+                entry = self._entries.get(keys[count - 1])
+                if entry is not None:
+                    self._entries.move_to_end(keys[count - 1])
+                    self.hits += 1
+                    self.operations_reused += count
+                    return count, entry[0]
+            self.misses += 1
+            return 0, None
+
+    def store(self, key: str, checkpoint: Checkpoint, base: pd.DataFrame, base_fingerprint: str):
+        """Cache a checkpoint of operations applied to `base`"""
+        nbytes = self._own_nbytes(checkpoint, base)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            if base_fingerprint not in self._bases:
+                self._bases[base_fingerprint] = [estimate_frame_nbytes(base), 0]
+            self._bases[base_fingerprint][1] += 1
+            self._entries[key] = (checkpoint, base_fingerprint, nbytes)
+            while self._entries and self._nbytes() > self.memory_budget_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bases.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._nbytes(),
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'operations_reused': self.operations_reused,
+                'evictions': self.evictions,
+            }
+
+    def _nbytes(self) -> int:
+        return (sum(entry[2] for entry in self._entries.values())
+                + sum(nbytes for nbytes, _ in self._bases.values()))
+
+    def _evict(self, key: str):
+        _, base_fingerprint, _ = self._entries.pop(key)
+        self._bases[base_fingerprint][1] -= 1
+        if not self._bases[base_fingerprint][1]:
+            del self._bases[base_fingerprint]
+        self.evictions += 1
+
+    @staticmethod
+    def _own_nbytes(checkpoint: Checkpoint, base: pd.DataFrame) -> int:
+        """Bytes of the columns a checkpoint does not share with its base frame"""
+        rewritten = [
+            col for col in checkpoint.df.columns
+            if col not in base.columns or not shares_memory(checkpoint.df[col], base[col])
+        ]
+        nbytes = estimate_frame_nbytes(checkpoint.df[rewritten]) if rewritten else 0
+        if checkpoint.keep is not None:
+            nbytes += checkpoint.keep.nbytes
+        return nbytes
+
+
+# Shared cache used by all routes
+result_cache = ResultCache()
@@ -1,20 +1,27 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models.schemas import Issue, IssueType
+from services.type_inference import is_numeric_column
+from services.profiler import ColumnProfile
+from services.duplicates import KEEP_OPTIONS
+from services.fuzzy import FUZZY_THRESHOLD, valid_threshold
 
 
 class RuleEngine:
     """Applies intelligent cleaning rules"""
 
     @staticmethod
-    def generate_auto_cleaning_plan(df: pd.DataFrame, issues: List[Issue]) -> List[Dict[str, Any]]:
+    def generate_auto_cleaning_plan(df: pd.DataFrame, issues: List[Issue],
+                                    profiles: Optional[Dict[str, ColumnProfile]] = None) -> List[Dict[str, Any]]:
         """Generate automatic cleaning operations based on detected issues"""
         operations = []
 
         for issue in issues:
-            if issue.issue_type == IssueType.MISSING_VALUES:
-                operations.append(RuleEngine._handle_missing_values_rule(df, issue))
+            if issue.issue_type == IssueType.DUPLICATES:
+                operations.append(RuleEngine._handle_duplicates_rule(df, issue))
+            elif issue.issue_type == IssueType.MISSING_VALUES:
+                operations.append(RuleEngine._handle_missing_values_rule(df, issue, profiles))
             elif issue.issue_type == IssueType.OUTLIERS:
                 operations.append(RuleEngine._handle_outliers_rule(df, issue))
             elif issue.issue_type == IssueType.RARE_CATEGORIES:
@@ -30,15 +37,26 @@ class RuleEngine:
         return operations
 
     @staticmethod
-    def _handle_missing_values_rule(df: pd.DataFrame, issue: Issue) -> Dict[str, Any]:
+    def _handle_duplicates_rule(df: pd.DataFrame, issue: Issue) -> Dict[str, Any]:
+        """Generate operation for duplicate rows"""
+        return {
+            'column': 'all',
+            'operation': 'remove_duplicates',
+            'parameters': {'keep': 'first'}
+        }
+
+    @staticmethod
+    def _handle_missing_values_rule(df: pd.DataFrame, issue: Issue,
+                                    profiles: Optional[Dict[str, ColumnProfile]] = None) -> Dict[str, Any]:
         """Generate operation for missing values"""
         col = issue.column
         missing_pct = issue.affected_percentage
+        is_numeric = profiles[col].is_numeric if profiles and col in profiles else is_numeric_column(df[col])
 
         # Decide strategy based on percentage
         if missing_pct > 50:
             strategy = 'remove'  # Remove column with >50% missing
-        elif np.issubdtype(df[col].dtype, np.number):
+        elif is_numeric:
             strategy = 'median'  # Use median for numeric (robust to outliers)
         else:
             strategy = 'mode'  # Use mode for categorical
@@ -79,11 +97,23 @@ class RuleEngine:
         }
 
     @staticmethod
-    def validate_operation(operation: Dict[str, Any], df: pd.DataFrame) -> bool:
+    def validate_operation(operation: Dict[str, Any], df: pd.DataFrame,
+                           profiles: Optional[Dict[str, ColumnProfile]] = None) -> bool:
         """Validate if operation is safe to apply"""
         column = operation.get('column')
         op_type = operation.get('operation')
 
+        if op_type == 'remove_duplicates':
+            params = operation.get('parameters') or {}
+            subset = params.get('subset') or []
+            return params.get('keep', 'first') in KEEP_OPTIONS and all(col in df.columns for col in subset)
+
+        if op_type == 'merge_near_duplicates':
+            params = operation.get('parameters') or {}
+            columns = params.get('columns') or [column]
+            return (valid_threshold(params.get('threshold', FUZZY_THRESHOLD))
+                    and all(col in df.columns for col in columns))
+
         if column == 'all':
             return True
 
@@ -91,12 +121,16 @@ class RuleEngine:
             return False
 
         # Add safety checks for specific operations
+        profile = profiles.get(column) if profiles else None
+
         if op_type == 'handle_outliers':
-            if not np.issubdtype(df[column].dtype, np.number):
+            is_numeric = profile.is_numeric if profile else is_numeric_column(df[column])
+            if not is_numeric:
                 return False
 
         if op_type == 'impute_missing':
-            if df[column].isnull().sum() == 0:
+            null_count = profile.null_count if profile else df[column].isnull().sum()
+            if null_count == 0:
                 return False  # No missing values to impute
 
         return True
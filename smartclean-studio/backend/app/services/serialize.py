@@ -0,0 +1,75 @@
+import datetime
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List
+from services.metrics import stage
+
+# Layouts for data previews in API responses: one dict per row, or one list per column
+PREVIEW_ORIENTS = ('records', 'columns')
+
+
+def column_values(series: pd.Series) -> list:
+    """JSON-ready Python values of a column, converted in bulk with missing values as None"""
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy(dtype=object, na_value=None)
+    elif pd.api.types.is_integer_dtype(series.dtype) and not missing.any():
+        values = series.to_numpy(dtype='int64').astype(object)
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype='float64', na_value=np.nan).astype(object)
+    else:
+        # Text, datetimes and anything else are rendered as strings
+        values = series.astype(str).to_numpy(dtype=object)
+    return np.where(missing, None, values).tolist()
+
+
+@stage('serialize.records')
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """One dict per row, built from the bulk-converted columns"""
+    names = list(df.columns)
+    columns = [column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+@stage('serialize.columns')
+def frame_to_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """Column names and one value list per column, without building per-row dicts"""
+    return {
+        'columns': [str(col) for col in df.columns],
+        'data': [column_values(df.iloc[:, i]) for i in range(df.shape[1])],
+    }
+
+
+def frame_to_preview(df: pd.DataFrame, orient: str = 'records'):
+    """Serialize a preview frame in one of `PREVIEW_ORIENTS`"""
+    return frame_to_columns(df) if orient == 'columns' else frame_to_records(df)
+
+
+def _default(obj):
+    """Encode the values orjson does not handle natively"""
+    if isinstance(obj, BaseModel):
+        # Shallow field mapping: orjson encodes the values without pydantic walking them again
+        return dict(obj)
+    if isinstance(obj, (pd.Timestamp, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+@stage('serialize.json')
+def dumps(content: Any) -> bytes:
+    """Encode a response body, including pydantic models, straight to JSON bytes"""
+    return orjson.dumps(
+        content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson, skipping FastAPI's jsonable_encoder pass"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
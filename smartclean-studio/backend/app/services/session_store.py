@@ -0,0 +1,334 @@
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Memory budget for DataFrames held by in-memory sessions
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get('SMARTCLEAN_SESSION_MEMORY_MB', 1024))
+
+# Sessions idle for longer than this are deleted
+SESSION_TTL_SECONDS = float(os.environ.get('SMARTCLEAN_SESSION_TTL_SECONDS', 24 * 3600))
+
+# Where sessions are persisted; must be a shared directory when running several workers
+SESSION_DIR = os.environ.get('SMARTCLEAN_SESSION_DIR') or os.path.join(tempfile.gettempdir(), 'smartclean-sessions')
+
+# Write every change through to disk so all worker processes see it.
+# Enabled automatically when uvicorn runs more than one worker.
+SESSION_SHARED = (
+    os.environ.get('SMARTCLEAN_SESSION_SHARED', '0') == '1'
+    or int(os.environ.get('WEB_CONCURRENCY', '1')) > 1
+)
+
+# Minimum interval between sweeps for expired sessions
+EXPIRY_SWEEP_SECONDS = 60
+
+
+def estimate_frame_nbytes(df: pd.DataFrame, sample_size: int = 1000) -> int:
+    """Estimate the memory held by a frame without a deep scan of object columns"""
+    nbytes = int(df.memory_usage(index=True, deep=False).sum())
+    for col in df.columns:
+        if df[col].dtype == object and len(df):
+            sample = df[col].iloc[:sample_size]
+            nbytes += int(sum(sys.getsizeof(v) for v in sample) / len(sample) * len(df))
+        elif isinstance(df[col].dtype, pd.CategoricalDtype) and len(df[col].cat.categories):
+            categories = df[col].cat.categories
+            sample = categories[:sample_size]
+            nbytes += int(sum(sys.getsizeof(v) for v in sample) / len(sample) * len(categories))
+    return nbytes
+
+
+def write_frame(df: pd.DataFrame, base_path: str) -> str:
+    """Write a frame as an Arrow IPC file, falling back to pickle for columns Arrow cannot hold"""
+    if all(isinstance(col, str) for col in df.columns):
+        path = base_path + '.arrow'
+        try:
+            table = pa.Table.from_pandas(df)
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            return path
+        except (pa.ArrowException, ValueError, TypeError):
+            pass
+    path = base_path + '.pkl'
+    df.to_pickle(path)
+    return path
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Read a frame written by `write_frame`, memory-mapping Arrow files"""
+    if path.endswith('.arrow'):
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas()
+        # Arrow-backed string columns come back Python-backed; rewrap the Arrow data instead
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.StringDtype) and pa.types.is_string(table.schema.field(col).type):
+                df[col] = pd.arrays.ArrowStringArray(table.column(col))
+        return df
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+class SessionStore:
+    """Session dicts kept in memory under a byte budget.
+
+    The least recently used sessions are evicted when the budget is
+    exceeded: DataFrames are written to Arrow IPC files and everything else
+    to a pickled row in a SQLite index. Accessing an evicted session loads it
+    back transparently. Call `save` after mutating a session in place, and
+    `flush` on shutdown so every session survives a restart.
+
+    In shared mode every `__setitem__` and `save` is written through to disk
+    and each row carries a version, so several worker processes (or
+    replicas on a shared volume) can serve the same sessions; the in-memory
+    copy is only a cache that is reloaded when another worker changes it.
+    """
+
+    def __init__(self, directory: str = SESSION_DIR,
+                 memory_budget_bytes: int = int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024),
+                 ttl_seconds: float = SESSION_TTL_SECONDS, sweep_interval: float = EXPIRY_SWEEP_SECONDS,
+                 shared: bool = SESSION_SHARED):
+        self.directory = directory
+        self.memory_budget_bytes = memory_budget_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.shared = shared
+        self._sessions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._last_access: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}
+        self._written: Dict[str, Dict[str, Tuple[pd.DataFrame, str]]] = {}
+        self._last_sweep = 0.0
+        self._lock = threading.RLock()
+        self.spills = 0
+        self.loads = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, 'index.sqlite'), timeout=30, check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'id TEXT PRIMARY KEY, last_access REAL, nbytes INTEGER, frames TEXT, metadata BLOB, '
+            'version INTEGER DEFAULT 0)'
+        )
+        columns = [row[1] for row in self._db.execute('PRAGMA table_info(sessions)')]
+        if 'version' not in columns:
+            self._db.execute('ALTER TABLE sessions ADD COLUMN version INTEGER DEFAULT 0')
+        self._db.commit()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            self._sweep_expired()
+            if session_id in self._sessions and not self.shared:
+                return True
+            return self._index_version(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep_expired()
+            if session_id not in self._sessions or self._is_stale(session_id):
+                self._load(session_id)
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = time.time()
+            if self.shared:
+                self._db.execute(
+                    'UPDATE sessions SET last_access = ? WHERE id = ?',
+                    (self._last_access[session_id], session_id)
+                )
+                self._db.commit()
+            self._enforce_budget()
+            return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, session: Dict[str, Any]):
+        with self._lock:
+            # In shared mode the write replaces the previous version only once it is committed,
+            # so other workers can still open the files of the version they last read
+            if not self.shared:
+                self._drop_persisted(session_id)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = time.time()
+            self._sizes[session_id] = self._session_nbytes(session)
+            if self.shared:
+                self._persist(session_id)
+            self._enforce_budget()
+
+    def __delitem__(self, session_id: str):
+        with self._lock:
+            if session_id not in self:
+                raise KeyError(session_id)
+            self._forget(session_id)
+            self._drop_persisted(session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            persisted = self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+            if self.shared:
+                return persisted
+            return len(self._sessions) + persisted
+
+    def get(self, session_id: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def save(self, session_id: str, session: Optional[Dict[str, Any]] = None):
+        """Re-account (and in shared mode, write through) a session mutated in place.
+
+        Pass the mutated dict when it was held across other store calls: if the
+        session was evicted meanwhile, the dict is registered again in place of
+        the stale copy on disk.
+        """
+        with self._lock:
+            if session is not None and self._sessions.get(session_id) is not session:
+                # Shared mode writes it below as the next version, so workers holding an older one
+                # reload it; otherwise the spilled copy is stale and dropped
+                self._sessions[session_id] = session
+                self._sessions.move_to_end(session_id)
+                self._last_access[session_id] = time.time()
+                if not self.shared:
+                    self._drop_persisted(session_id)
+            if session_id in self._sessions:
+                self._sizes[session_id] = self._session_nbytes(self._sessions[session_id])
+                if self.shared:
+                    self._persist(session_id)
+                self._enforce_budget()
+
+    def flush(self):
+        """Write every in-memory session to disk and drop it from memory"""
+        with self._lock:
+            while self._sessions:
+                self._evict(next(iter(self._sessions)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'shared': self.shared,
+                'in_memory': len(self._sessions),
+                'spilled': len(self) - len(self._sessions),
+                'memory_bytes': sum(self._sizes.values()),
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'spills': self.spills,
+                'loads': self.loads,
+            }
+
+    def _session_nbytes(self, session: Dict[str, Any]) -> int:
+        return sum(estimate_frame_nbytes(v) for v in session.values() if isinstance(v, pd.DataFrame))
+
+    def _enforce_budget(self):
+        # The most recently used session always stays resident
+        while len(self._sessions) > 1 and sum(self._sizes.values()) > self.memory_budget_bytes:
+            self._evict(next(iter(self._sessions)))
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.directory, session_id)
+
+    def _evict(self, session_id: str):
+        if not self.shared:
+            self._persist(session_id)
+            self.spills += 1
+        self._forget(session_id)
+
+    def _persist(self, session_id: str):
+        """Write a session to disk, rewriting only frames that changed since the last write"""
+        session = self._sessions[session_id]
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        version = (self._index_version(session_id) or 0) + 1
+        written = self._written.setdefault(session_id, {})
+
+        frames = {}
+        metadata = {}
+        for key, value in session.items():
+            if not isinstance(value, pd.DataFrame):
+                metadata[key] = value
+            elif key in written and written[key][0] is value:
+                frames[key] = written[key][1]
+            else:
+                frames[key] = write_frame(value, os.path.join(session_dir, f'{key}-{version}'))
+                written[key] = (value, frames[key])
+
+        self._db.execute(
+            'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)',
+            (session_id, self._last_access[session_id], self._sizes[session_id],
+             json.dumps(frames), pickle.dumps(metadata), version)
+        )
+        self._db.commit()
+        self._versions[session_id] = version
+
+        # Files replaced by this write; readers that mapped them keep their pages
+        current = set(frames.values())
+        for name in os.listdir(session_dir):
+            path = os.path.join(session_dir, name)
+            if path not in current:
+                os.remove(path)
+
+    def _load(self, session_id: str):
+        row = self._db.execute(
+            'SELECT last_access, nbytes, frames, metadata, version FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            self._forget(session_id)
+            raise KeyError(session_id)
+        last_access, nbytes, frames, metadata, version = row
+        session = pickle.loads(metadata)
+        written = {}
+        for key, path in json.loads(frames).items():
+            session[key] = read_frame(path)
+            written[key] = (session[key], path)
+
+        if self.shared:
+            self._written[session_id] = written
+            self._versions[session_id] = version
+        else:
+            self._drop_persisted(session_id)
+        self._sessions[session_id] = session
+        self._sizes[session_id] = nbytes
+        self._last_access[session_id] = last_access
+        self.loads += 1
+
+    def _is_stale(self, session_id: str) -> bool:
+        """True when another worker has written a newer version of the session"""
+        return self.shared and self._index_version(session_id) != self._versions.get(session_id)
+
+    def _index_version(self, session_id: str) -> Optional[int]:
+        row = self._db.execute('SELECT version FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _forget(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._versions.pop(session_id, None)
+        self._written.pop(session_id, None)
+
+    def _drop_persisted(self, session_id: str):
+        self._db.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+        self._db.commit()
+        self._written.pop(session_id, None)
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def _sweep_expired(self):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl_seconds
+
+        for session_id in [s for s, t in self._last_access.items() if t < cutoff]:
+            self._forget(session_id)
+        expired = self._db.execute('SELECT id FROM sessions WHERE last_access < ?', (cutoff,)).fetchall()
+        for (session_id,) in expired:
+            self._drop_persisted(session_id)
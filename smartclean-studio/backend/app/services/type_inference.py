@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+from services.metrics import stage
+
+# Number of leading rows sampled to infer column types
+INFERENCE_SAMPLE_ROWS = int(os.environ.get('SMARTCLEAN_INFERENCE_SAMPLE_ROWS', 10_000))
+
+# Tokens the CSV parser reads natively as booleans
+BOOLEAN_TOKENS = {'true', 'false'}
+
+# Reader dtype for each logical column type; datetimes are parsed after reading,
+# and integer columns without gaps become int64 once read (see `coerce_column`)
+READER_DTYPES = {
+    'integer': 'Int64',
+    'numeric': 'float64',
+    'boolean': 'boolean',
+    'datetime': object,
+    'categorical': object,
+}
+
+
+def is_numeric_column(series: pd.Series) -> bool:
+    """True for numeric columns that support arithmetic statistics (excludes booleans)"""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def is_text_column(series: pd.Series) -> bool:
+    """True for text columns, whether held as objects, categoricals or Arrow-backed strings"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.dtype == object
+    return dtype == object or isinstance(dtype, pd.StringDtype)
+
+
+def is_identifier_text(values: pd.Series) -> bool:
+    """True when numeric-looking strings would change as float64: leading zeros or integers beyond 2**53"""
+    stripped = values.str.strip().str.lstrip('+-')
+    if stripped.str.match(r'0\d').any():
+        return True
+    long_integers = stripped[stripped.str.fullmatch(r'\d{16,}')]
+    return any(int(v) != int(float(v)) for v in long_integers)
+
+
+def infer_column_type(values: pd.Series) -> str:
+    """Infer the logical type of a column of strings"""
+    values = values.dropna().astype(str)
+    if values.empty:
+        return 'numeric'
+
+    if not pd.to_numeric(values, errors='coerce').isna().any() and not is_identifier_text(values):
+        return 'integer' if values.str.fullmatch(r'\s*[+-]?\d+\s*').all() else 'numeric'
+
+    if values.str.lower().isin(BOOLEAN_TOKENS).all():
+        return 'boolean'
+
+    if values.str.contains(r'[-/:]', regex=True).all():
+        parsed = pd.to_datetime(values, errors='coerce')
+        if not parsed.isna().any():
+            return 'datetime'
+
+    return 'categorical'
+
+
+@stage('parse.infer_types')
+def infer_column_types(sample: pd.DataFrame) -> Dict[str, str]:
+    """Infer the logical type of every column in a string-typed sample"""
+    return {col: infer_column_type(sample[col]) for col in sample.columns}
+
+
+def reader_dtypes(column_types: Dict[str, str]) -> Dict[str, Any]:
+    """Build the `dtype` map passed to the CSV reader"""
+    return {col: READER_DTYPES[kind] for col, kind in column_types.items()}
+
+
+def integer_column(series: pd.Series) -> pd.Series:
+    """Numbers as int64 when they are all whole, else as float64 (the dtype services compute with for gaps)"""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == 'i':
+        return series
+    numbers = series.astype('float64')
+    if series.isna().any() or (numbers % 1 != 0).any():
+        return numbers
+    return series.astype('int64')
+
+
+def coerce_column(series: pd.Series, kind: str) -> pd.Series:
+    """Convert a column to a logical type, keeping it unchanged if that would lose values"""
+    if kind == 'integer':
+        converted = integer_column(pd.to_numeric(series, errors='coerce'))
+    elif kind == 'numeric':
+        converted = pd.to_numeric(series, errors='coerce')
+    elif kind == 'boolean':
+        lowered = series.astype('string').str.lower()
+        converted = lowered.map({'true': True, 'false': False}).astype('boolean')
+    elif kind == 'datetime':
+        converted = pd.to_datetime(series, errors='coerce')
+    else:
+        return series
+
+    if converted.isna().sum() > series.isna().sum():
+        return series
+    return converted
+
+
+@stage('parse.apply_types')
+def apply_column_types(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """Convert columns of an already-loaded frame to their inferred types"""
+    for col, kind in column_types.items():
+        if kind != 'categorical':
+            df[col] = coerce_column(df[col], kind)
+    return df
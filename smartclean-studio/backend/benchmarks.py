@@ -0,0 +1,311 @@
+"""
+SmartClean Studio - Benchmark Suite
+
+Times and memory-profiles the upload -> analyze -> clean -> download
+pipeline on synthetic datasets, in-process and through the FastAPI app,
+and writes the results to a JSON baseline that later runs compare against.
+
+Run with: python benchmarks.py --rows 10000,100000 --output baseline.json
+Compare:  python benchmarks.py --rows 10000,100000 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+import numpy as np
+import pandas as pd
+
+# Slowdown over the baseline that counts as a regression
+REGRESSION_TOLERANCE = 0.25
+
+# Stages faster than this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.005
+
+# Rows serialized per preview page in the serialization stages
+PREVIEW_PAGE_ROWS = 1000
+
+
+@dataclass
+class Scenario:
+    """Shape of a synthetic dataset"""
+    rows: int = 10_000
+    columns: int = 12
+    null_rate: float = 0.05
+    outlier_rate: float = 0.01
+    cardinality: int = 20
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return (f"{self.rows}x{self.columns}-null{self.null_rate:g}"
+                f"-outlier{self.outlier_rate:g}-card{self.cardinality}")
+
+
+def generate_dataset(scenario: Scenario) -> pd.DataFrame:
+    """Synthetic frame cycling through numeric, integer, categorical, identifier and date columns"""
+    rng = np.random.default_rng(scenario.seed)
+    rows = scenario.rows
+    columns = {}
+    for i in range(scenario.columns):
+        kind = i % 5
+        if kind == 0:
+            values = rng.normal(50, 10, rows)
+            outliers = rng.random(rows) < scenario.outlier_rate
+            values[outliers] += rng.choice([-1, 1], outliers.sum()) * rng.uniform(60, 200, outliers.sum())
+            columns[f'Measure {i}'] = values
+        elif kind == 1:
+            columns[f'count_{i}'] = rng.integers(0, 1000, rows).astype(float)
+        elif kind == 2:
+            labels = np.array([f' Category {k} ' for k in range(scenario.cardinality)], dtype=object)
+            # Skewed so some categories are rare
+            weights = 1 / np.arange(1, scenario.cardinality + 1) ** 1.5
+            columns[f'Segment {i}'] = labels[rng.choice(scenario.cardinality, rows, p=weights / weights.sum())]
+        elif kind == 3:
+            columns[f'id_{i}'] = np.array([f'ID-{k:09d}' for k in rng.permutation(rows)], dtype=object)
+        else:
+            start = np.datetime64('2020-01-01T00:00:00')
+            columns[f'date_{i}'] = start + rng.integers(0, 4 * 365 * 24, rows).astype('timedelta64[h]')
+
+    df = pd.DataFrame(columns)
+    for col in df.columns:
+        missing = rng.random(rows) < scenario.null_rate
+        if missing.any():
+            df[col] = df[col].mask(missing)
+    return df
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Median and best wall time over `repeat` runs, plus peak traced memory of a separate run.
+
+    Peak memory is measured with tracemalloc, which covers Python and
+    numpy allocations but not memory Arrow allocates itself.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        'seconds': statistics.median(timings),
+        'min_seconds': min(timings),
+        'peak_memory_bytes': peak,
+    }
+
+
+def bench_in_process(df: pd.DataFrame, scenario: Scenario, repeat: int, directory: str) -> List[Dict[str, Any]]:
+    """Each pipeline stage called directly, in the order the routes run them"""
+    from services.analyzer import DataAnalyzer
+    from services.cleaner import DataCleaner
+    from services.columnar import write_parquet, write_arrow
+    from services.compaction import compact_frame
+    from services.export import iter_csv, encode_stream, write_excel
+    from services.ingest import read_dataset
+    from services.rule_engine import RuleEngine
+    from services.serialize import frame_to_records, frame_to_columns
+
+    csv_path = os.path.join(directory, 'bench.csv')
+    df.to_csv(csv_path, index=False)
+    size_kb = os.path.getsize(csv_path) / 1024
+
+    loaded = read_dataset(csv_path, 'bench.csv')
+    compact = compact_frame(loaded)
+    analyzer = DataAnalyzer(compact, 'bench.csv', size_kb)
+    _, issues, _ = analyzer.analyze()
+    profiles = analyzer.get_profiles()
+    operations = RuleEngine.generate_auto_cleaning_plan(compact, issues, profiles)
+    cleaned = compact_frame(DataCleaner(compact).apply_operations(operations))
+    page = cleaned.head(PREVIEW_PAGE_ROWS)
+
+    def export(writer, suffix):
+        path = os.path.join(directory, 'export' + suffix)
+        return lambda: (writer(cleaned, path), os.remove(path))
+
+    stages = {
+        'ingest_csv': lambda: read_dataset(csv_path, 'bench.csv'),
+        'compact': lambda: compact_frame(loaded),
+        'analyze': lambda: DataAnalyzer(compact, 'bench.csv', size_kb).analyze(),
+        'auto_plan': lambda: RuleEngine.generate_auto_cleaning_plan(compact, issues, profiles),
+        'clean': lambda: DataCleaner(compact).apply_operations(operations),
+        'serialize_records': lambda: frame_to_records(page),
+        'serialize_columns': lambda: frame_to_columns(page),
+        'export_csv': lambda: sum(len(chunk) for chunk in iter_csv(cleaned)),
+        'export_csv_gzip': lambda: sum(len(chunk) for chunk in encode_stream(iter_csv(cleaned), 'gzip')),
+        'export_excel': export(write_excel, '.xlsx'),
+        'export_parquet': export(write_parquet, '.parquet'),
+        'export_arrow': export(write_arrow, '.arrow'),
+    }
+    return [
+        dict(scenario=scenario.name, mode='in_process', stage=stage, **measure(fn, repeat))
+        for stage, fn in stages.items()
+    ]
+
+
+def bench_api(df: pd.DataFrame, scenario: Scenario, repeat: int) -> List[Dict[str, Any]]:
+    """The same pipeline through the FastAPI app, including routing and JSON encoding"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.result_cache import result_cache
+
+    client = TestClient(app)
+    body = df.to_csv(index=False).encode('utf-8')
+
+    def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:200]}")
+        return response
+
+    def upload():
+        return check(client.post('/api/upload', files={'file': ('bench.csv', body, 'text/csv')})).json()
+
+    session_id = upload()['session_id']
+    configure = {'session_id': session_id, 'auto_clean': True, 'operations': []}
+    check(client.post('/api/configure', json=configure))
+
+    def clean():
+        # Cold runs: cached cleaning prefixes would otherwise answer every repeat
+        result_cache.clear()
+        return check(client.post(f'/api/clean?session_id={session_id}'))
+
+    clean()
+    stages = {
+        'api_upload': upload,
+        'api_configure': lambda: check(client.post('/api/configure', json=configure)),
+        'api_clean': clean,
+        'api_preview': lambda: check(client.get(f'/api/preview/{session_id}?limit={PREVIEW_PAGE_ROWS}')),
+        'api_preview_columns': lambda: check(
+            client.get(f'/api/preview/{session_id}?limit={PREVIEW_PAGE_ROWS}&orient=columns')
+        ),
+    }
+    for fmt in ('csv', 'excel', 'parquet', 'arrow'):
+        stages[f'api_download_{fmt}'] = lambda fmt=fmt: check(client.post(f'/api/download/{session_id}/{fmt}'))
+    return [
+        dict(scenario=scenario.name, mode='api', stage=stage, **measure(fn, repeat))
+        for stage, fn in stages.items()
+    ]
+
+
+def run_benchmarks(scenarios: List[Scenario], repeat: int = 3, api: bool = True,
+                   progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Benchmark every scenario and return a report in the baseline format"""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scenario in scenarios:
+            if progress:
+                progress(f"Benchmarking {scenario.name}")
+            df = generate_dataset(scenario)
+            results.extend(bench_in_process(df, scenario, repeat, directory))
+            if api:
+                results.extend(bench_api(df, scenario, repeat))
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+        },
+        'scenarios': [dict(asdict(s), name=s.name) for s in scenarios],
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Descriptions of the stages that got slower than the baseline by more than `tolerance`"""
+    previous = {(r['scenario'], r['mode'], r['stage']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['scenario'], result['mode'], result['stage']))
+        if before is None or before['seconds'] < MIN_COMPARABLE_SECONDS:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{result['scenario']} {result['mode']} {result['stage']}: "
+                f"{before['seconds'] * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'scenario':<42} {'mode':<10} {'stage':<22} {'median ms':>10} {'peak MB':>9}"]
+    for r in report['results']:
+        lines.append(
+            f"{r['scenario']:<42} {r['mode']:<10} {r['stage']:<22} "
+            f"{r['seconds'] * 1000:>10.1f} {r['peak_memory_bytes'] / 2 ** 20:>9.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def _floats(value: str) -> List[float]:
+    return [float(v) for v in value.split(',')]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='10000', help="comma-separated row counts")
+    parser.add_argument('--columns', default='12', help="comma-separated column counts")
+    parser.add_argument('--null-rate', default='0.05', help="comma-separated shares of missing values")
+    parser.add_argument('--outlier-rate', default='0.01', help="comma-separated shares of outliers in measures")
+    parser.add_argument('--cardinality', default='20', help="comma-separated distinct values per category column")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage")
+    parser.add_argument('--no-api', action='store_true', help="skip the FastAPI benchmarks")
+    parser.add_argument('--output', help="write the report to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args(argv)
+    # Parser fallbacks and framework deprecations would drown out the report
+    warnings.simplefilter('ignore', (UserWarning, DeprecationWarning))
+
+    scenarios = [
+        Scenario(rows=int(rows), columns=int(columns), null_rate=null_rate,
+                 outlier_rate=outlier_rate, cardinality=int(cardinality))
+        for rows in _floats(args.rows)
+        for columns in _floats(args.columns)
+        for null_rate in _floats(args.null_rate)
+        for outlier_rate in _floats(args.outlier_rate)
+        for cardinality in _floats(args.cardinality)
+    ]
+    report = run_benchmarks(scenarios, repeat=args.repeat, api=not args.no_api, progress=print)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.tolerance:.0%}:")
+            print('\n'.join(regressions))
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -96,6 +96,963 @@ def test_data_cleaner():
     # Check that no values are NaN after cleaning
     assert cleaned_df['A'].isna().sum() == 0
 
+def test_chunked_csv_ingestion():
+    """Test that chunked CSV parsing matches a single-pass read"""
+    from app.services.ingest import read_csv_chunked
+    import pandas as pd
+    import tempfile
+    import os
+
+    df = pd.DataFrame({
+        'A': range(25),
+        'B': [1.5, None, 3.0, 4.5, 5.0] * 5
+    })
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        df.to_csv(f, index=False)
+        path = f.name
+
+    try:
+        result = read_csv_chunked(path, chunk_rows=7)
+    finally:
+        os.remove(path)
+
+    assert len(result) == 25
+    assert list(result.index) == list(range(25))
+    assert result['A'].sum() == df['A'].sum()
+    assert result['B'].isna().sum() == 5
+
+def test_chunked_csv_peak_memory():
+    """Test that joining CSV chunks does not hold a second copy of the frame"""
+    from app.services.ingest import read_csv_chunked
+    import numpy as np
+    import pandas as pd
+    import tempfile
+    import tracemalloc
+    import os
+
+    df = pd.DataFrame({f'x{i}': np.arange(200_000) / 7 for i in range(8)})
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        df.to_csv(f, index=False)
+        path = f.name
+
+    try:
+        tracemalloc.start()
+        result = read_csv_chunked(path, chunk_rows=20_000)
+        size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        os.remove(path)
+
+    assert result.shape == df.shape
+    assert peak < 1.5 * size
+
+def test_type_inference_keeps_text_columns():
+    """Test that CSV type inference types numeric columns and keeps text values"""
+    from app.services.ingest import read_csv_chunked
+    import pandas as pd
+    import tempfile
+    import os
+
+    content = (
+        "id,name,joined,active,zip,account\n"
+        "1,alice,2021-01-05,true,02134,9007199254740993\n"
+        "2,bob,2021-02-11,False,10001,12\n"
+        "3,,2021-03-20,,94105,\n"
+        "4,dave,2021-04-02,TRUE,00501,7\n"
+    )
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write(content)
+        path = f.name
+
+    try:
+        result = read_csv_chunked(path, chunk_rows=2)
+    finally:
+        os.remove(path)
+
+    assert str(result['id'].dtype) == 'int64'
+    assert list(result['name'].dropna()) == ['alice', 'bob', 'dave']
+    assert pd.api.types.is_datetime64_any_dtype(result['joined'])
+    assert str(result['active'].dtype) == 'boolean'
+    assert result['active'].isna().sum() == 1
+    # Digits that float64 would not keep as written stay text
+    assert list(result['zip']) == ['02134', '10001', '94105', '00501']
+    assert result['account'].iloc[0] == '9007199254740993'
+
+
+def test_type_inference_fallback_on_late_text():
+    """Test that a text value after the inference sample keeps the column as text"""
+    from app.services import ingest
+    import tempfile
+    import os
+
+    rows = "\n".join(str(i) for i in range(10))
+    content = "code\n" + rows + "\nA-17\n"
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write(content)
+        path = f.name
+
+    original_sample = ingest.INFERENCE_SAMPLE_ROWS
+    ingest.INFERENCE_SAMPLE_ROWS = 5
+    try:
+        result = ingest.read_csv_chunked(path, chunk_rows=4)
+    finally:
+        ingest.INFERENCE_SAMPLE_ROWS = original_sample
+        os.remove(path)
+
+    assert result['code'].dtype == object
+    assert result['code'].iloc[-1] == 'A-17'
+    assert result['code'].isna().sum() == 0
+
+def test_integer_columns_read_as_integers():
+    """Test that whole-number columns keep integer values, falling back to floats for a late fraction"""
+    from app.services import ingest
+    import tempfile
+    import os
+
+    rows = "\n".join(f"{i},{i * 10},{'' if i == 3 else i}" for i in range(10))
+    content = "id,qty,score\n" + rows + "\n10,2.5,7\n"
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write(content)
+        path = f.name
+
+    original_sample = ingest.INFERENCE_SAMPLE_ROWS
+    ingest.INFERENCE_SAMPLE_ROWS = 5
+    try:
+        result = ingest.read_csv_chunked(path, chunk_rows=4)
+    finally:
+        ingest.INFERENCE_SAMPLE_ROWS = original_sample
+        os.remove(path)
+
+    assert str(result['id'].dtype) == 'int64'
+    assert str(result['qty'].dtype) == 'float64' and result['qty'].iloc[-1] == 2.5
+    # Gaps are held as NaN, in the float dtype cleaning computes with
+    assert str(result['score'].dtype) == 'float64' and result['score'].isna().sum() == 1
+
+
+def test_integer_columns_export_without_decimals():
+    """Test that an uploaded integer column is downloaded as 1, not 1.0"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    body = 'id,qty,name\n' + ''.join(f'{i},{i * 10},{"abc"[i % 3]}\n' for i in range(1, 21))
+    session_id = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')}).json()['session_id']
+    client.post('/api/configure', json={'session_id': session_id, 'auto_clean': False, 'operations': []})
+    assert client.post(f'/api/clean?session_id={session_id}').status_code == 200
+
+    lines = client.post(f'/api/download/{session_id}/csv').text.splitlines()
+    assert lines[:3] == ['id,qty,name', '1,10,b', '2,20,c']
+
+
+def test_column_profile_matches_pandas():
+    """Test that the single-pass column profile matches per-metric pandas calls"""
+    from app.services.profiler import profile_column
+    import pandas as pd
+
+    values = pd.Series([1, 2, 3, None, 5, 6, 7, 8, 9, 100], name='v')
+    profile = profile_column(values)
+
+    assert profile.null_count == 1
+    assert profile.distinct_count == values.nunique()
+    assert profile.q1 == values.quantile(0.25)
+    assert profile.q3 == values.quantile(0.75)
+    assert abs(profile.std - values.std()) < 1e-9
+    assert profile.outlier_count == 1
+
+    labels = pd.Series(['a'] * 150 + ['b'] * 50 + ['c'], name='labels')
+    profile = profile_column(labels)
+    assert profile.is_text
+    assert profile.top_values == {'a': 150, 'b': 50, 'c': 1}
+    assert profile.rare_count == 1
+    assert profile.rare_rows == 1
+
+def test_parallel_profiling_matches_serial():
+    """Test that thread and process profiling give the same result as serial"""
+    from app.services import profiler
+    import pandas as pd
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'a': rng.normal(size=2000),
+        'b': rng.integers(0, 50, size=2000).astype(float),
+        'c': rng.choice(['x', 'y', 'z', 'rare'], size=2000, p=[0.4, 0.4, 0.195, 0.005]),
+    })
+
+    serial = profiler.profile_frame(df, executor='serial')
+
+    original_min_cells = profiler.PARALLEL_MIN_CELLS
+    profiler.PARALLEL_MIN_CELLS = 0
+    try:
+        for executor in ('thread', 'process'):
+            parallel = profiler.profile_frame(df, executor=executor, max_workers=2)
+            for col in df.columns:
+                assert parallel[col] == serial[col]
+    finally:
+        profiler.PARALLEL_MIN_CELLS = original_min_cells
+
+def test_sketches_within_error_bounds():
+    """Test that merged chunk sketches approximate exact column statistics"""
+    from app.services.sketches import ColumnSketch
+    import pandas as pd
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    values = pd.Series(rng.normal(50, 10, size=100_000), name='v')
+    exact_q1, exact_q3 = values.quantile(0.25), values.quantile(0.75)
+
+    left, right = ColumnSketch(), ColumnSketch()
+    left.update(values.iloc[:50_000])
+    right.update(values.iloc[50_000:])
+    left.merge(right)
+    profile = left.to_profile(values)
+
+    assert abs(profile.distinct_count - values.nunique()) / values.nunique() < 0.03
+    assert abs((values <= profile.q1).mean() - 0.25) < 0.02
+    assert abs((values <= profile.q3).mean() - 0.75) < 0.02
+    assert abs(profile.mean - values.mean()) < 1e-9
+    assert abs(profile.std - values.std()) < 1e-6
+
+
+def test_approximate_analysis_mode():
+    """Test that approximate analysis detects the same rare categories and missing values"""
+    from app.services.analyzer import DataAnalyzer
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'city': ['NY'] * 300 + ['LA'] * 196 + ['Rome', 'Oslo', 'Lima', None],
+        'score': list(range(499)) + [None]
+    })
+
+    exact = DataAnalyzer(df, 'test.csv', 1.0, mode='exact')._detect_issues()
+    approximate = DataAnalyzer(df, 'test.csv', 1.0, mode='approximate')._detect_issues()
+
+    summarize = lambda issues: sorted((i.column, i.issue_type.value, i.affected_count) for i in issues)
+    assert summarize(approximate) == summarize(exact)
+
+def test_session_store_spills_and_reloads():
+    """Test that sessions over the memory budget spill to disk and reload on access"""
+    from app.services.session_store import SessionStore
+    import pandas as pd
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SessionStore(directory, memory_budget_bytes=1000)
+        first = pd.DataFrame({'a': range(100), 'b': ['x'] * 100})
+        store['one'] = {'df': first, 'filename': 'one.csv'}
+        store['two'] = {'df': pd.DataFrame({'a': range(100)}), 'filename': 'two.csv'}
+
+        assert store.stats()['in_memory'] == 1
+        assert store.stats()['spilled'] == 1
+        assert 'one' in store
+
+        reloaded = store['one']
+        assert reloaded['filename'] == 'one.csv'
+        pd.testing.assert_frame_equal(reloaded['df'], first)
+
+        # A new store on the same directory sees sessions flushed by the old one
+        store.flush()
+        restarted = SessionStore(directory)
+        assert restarted['two']['filename'] == 'two.csv'
+
+
+def test_clean_survives_session_eviction():
+    """Test that a session evicted while it is being cleaned keeps the cleaning results"""
+    from fastapi.testclient import TestClient
+    from unittest import mock
+    from main import app
+    import routes.cleaning
+
+    client = TestClient(app)
+    body = 'Price,City\n' + ''.join(f'{i % 7 if i % 9 else ""},{"AB"[i % 2]}\n' for i in range(60))
+    session_id = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')}).json()['session_id']
+    client.post('/api/configure', json={'session_id': session_id, 'auto_clean': True, 'operations': []})
+
+    update_profiles = routes.cleaning.update_profiles
+
+    def evict_then_rescore(*args):
+        # Another request spilling every session to disk mid-clean
+        routes.cleaning.sessions.flush()
+        return update_profiles(*args)
+
+    with mock.patch.object(routes.cleaning, 'update_profiles', side_effect=evict_then_rescore):
+        assert client.post(f'/api/clean?session_id={session_id}').status_code == 200
+
+    response = client.get(f'/api/report/{session_id}')
+    assert response.status_code == 200
+    assert response.json()['operations']
+
+
+def test_session_store_expires_idle_sessions():
+    """Test that idle sessions are dropped after the TTL"""
+    from app.services.session_store import SessionStore
+    import pandas as pd
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SessionStore(directory, ttl_seconds=0, sweep_interval=0)
+        store['old'] = {'df': pd.DataFrame({'a': [1]})}
+        assert 'old' not in store
+
+def test_shared_session_store_across_workers():
+    """Test that two shared stores on one directory see each other's writes"""
+    from app.services.session_store import SessionStore
+    import pandas as pd
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        worker_a = SessionStore(directory, shared=True)
+        worker_b = SessionStore(directory, shared=True)
+
+        worker_a['s1'] = {'df': pd.DataFrame({'a': [1, 2, 3]}), 'cleaning_config': None}
+        assert 's1' in worker_b
+        assert worker_b['s1']['df']['a'].sum() == 6
+
+        session = worker_b['s1']
+        session['cleaning_config'] = 'configured'
+        session['cleaned_df'] = pd.DataFrame({'a': [1, 2]})
+        worker_b.save('s1')
+
+        assert worker_a['s1']['cleaning_config'] == 'configured'
+        assert len(worker_a['s1']['cleaned_df']) == 2
+
+        # A session evicted while held is saved as a newer version than any worker has cached
+        worker_c = SessionStore(directory, shared=True)
+        worker_a['s2'] = {'df': pd.DataFrame({'a': [1, 2]}), 'cleaning_config': None}
+        assert worker_c['s2']['cleaning_config'] is None
+        held = worker_b['s2']
+        worker_b.flush()
+        held['cleaning_config'] = 'configured'
+        held['cleaned_df'] = pd.DataFrame({'a': [1]})
+        worker_b.save('s2', held)
+        assert worker_c['s2']['cleaning_config'] == 'configured'
+        assert len(worker_c['s2']['cleaned_df']) == 1
+
+
+def test_shared_session_overwrite_keeps_previous_version():
+    """Test that replacing a shared session keeps the old files until the new version is committed"""
+    from app.services import session_store
+    from unittest import mock
+    import pandas as pd
+    import tempfile
+    import os
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = session_store.SessionStore(directory, shared=True)
+        reader = session_store.SessionStore(directory, shared=True)
+        writer['s1'] = {'df': pd.DataFrame({'a': [1, 2, 3]})}
+        assert reader['s1']['df']['a'].sum() == 6
+        old_files = set(os.listdir(os.path.join(directory, 's1')))
+
+        write_frame = session_store.write_frame
+
+        def write_while_old_files_exist(*args):
+            assert old_files <= set(os.listdir(os.path.join(directory, 's1')))
+            return write_frame(*args)
+
+        with mock.patch.object(session_store, 'write_frame', side_effect=write_while_old_files_exist):
+            writer['s1'] = {'df': pd.DataFrame({'a': [10, 20]})}
+
+        assert not old_files & set(os.listdir(os.path.join(directory, 's1')))
+        assert reader['s1']['df']['a'].sum() == 30
+
+
+def test_compute_executor_backpressure():
+    """Test that the compute executor rejects work beyond its queue limit"""
+    from app.services.compute import ComputeExecutor, ComputeQueueFull
+    import asyncio
+    import threading
+
+    release = threading.Event()
+
+    async def scenario():
+        executor = ComputeExecutor(max_workers=1, queue_limit=1)
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(executor.run(lambda: 'queued'))
+        await asyncio.sleep(0.05)
+
+        assert executor.stats()['queue_depth'] == 1
+        try:
+            await executor.run(lambda: 'rejected')
+            assert False, "expected ComputeQueueFull"
+        except ComputeQueueFull:
+            pass
+
+        release.set()
+        assert await queued == 'queued'
+        await running
+        stats = executor.stats()
+        assert stats['completed'] == 2
+        assert stats['rejected'] == 1
+
+    asyncio.run(scenario())
+
+def test_background_job_progress_and_cancel():
+    """Test that jobs report per-operation progress and stop when cancelled"""
+    from app.services.jobs import JobManager
+    from app.services.cleaner import DataCleaner
+    import asyncio
+    import threading
+    import pandas as pd
+
+    df = pd.DataFrame({'a': [1.0, None, 3.0], 'b': ['x', 'y', None]})
+    operations = [
+        {'column': 'a', 'operation': 'impute_missing', 'parameters': {'strategy': 'mean'}},
+        {'column': 'b', 'operation': 'impute_missing', 'parameters': {'strategy': 'mode'}},
+    ]
+    started = threading.Event()
+    release = threading.Event()
+
+    def clean(job):
+        cleaned = DataCleaner(df).apply_operations(operations, progress=job.report)
+        return {'missing': int(cleaned.isnull().sum().sum())}
+
+    def blocked(job):
+        started.set()
+        release.wait()
+        job.report(1, 2, 'never reached')
+
+    async def scenario():
+        manager = JobManager()
+        done = manager.start('clean', clean)
+        while manager.get(done.id)['status'] not in ('completed', 'failed'):
+            await asyncio.sleep(0.01)
+        state = manager.get(done.id)
+        assert state['status'] == 'completed', state['error']
+        assert state['step'] == state['total_steps'] == 2
+        assert state['result'] == {'missing': 0}
+
+        cancelled = manager.start('clean', blocked)
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        assert manager.cancel(cancelled.id)
+        release.set()
+        while manager.get(cancelled.id)['status'] == 'running':
+            await asyncio.sleep(0.01)
+        assert manager.get(cancelled.id)['status'] == 'cancelled'
+        assert manager.get('missing') is None
+
+    asyncio.run(scenario())
+
+def test_cleaner_copies_only_modified_columns():
+    """Test that cleaning leaves the input intact and allocates only the columns it rewrites"""
+    import app.services
+    from app.services.cleaner import DataCleaner
+    import numpy as np
+    import pandas as pd
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200_000, 10)), columns=[f'c{i}' for i in range(10)])
+    df.loc[::10, 'c0'] = np.nan
+    original = df.copy()
+    frame_bytes = df.memory_usage().sum()
+
+    tracemalloc.start()
+    cleaned = DataCleaner(df).apply_operations([
+        {'column': 'c0', 'operation': 'impute_missing', 'parameters': {'strategy': 'mean'}},
+        {'column': 'c1', 'operation': 'handle_outliers', 'parameters': {'strategy': 'cap'}},
+    ])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pd.testing.assert_frame_equal(df, original)
+    assert cleaned['c0'].notna().all()
+    assert peak < 0.5 * frame_bytes
+
+def test_cleaning_plan_matches_sequential_operations():
+    """Test that the staged plan gives the same result as applying operations one by one"""
+    from app.services.cleaner import DataCleaner
+    from app.services.planner import compile_plan
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'A': rng.normal(size=500),
+        'B': rng.normal(size=500),
+        'City Name': rng.choice([' NY', 'la ', 'SF', 'rare'], p=[.4, .4, .19, .01], size=500).astype(object),
+    })
+    df.loc[::7, 'A'] = np.nan
+    df.loc[::50, 'B'] = 40.0
+    operations = [
+        {'column': 'A', 'operation': 'impute_missing', 'parameters': {'strategy': 'remove'}},
+        {'column': 'B', 'operation': 'handle_outliers', 'parameters': {'strategy': 'remove'}},
+        {'column': 'City Name', 'operation': 'group_rare_categories', 'parameters': {'threshold': 0.05}},
+        {'column': 'City Name', 'operation': 'standardize_column', 'parameters': {}},
+        {'column': 'A', 'operation': 'normalize_values', 'parameters': {'method': 'zscore'}},
+    ]
+
+    expected = df
+    expected_rows = []
+    for op in operations:
+        cleaner = DataCleaner(expected)
+        expected = cleaner.apply_operations([op])
+        expected_rows.append(cleaner.get_operations_log()[0].rows_affected)
+
+    cleaner = DataCleaner(df)
+    result = cleaner.apply_operations(operations)
+    pd.testing.assert_frame_equal(result, expected)
+    assert [op.rows_affected for op in cleaner.get_operations_log()] == expected_rows
+
+    plan = compile_plan(operations)
+    assert len(plan.stages) < len(operations)
+    assert 'Stage 1' in plan.explain()
+
+def test_result_cache_resumes_from_changed_operation():
+    """Test that re-cleaning with one changed operation reuses the unchanged prefix"""
+    from app.services.cleaner import DataCleaner
+    from app.services.result_cache import ResultCache
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'A': rng.normal(size=1000), 'B': rng.normal(size=1000), 'C': rng.normal(size=1000)})
+    df.loc[::9, 'A'] = np.nan
+    operations = [
+        {'column': 'A', 'operation': 'impute_missing', 'parameters': {'strategy': 'remove'}},
+        {'column': 'B', 'operation': 'handle_outliers', 'parameters': {'strategy': 'cap'}},
+        {'column': 'B', 'operation': 'normalize_values', 'parameters': {'method': 'minmax'}},
+        {'column': 'C', 'operation': 'normalize_values', 'parameters': {'method': 'minmax'}},
+    ]
+    cache = ResultCache()
+    DataCleaner(df, cache=cache).apply_operations(operations)
+    assert cache.stats()['misses'] == 1
+
+    operations[3] = {'column': 'C', 'operation': 'normalize_values', 'parameters': {'method': 'zscore'}}
+    cleaner = DataCleaner(df, cache=cache)
+    result = cleaner.apply_operations(operations)
+    # Operations 3 and 4 share the last stage, so the deepest checkpoint is after operation 2
+    assert cleaner.operations_reused == 2
+    assert cache.stats()['hits'] == 1
+    pd.testing.assert_frame_equal(result, DataCleaner(df).apply_operations(operations))
+
+    small = ResultCache(memory_budget_bytes=cache.stats()['memory_bytes'] // 2)
+    DataCleaner(df, cache=small).apply_operations(operations)
+    assert small.stats()['evictions'] > 0
+    assert small.stats()['memory_bytes'] <= small.memory_budget_bytes
+
+def test_quality_score_reuses_unchanged_column_profiles():
+    """Test that only cleaned columns are reprofiled and the score matches a full analysis"""
+    from app.services.analyzer import DataAnalyzer, quality_score_from_profiles
+    from app.services.cleaner import DataCleaner
+    from app.services.profiler import profile_frame, update_profiles
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'A': rng.normal(size=300), 'B': rng.normal(size=300), 'C': ['x', 'y', None] * 100})
+    df.loc[::5, 'A'] = np.nan
+    profiles = profile_frame(df, executor='serial')
+
+    cleaned = DataCleaner(df).apply_operations([
+        {'column': 'A', 'operation': 'impute_missing', 'parameters': {'strategy': 'median'}},
+    ])
+    updated, reprofiled = update_profiles(cleaned, df, profiles)
+    assert reprofiled == ['A']
+    assert updated['B'] is profiles['B']
+    expected = DataAnalyzer(cleaned, 'test.csv', 0)._calculate_quality_score()
+    assert quality_score_from_profiles(updated, len(cleaned)) == expected
+
+    filtered = DataCleaner(df).apply_operations([
+        {'column': 'C', 'operation': 'impute_missing', 'parameters': {'strategy': 'remove'}},
+    ])
+    _, reprofiled = update_profiles(filtered, df, profiles)
+    assert reprofiled == ['A', 'B', 'C']
+
+def test_columnar_round_trip():
+    """Test Parquet and Arrow export and projected, typed ingestion"""
+    from app.services.columnar import write_parquet, write_arrow, read_parquet, read_arrow
+    import pyarrow.feather as feather
+    import pandas as pd
+    import tempfile
+    import os
+
+    df = pd.DataFrame({
+        'A': [1.5, None, 3.0, 4.5] * 25,
+        'B': ['x', 'y', None, 'x'] * 25,
+        'C': ['2024-01-0%d' % (i % 9 + 1) for i in range(100)],
+        'D': range(100),
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        for writer, reader, name in ((write_parquet, read_parquet, 'out.parquet'),
+                                     (write_arrow, read_arrow, 'out.arrow')):
+            path = os.path.join(directory, name)
+            writer(df, path)
+            loaded = reader(path, columns=['A', 'B', 'C'])
+            assert list(loaded.columns) == ['A', 'B', 'C']
+            assert loaded['B'].dtype == object
+            assert pd.api.types.is_datetime64_any_dtype(loaded['C'])
+            pd.testing.assert_series_equal(loaded['A'], df['A'])
+
+        schema = feather.read_table(os.path.join(directory, 'out.arrow')).schema
+        assert str(schema.field('B').type).startswith('dictionary')
+
+def test_streamed_csv_export():
+    """Test that batched, compressed CSV streaming reproduces a single-pass export"""
+    from app.services.export import iter_csv, encode_stream, negotiate_encoding
+    import pandas as pd
+    import gzip
+
+    df = pd.DataFrame({'A': [1.5, None, 3.0] * 10, 'B': ['x', None, 'z'] * 10})
+    expected = df.to_csv(index=False, na_rep='N/A').encode('utf-8')
+
+    chunks = list(iter_csv(df, batch_rows=7))
+    assert len(chunks) == 1 + 5
+    assert b''.join(chunks) == expected
+    assert gzip.decompress(b''.join(encode_stream(iter_csv(df, batch_rows=7), 'gzip'))) == expected
+
+    assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+    assert negotiate_encoding('gzip, zstd') == 'zstd'
+    assert negotiate_encoding('identity') is None
+
+def test_excel_export_splits_sheets():
+    """Test that the constant-memory Excel export splits rows across sheets at the row limit"""
+    from app.services.export import write_excel
+    import pandas as pd
+    import tempfile
+    import os
+
+    df = pd.DataFrame({
+        'A': [1.5, None, 3.0] * 5,
+        'B': ['x', None, '=1+1'] * 5,
+        'C': pd.date_range('2024-01-01', periods=15),
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.xlsx')
+        write_excel(df, path, batch_rows=4, max_rows=7)
+        sheets = pd.read_excel(path, sheet_name=None, keep_default_na=False)
+
+    assert list(sheets) == ['Cleaned Data', 'Cleaned Data (2)', 'Cleaned Data (3)']
+    combined = pd.concat(sheets.values(), ignore_index=True)
+    assert len(combined) == 15
+    assert combined['A'].tolist()[:3] == [1.5, 'N/A', 3.0]
+    assert combined['B'].tolist()[2] == '=1+1'
+    assert combined['C'].tolist()[-1] == pd.Timestamp('2024-01-15')
+
+def test_vectorized_preview_serialization():
+    """Test that previews serialize in bulk with missing values as null, in both layouts"""
+    from app.services.serialize import frame_to_records, frame_to_columns, dumps
+    from app.models.schemas import ColumnarData
+    import pandas as pd
+    import numpy as np
+    import json
+
+    df = pd.DataFrame({
+        'A': [1.5, np.nan, 3.0],
+        'B': ['x', None, 'z'],
+        'C': pd.to_datetime(['2024-01-01', None, '2024-01-03']),
+        'D': pd.array([True, None, False], dtype='boolean'),
+        'E': [1, 2, 3],
+    })
+    records = frame_to_records(df)
+    assert records[1] == {'A': None, 'B': None, 'C': None, 'D': None, 'E': 2}
+    assert records[0]['C'] == '2024-01-01' and records[2]['D'] is False
+
+    columns = frame_to_columns(df)
+    assert columns['columns'] == ['A', 'B', 'C', 'D', 'E']
+    assert [dict(zip(columns['columns'], row)) for row in zip(*columns['data'])] == records
+
+    body = json.loads(dumps({'preview': ColumnarData.model_construct(**columns), 'n': np.int64(3)}))
+    assert body == {'preview': columns, 'n': 3}
+
+def test_preview_pages_sorted_and_filtered():
+    """Test that indexed preview pages match pandas sorting and filtering, and cursors continue them"""
+    from app.services.browse import PreviewIndexCache, BrowseQuery, BrowseError, browse, decode_cursor, encode_cursor
+    import pandas as pd
+    import numpy as np
+
+    df = pd.DataFrame({
+        'A': [3.0, np.nan, 1.0, 2.0, 1.0, np.nan, 5.0],
+        'B': ['x', 'y', None, 'x', 'z', 'y', 'x'],
+    })
+    cache = PreviewIndexCache()
+
+    page, matched = browse(cache, 's1', df, BrowseQuery(sort='A'), 0, 4)
+    assert matched == 7
+    assert page.index.tolist() == [2, 4, 3, 0]
+
+    query = BrowseQuery(sort='A', descending=True, filter_column='B', filter_op='eq', filter_value='x')
+    page, matched = browse(cache, 's1', df, query, 0, 2)
+    assert matched == 3
+    assert page.index.tolist() == [6, 0]
+
+    next_query, offset = decode_cursor(encode_cursor(query, 2))
+    page, _ = browse(cache, 's1', df, next_query, offset, 2)
+    assert page.index.tolist() == [3]
+
+    page, matched = browse(cache, 's1', df, BrowseQuery(filter_column='A', filter_op='ge', filter_value='2'), 0, 10)
+    assert page.index.tolist() == [0, 3, 6]
+
+    try:
+        browse(cache, 's1', df, BrowseQuery(sort='missing'), 0, 10)
+        assert False, "Expected BrowseError"
+    except BrowseError:
+        pass
+
+def test_session_compaction_is_lossless():
+    """Test that compact dtypes hold the same values and cleaning them gives the same result"""
+    from app.services.compaction import compact_frame, expand_frame
+    from app.services.cleaner import DataCleaner
+    from app.services.session_store import estimate_frame_nbytes
+    import pandas as pd
+    import numpy as np
+
+    n = 1000
+    df = pd.DataFrame({
+        'small_int': np.arange(n) % 100,
+        'halves': np.where(np.arange(n) % 10 == 0, np.nan, (np.arange(n) % 7) / 2),
+        'counts': np.where(np.arange(n) % 10 == 0, np.nan, np.arange(n) % 7 * 1.0),
+        'whole': np.arange(n) * 1.0,
+        'precise': np.linspace(0, 1, n) / 3,
+        'city': pd.Series(np.where(np.arange(n) % 9 == 0, None, np.array(['Paris', 'Rome', 'Oslo'])[np.arange(n) % 3]), dtype=object),
+        'email': pd.Series([f'user{i}@example.com' for i in range(n)], dtype=object),
+    })
+    compact = compact_frame(df)
+
+    assert compact['small_int'].dtype == np.int8
+    assert compact['halves'].dtype == np.float32
+    # Whole-number floats are held as nullable integers and expand back to float64
+    assert compact['counts'].dtype == pd.Int8Dtype()
+    assert compact['whole'].dtype == pd.Int16Dtype()
+    assert compact['precise'].dtype == np.float64
+    assert isinstance(compact['city'].dtype, pd.CategoricalDtype)
+    assert compact['email'].dtype == pd.StringDtype('pyarrow')
+    assert estimate_frame_nbytes(compact) < estimate_frame_nbytes(df) / 2
+    pd.testing.assert_frame_equal(expand_frame(compact), df)
+
+    operations = [
+        {'column': 'halves', 'operation': 'impute_missing', 'parameters': {'strategy': 'mean'}},
+        {'column': 'counts', 'operation': 'impute_missing', 'parameters': {'strategy': 'mean'}},
+        {'column': 'whole', 'operation': 'handle_outliers', 'parameters': {'strategy': 'cap', 'lower_bound': 10.5, 'upper_bound': 900}},
+        {'column': 'city', 'operation': 'impute_missing', 'parameters': {'strategy': 'mode'}},
+        {'column': 'small_int', 'operation': 'handle_outliers', 'parameters': {'strategy': 'remove', 'lower_bound': 10.5, 'upper_bound': 80}},
+        {'column': 'city', 'operation': 'group_rare_categories', 'parameters': {'threshold': 0.4}},
+    ]
+    expected = DataCleaner(df).apply_operations(operations)
+    result = DataCleaner(compact).apply_operations(operations)
+    pd.testing.assert_frame_equal(expand_frame(compact_frame(result)), expected)
+
+def test_benchmark_harness_runs():
+    """Test that the benchmark suite times every stage and flags slowed-down stages"""
+    from benchmarks import Scenario, run_benchmarks, compare
+
+    report = run_benchmarks([Scenario(rows=200, columns=6)], repeat=1)
+    stages = {(r['mode'], r['stage']) for r in report['results']}
+    assert ('in_process', 'clean') in stages
+    assert ('api', 'api_download_parquet') in stages
+    assert all(r['seconds'] > 0 and r['peak_memory_bytes'] >= 0 for r in report['results'])
+    assert compare(report, report) == []
+
+    baseline = {'results': [dict(r, seconds=max(r['seconds'], 0.01) / 2) for r in report['results']]}
+    slowed = [dict(r, seconds=max(r['seconds'], 0.01)) for r in report['results']]
+    assert len(compare({'results': slowed}, baseline)) == len(slowed)
+
+def test_stage_metrics_and_report_breakdown():
+    """Test that pipeline stages feed the /metrics histograms and the report's per-request breakdown"""
+    from app.services.metrics import Histogram
+    from fastapi.testclient import TestClient
+    from main import app
+
+    histogram = Histogram('demo_seconds', 'Demo', ('stage',), (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, 'x')
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{stage="x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="x",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="x",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="x"} 3' in lines
+
+    client = TestClient(app)
+    body = 'Price,City\n' + ''.join(f'{i % 7 if i % 9 else ""},{"AB"[i % 2] if i % 5 else ""}\n' for i in range(60))
+    session_id = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')}).json()['session_id']
+    client.post('/api/configure', json={'session_id': session_id, 'auto_clean': True, 'operations': []})
+    assert client.post(f'/api/clean?session_id={session_id}').status_code == 200
+
+    performance = client.get(f'/api/report/{session_id}').json()['performance']
+    upload_stages = {timing['stage'] for timing in performance['upload']}
+    clean_stages = {timing['stage'] for timing in performance['clean']}
+    assert {'parse', 'parse.infer_types', 'compact', 'analyze.profiles', 'analyze.issues'} <= upload_stages
+    assert {'clean.statistics', 'clean.impute_missing', 'rescore'} <= clean_stages
+
+    response = client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'smartclean_stage_duration_seconds_bucket{stage="clean.impute_missing",le="+Inf"}' in response.text
+    assert 'route="/api/clean",status="200"' in response.text
+    assert 'smartclean_compute_workers ' in response.text
+
+def test_request_profiling_is_opt_in():
+    """Test that only requests asking for it are profiled, and their stacks come back collapsed"""
+    from app.services.request_profiler import StackSampler
+    from fastapi.testclient import TestClient
+    from main import app
+    import time
+
+    def busy_work():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+
+    with StackSampler('clean', interval_ms=1) as profile:
+        busy_work()
+    assert profile.samples > 10 and profile.duration_ms >= 100
+    assert all(stack.split(';')[0].startswith('test_request_profiling_is_opt_in ') for stack in profile.stacks)
+    assert any('busy_work (' in stack for stack in profile.stacks)
+    line = profile.collapsed().splitlines()[0]
+    assert int(line.rsplit(' ', 1)[1]) >= 1
+
+    client = TestClient(app)
+    body = 'A,B\n' + ''.join(f'{i},{"xy"[i % 2]}\n' for i in range(50))
+    plain = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')}).json()['session_id']
+    assert client.get(f'/api/profile/{plain}').status_code == 404
+
+    profiled = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')},
+                           headers={'X-SmartClean-Profile': '1'}).json()['session_id']
+    response = client.get(f'/api/profile/{profiled}')
+    assert response.status_code == 200
+    assert response.headers['x-profile-request'] == 'upload'
+    assert response.headers['content-type'].startswith('text/plain')
+    assert client.get(f'/api/profile/{profiled}?request=clean').status_code == 404
+
+def test_duplicate_rows_detected_and_removed():
+    """Test that hashed row fingerprints find the same duplicates as pandas, chunk by chunk and in cleaning"""
+    from app.services.duplicates import DuplicateTracker, row_hashes, duplicated
+    from app.services.analyzer import DataAnalyzer
+    from app.services.rule_engine import RuleEngine
+    from app.services.cleaner import DataCleaner
+    from app.services.compaction import compact_frame
+    from app.models.schemas import IssueType
+    import pandas as pd
+    import numpy as np
+
+    df = pd.DataFrame({
+        'price': [1.0, 1.0, np.nan, np.nan, 0.0, -0.0, 2.0, 1.0],
+        'city': ['Paris', 'Paris', None, np.nan, 'Rome', 'Rome', 'Oslo', 'Rome'],
+        'qty': [1, 1, 2, 2, 3, 3, 4, 1],
+    })
+    assert (duplicated(row_hashes(df)) == df.duplicated().to_numpy()).all()
+    assert (duplicated(row_hashes(compact_frame(df)), 'last') == df.duplicated(keep='last').to_numpy()).all()
+
+    tracker = DuplicateTracker()
+    for start in range(0, len(df), 3):
+        tracker.update(df.iloc[start:start + 3])
+    assert tracker.count() == int(df.duplicated().sum()) == 3
+
+    analyzer = DataAnalyzer(df, 'test.csv', 1.0, duplicates=tracker)
+    _, issues, _ = analyzer.analyze()
+    duplicate_issue = next(issue for issue in issues if issue.issue_type == IssueType.DUPLICATES)
+    assert duplicate_issue.affected_count == 3
+    plan = RuleEngine.generate_auto_cleaning_plan(df, issues, analyzer.get_profiles())
+    assert plan[1] == {'column': 'all', 'operation': 'remove_duplicates', 'parameters': {'keep': 'first'}}
+
+    operations = [
+        {'column': 'qty', 'operation': 'handle_outliers', 'parameters': {'strategy': 'remove', 'lower_bound': 1, 'upper_bound': 3}},
+        {'column': 'all', 'operation': 'remove_duplicates', 'parameters': {'keep': 'last', 'subset': ['price', 'qty']}},
+    ]
+    cleaner = DataCleaner(df)
+    result = cleaner.apply_operations(operations)
+    expected = df[df['qty'] <= 3]
+    expected = expected[~expected.duplicated(subset=['price', 'qty'], keep='last')]
+    pd.testing.assert_frame_equal(result, expected)
+    assert cleaner.get_operations_log()[1].rows_affected == 4
+
+
+def test_upload_counts_duplicates_from_parse_fingerprints():
+    """Test that /upload counts duplicate rows from the fingerprints taken while parsing the CSV"""
+    from fastapi.testclient import TestClient
+    from unittest import mock
+    from main import app
+    import services.analyzer
+
+    body = 'id,city,when\n' + ''.join(f'{i % 40},{"xy"[i % 2]},2024-01-{i % 40 % 28 + 1:02d}\n' for i in range(50))
+    client = TestClient(app)
+    # The analyzer only builds its own tracker when the upload's is missing or incomplete
+    with mock.patch.object(services.analyzer, 'DuplicateTracker', side_effect=AssertionError('rehashed')):
+        response = client.post('/api/upload', files={'file': ('data.csv', body, 'text/csv')})
+    assert response.status_code == 200
+    issue = next(issue for issue in response.json()['issues'] if issue['issue_type'] == 'duplicates')
+    assert issue['affected_count'] == 10
+
+
+def test_near_duplicate_values_clustered_and_merged():
+    """Test that MinHash LSH clusters near-duplicate keys and the merge rewrites them to the most frequent spelling"""
+    from app.services.fuzzy import find_near_duplicates, trigram_sets, similarities
+    from app.services.analyzer import DataAnalyzer
+    from app.services.rule_engine import RuleEngine
+    from app.services.cleaner import DataCleaner
+    from app.services.compaction import compact_frame
+    from app.models.schemas import IssueType
+    import pandas as pd
+    import numpy as np
+
+    keys = np.array(['jonathan smith', 'jonathon smith', 'acme corporation', 'acme corporations'], dtype=object)
+    offsets, grams = trigram_sets(keys)
+    assert np.allclose(similarities(offsets, grams, np.array([0, 2]), np.array([1, 3])), [11 / 17, 15 / 18])
+
+    df = pd.DataFrame({
+        'company': ['Acme Inc', 'ACME, Inc.', 'Acme Inc', 'Globex Corporation', 'Globex Corporaton',
+                    'Globex Corporation', 'Initech', None],
+        'amount': [5, 1, 1, 1, 1, 1, 1, 1],
+    })
+    matches = find_near_duplicates(df[['company']])
+    assert matches.clusters == 2
+    assert list(np.flatnonzero(matches.changed)) == [1, 4]
+    assert list(matches.canonical) == [0, 0, 0, 3, 3, 3, -1, -1]
+    plants = pd.DataFrame({'plant': ['Globex Corporation Plant 12', 'Globex Corporation Plant 13',
+                                     'Globex Corporation Plant 12', 'Globex Corporaton Plant 12']})
+    assert list(find_near_duplicates(plants).changed) == [False, False, False, True]
+
+    # Only columns the user asks for are searched, and merging is suggested rather than automatic
+    _, issues, _ = DataAnalyzer(df, 'test.csv', 1.0).analyze()
+    assert all(issue.issue_type != IssueType.NEAR_DUPLICATES for issue in issues)
+    analyzer = DataAnalyzer(df, 'test.csv', 1.0, fuzzy_columns=['company'])
+    _, issues, _ = analyzer.analyze()
+    issue = next(issue for issue in issues if issue.issue_type == IssueType.NEAR_DUPLICATES)
+    assert issue.column == 'company' and issue.affected_count == 2
+    assert issue.recommended_operation['operation'] == 'merge_near_duplicates'
+    plan = RuleEngine.generate_auto_cleaning_plan(df, issues, analyzer.get_profiles())
+    assert all(op['operation'] != 'merge_near_duplicates' for op in plan)
+
+    merged = ['Acme Inc'] * 3 + ['Globex Corporation'] * 3 + ['Initech', '-']
+    for frame in (df, compact_frame(df)):
+        cleaner = DataCleaner(frame)
+        result = cleaner.apply_operations([{'column': 'company', 'operation': 'merge_near_duplicates', 'parameters': {}}])
+        assert list(result['company'].fillna('-')) == merged
+        assert cleaner.get_operations_log()[0].rows_affected == 2
+
+    # Rows removed by an earlier filter no longer count towards the most frequent spelling
+    cleaner = DataCleaner(df)
+    result = cleaner.apply_operations([
+        {'column': 'amount', 'operation': 'handle_outliers', 'parameters': {'strategy': 'remove', 'lower_bound': 0, 'upper_bound': 2}},
+        {'column': 'company', 'operation': 'merge_near_duplicates', 'parameters': {'threshold': 0.75}},
+    ])
+    assert list(result['company'].fillna('-')) == ['ACME, Inc.', 'ACME, Inc.'] + merged[3:]
+    assert 'merge near-duplicate values' in cleaner.plan.explain()
+    assert not RuleEngine.validate_operation(
+        {'column': 'company', 'operation': 'merge_near_duplicates', 'parameters': {'threshold': 1.5}}, df
+    )
+
+
+def test_categorical_transforms_map_distinct_values():
+    """Test that rare grouping and value standardization transform distinct values and map them back by code"""
+    from app.services.cleaner import DataCleaner
+    import pandas as pd
+    import numpy as np
+
+    labels = [' Paris ', 'ROME', None, ' Paris ', 'Oslo', np.nan, 'ROME', ' Paris ', 'Lima', ' Paris ']
+    df = pd.DataFrame({'City': labels, 'code': [f'ID-{i}' for i in range(10)]})
+    cleaner = DataCleaner(df)
+    result = cleaner.apply_operations([
+        {'column': 'City', 'operation': 'group_rare_categories', 'parameters': {'threshold': 0.15}},
+        {'column': 'code', 'operation': 'group_rare_categories', 'parameters': {'threshold': 0.5}},
+        {'column': 'City', 'operation': 'standardize_column', 'parameters': {}},
+    ])
+    expected = df['City'].replace(['Oslo', 'Lima'], 'Other').str.strip().str.lower()
+    assert list(result['city'].fillna('-')) == list(expected.fillna('-'))
+    assert result['city'].iloc[2] is None and result['city'].iloc[5] is np.nan
+    assert set(result['code']) == {'Other'}
+
 if __name__ == '__main__':
     print("Running SmartClean Studio tests...")
     
@@ -128,5 +1085,169 @@ if __name__ == '__main__':
         print("✓ Data cleaner test passed")
     except Exception as e:
         print(f"✗ Data cleaner test failed: {e}")
+
+    try:
+        test_chunked_csv_ingestion()
+        test_chunked_csv_peak_memory()
+        print("✓ Chunked CSV ingestion test passed")
+    except Exception as e:
+        print(f"✗ Chunked CSV ingestion test failed: {e}")
+
+    try:
+        test_type_inference_keeps_text_columns()
+        test_type_inference_fallback_on_late_text()
+        test_integer_columns_read_as_integers()
+        test_integer_columns_export_without_decimals()
+        print("✓ Type inference tests passed")
+    except Exception as e:
+        print(f"✗ Type inference tests failed: {e}")
+
+    try:
+        test_column_profile_matches_pandas()
+        print("✓ Column profile test passed")
+    except Exception as e:
+        print(f"✗ Column profile test failed: {e}")
+
+    try:
+        test_parallel_profiling_matches_serial()
+        print("✓ Parallel profiling test passed")
+    except Exception as e:
+        print(f"✗ Parallel profiling test failed: {e}")
+
+    try:
+        test_sketches_within_error_bounds()
+        test_approximate_analysis_mode()
+        print("✓ Approximate analysis tests passed")
+    except Exception as e:
+        print(f"✗ Approximate analysis tests failed: {e}")
+
+    try:
+        test_session_store_spills_and_reloads()
+        test_session_store_expires_idle_sessions()
+        test_shared_session_store_across_workers()
+        test_shared_session_overwrite_keeps_previous_version()
+        print("✓ Session store tests passed")
+    except Exception as e:
+        print(f"✗ Session store tests failed: {e}")
+
+    try:
+        test_clean_survives_session_eviction()
+        print("✓ Clean eviction test passed")
+    except Exception as e:
+        print(f"✗ Clean eviction test failed: {e}")
+
+    try:
+        test_compute_executor_backpressure()
+        print("✓ Compute executor test passed")
+    except Exception as e:
+        print(f"✗ Compute executor test failed: {e}")
+
+    try:
+        test_background_job_progress_and_cancel()
+        print("✓ Background job test passed")
+    except Exception as e:
+        print(f"✗ Background job test failed: {e}")
+
+    try:
+        test_cleaner_copies_only_modified_columns()
+        print("✓ Copy-on-write cleaner test passed")
+    except Exception as e:
+        print(f"✗ Copy-on-write cleaner test failed: {e}")
+
+    try:
+        test_cleaning_plan_matches_sequential_operations()
+        print("✓ Cleaning plan test passed")
+    except Exception as e:
+        print(f"✗ Cleaning plan test failed: {e}")
+
+    try:
+        test_result_cache_resumes_from_changed_operation()
+        print("✓ Result cache test passed")
+    except Exception as e:
+        print(f"✗ Result cache test failed: {e}")
+
+    try:
+        test_quality_score_reuses_unchanged_column_profiles()
+        print("✓ Incremental quality score test passed")
+    except Exception as e:
+        print(f"✗ Incremental quality score test failed: {e}")
+
+    try:
+        test_columnar_round_trip()
+        print("✓ Columnar formats test passed")
+    except Exception as e:
+        print(f"✗ Columnar formats test failed: {e}")
+
+    try:
+        test_streamed_csv_export()
+        print("✓ Streamed CSV export test passed")
+    except Exception as e:
+        print(f"✗ Streamed CSV export test failed: {e}")
+
+    try:
+        test_excel_export_splits_sheets()
+        print("✓ Excel export test passed")
+    except Exception as e:
+        print(f"✗ Excel export test failed: {e}")
+
+    try:
+        test_vectorized_preview_serialization()
+        print("✓ Preview serialization test passed")
+    except Exception as e:
+        print(f"✗ Preview serialization test failed: {e}")
+
+    try:
+        test_preview_pages_sorted_and_filtered()
+        print("✓ Preview paging test passed")
+    except Exception as e:
+        print(f"✗ Preview paging test failed: {e}")
+
+    try:
+        test_session_compaction_is_lossless()
+        print("✓ Session compaction test passed")
+    except Exception as e:
+        print(f"✗ Session compaction test failed: {e}")
+
+    try:
+        test_benchmark_harness_runs()
+        print("✓ Benchmark harness test passed")
+    except Exception as e:
+        print(f"✗ Benchmark harness test failed: {e}")
+
+    try:
+        test_stage_metrics_and_report_breakdown()
+        print("✓ Stage metrics test passed")
+    except Exception as e:
+        print(f"✗ Stage metrics test failed: {e}")
+
+    try:
+        test_request_profiling_is_opt_in()
+        print("✓ Request profiling test passed")
+    except Exception as e:
+        print(f"✗ Request profiling test failed: {e}")
+
+    try:
+        test_duplicate_rows_detected_and_removed()
+        print("✓ Duplicate rows test passed")
+    except Exception as e:
+        print(f"✗ Duplicate rows test failed: {e}")
+    
+    try:
+        test_upload_counts_duplicates_from_parse_fingerprints()
+        print("✓ Upload duplicate fingerprints test passed")
+    except Exception as e:
+        print(f"✗ Upload duplicate fingerprints test failed: {e}")
+    
+    try:
+        test_near_duplicate_values_clustered_and_merged()
+        print("✓ Near-duplicate values test passed")
+    except Exception as e:
+        print(f"✗ Near-duplicate values test failed: {e}")
+    
+    try:
+        test_categorical_transforms_map_distinct_values()
+        print("✓ Categorical transforms test passed")
+    except Exception as e:
+        print(f"✗ Categorical transforms test failed: {e}")
     
     print("\nAll tests completed!")
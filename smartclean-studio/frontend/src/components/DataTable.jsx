@@ -1,6 +1,6 @@
 import React from 'react';
 
-export default function DataTable({ data, columns = [] }) {
+export default function DataTable({ data, columns = [], maxRows = 10, sort = null, descending = false, onSort = null }) {
   if (!data || data.length === 0) {
     return (
       <div className="text-center py-8 text-gray-500">
@@ -17,14 +17,18 @@ export default function DataTable({ data, columns = [] }) {
         <thead className="bg-gray-50">
           <tr>
             {cols.map((col) => (
-              <th key={col} className="px-6 py-3 text-left text-xs font-medium text-gray-700 uppercase tracking-wider">
-                {col}
+              <th
+                key={col}
+                onClick={onSort ? () => onSort(col) : undefined}
+                className={`px-6 py-3 text-left text-xs font-medium text-gray-700 uppercase tracking-wider ${onSort ? 'cursor-pointer select-none hover:bg-gray-100' : ''}`}
+              >
+                {col}{sort === col ? (descending ? ' ▼' : ' ▲') : ''}
               </th>
             ))}
           </tr>
         </thead>
         <tbody className="bg-white divide-y divide-gray-200">
-          {data.slice(0, 10).map((row, idx) => (
+          {data.slice(0, maxRows).map((row, idx) => (
             <tr key={idx} className="hover:bg-gray-50">
               {cols.map((col) => (
                 <td key={`${idx}-${col}`} className="px-6 py-4 text-sm text-gray-900">
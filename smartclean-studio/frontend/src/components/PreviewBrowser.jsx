@@ -0,0 +1,139 @@
+import React, { useEffect, useState } from 'react';
+import DataTable from './DataTable';
+import Button from './Button';
+import { getDataPreview } from '../services/api';
+
+const PAGE_SIZE = 50;
+
+const FILTER_OPS = [
+  ['contains', 'contains'],
+  ['eq', '='],
+  ['ne', '≠'],
+  ['lt', '<'],
+  ['le', '≤'],
+  ['gt', '>'],
+  ['ge', '≥'],
+  ['null', 'is empty'],
+  ['notnull', 'is not empty']
+];
+
+// Pages through the cleaned dataset with server-side sorting and filtering
+export default function PreviewBrowser({ sessionId }) {
+  const [query, setQuery] = useState({ sort: null, descending: false, filterColumn: '', filterOp: 'contains', filterValue: '' });
+  const [draft, setDraft] = useState({ filterColumn: '', filterOp: 'contains', filterValue: '' });
+  const [offset, setOffset] = useState(0);
+  const [page, setPage] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    setLoading(true);
+    getDataPreview(sessionId, {
+      limit: PAGE_SIZE,
+      offset,
+      sort: query.sort || undefined,
+      descending: query.descending,
+      filterColumn: query.filterColumn || undefined,
+      filterOp: query.filterOp,
+      filterValue: query.filterValue
+    })
+      .then((data) => {
+        if (!cancelled) {
+          setPage(data);
+          setError(null);
+        }
+      })
+      .catch((err) => {
+        if (!cancelled) setError(err.response?.data?.detail || 'Failed to load data');
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => { cancelled = true; };
+  }, [sessionId, query, offset]);
+
+  const handleSort = (column) => {
+    setQuery((current) => ({
+      ...current,
+      sort: column,
+      descending: current.sort === column ? !current.descending : false
+    }));
+    setOffset(0);
+  };
+
+  const applyFilter = (event) => {
+    event.preventDefault();
+    setQuery((current) => ({ ...current, ...draft }));
+    setOffset(0);
+  };
+
+  const clearFilter = () => {
+    const cleared = { filterColumn: '', filterOp: 'contains', filterValue: '' };
+    setDraft(cleared);
+    setQuery((current) => ({ ...current, ...cleared }));
+    setOffset(0);
+  };
+
+  const columns = page?.columns || [];
+  const matched = page?.matched_rows ?? 0;
+  const needsValue = !['null', 'notnull'].includes(draft.filterOp);
+
+  return (
+    <div className="space-y-4">
+      <form onSubmit={applyFilter} className="flex flex-wrap gap-2 items-center">
+        <select
+          className="border border-gray-300 rounded px-2 py-1 text-sm"
+          value={draft.filterColumn}
+          onChange={(e) => setDraft({ ...draft, filterColumn: e.target.value })}
+        >
+          <option value="">Filter column…</option>
+          {columns.map((col) => <option key={col} value={col}>{col}</option>)}
+        </select>
+        <select
+          className="border border-gray-300 rounded px-2 py-1 text-sm"
+          value={draft.filterOp}
+          onChange={(e) => setDraft({ ...draft, filterOp: e.target.value })}
+        >
+          {FILTER_OPS.map(([op, label]) => <option key={op} value={op}>{label}</option>)}
+        </select>
+        {needsValue && (
+          <input
+            className="border border-gray-300 rounded px-2 py-1 text-sm"
+            placeholder="Value"
+            value={draft.filterValue}
+            onChange={(e) => setDraft({ ...draft, filterValue: e.target.value })}
+          />
+        )}
+        <Button size="sm" type="submit" disabled={!draft.filterColumn}>Apply</Button>
+        {query.filterColumn && <Button size="sm" variant="secondary" type="button" onClick={clearFilter}>Clear</Button>}
+      </form>
+
+      {error && <p className="text-sm text-red-600">{error}</p>}
+
+      <DataTable
+        data={page?.data}
+        columns={columns}
+        maxRows={PAGE_SIZE}
+        sort={query.sort}
+        descending={query.descending}
+        onSort={handleSort}
+      />
+
+      <div className="flex items-center justify-between text-sm text-gray-600">
+        <span>
+          {matched > 0 ? `Rows ${offset + 1}–${Math.min(offset + PAGE_SIZE, matched)} of ${matched.toLocaleString()}` : 'No matching rows'}
+          {page && matched !== page.total_rows && ` (filtered from ${page.total_rows.toLocaleString()})`}
+        </span>
+        <div className="flex gap-2">
+          <Button size="sm" variant="secondary" disabled={loading || offset === 0} onClick={() => setOffset(Math.max(0, offset - PAGE_SIZE))}>
+            ← Previous
+          </Button>
+          <Button size="sm" variant="secondary" disabled={loading || !page?.next_cursor} onClick={() => setOffset(offset + PAGE_SIZE)}>
+            Next →
+          </Button>
+        </div>
+      </div>
+    </div>
+  );
+}
@@ -1,6 +1,8 @@
 import React, { useState, useRef } from 'react';
 import { uploadDataset } from '../services/api';
 
+const SUPPORTED_EXTENSIONS = ['.csv', '.xlsx', '.xls', '.parquet', '.feather', '.arrow'];
+
 export default function UploadBox({ onUploadSuccess, isLoading }) {
   const [dragActive, setDragActive] = useState(false);
   const inputRef = useRef(null);
@@ -21,7 +23,8 @@ export default function UploadBox({ onUploadSuccess, isLoading }) {
     setDragActive(false);
 
     const file = e.dataTransfer.files[0];
-    if (file && ['text/csv', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'application/vnd.ms-excel'].includes(file.type)) {
+    // Parquet and Arrow files have no registered MIME type, so match on the extension
+    if (file && SUPPORTED_EXTENSIONS.some((ext) => file.name.toLowerCase().endsWith(ext))) {
       await handleFile(file);
     }
   };
@@ -60,11 +63,11 @@ export default function UploadBox({ onUploadSuccess, isLoading }) {
       </svg>
       <p className="text-lg font-semibold text-gray-700 mb-2">Upload your dataset</p>
       <p className="text-gray-500 mb-4">Drag & drop or <button type="button" onClick={() => inputRef.current?.click()} className="text-blue-600 hover:text-blue-700 font-semibold">browse</button> to select</p>
-      <p className="text-sm text-gray-400">CSV, XLSX, XLS • Max 50 MB</p>
+      <p className="text-sm text-gray-400">CSV, XLSX, XLS, Parquet, Arrow • Max 50 MB</p>
       <input
         ref={inputRef}
         type="file"
-        accept=".csv,.xlsx,.xls"
+        accept={SUPPORTED_EXTENSIONS.join(',')}
         onChange={handleChange}
         className="hidden"
         disabled={isLoading}
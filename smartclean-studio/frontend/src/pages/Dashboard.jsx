@@ -4,6 +4,7 @@ import UploadBox from '../components/UploadBox';
 import QualityScore from '../components/QualityScore';
 import IssueCard from '../components/IssueCard';
 import DataTable from '../components/DataTable';
+import PreviewBrowser from '../components/PreviewBrowser';
 import Button from '../components/Button';
 import { configureCleaning, applyCleaning, getReport, downloadData } from '../services/api';
 
@@ -93,7 +94,7 @@ export default function Dashboard() {
           <div className="max-w-2xl mx-auto">
             <div className="text-center mb-8">
               <h2 className="text-3xl font-bold text-gray-900 mb-4">Upload Your Dataset</h2>
-              <p className="text-gray-600">Upload a CSV or Excel file to get started with data cleaning</p>
+              <p className="text-gray-600">Upload a CSV, Excel, Parquet or Arrow file to get started with data cleaning</p>
             </div>
             <UploadBox onUploadSuccess={handleUploadSuccess} isLoading={isLoading} />
           </div>
@@ -311,7 +312,7 @@ export default function Dashboard() {
                       </div>
                     )}
                     {previewTab === 'preview' && (
-                      <DataTable data={cleaningResult.cleaned_data} columns={analysisData?.dataset_info.column_names} />
+                      <PreviewBrowser sessionId={sessionId} />
                     )}
                   </div>
                 </div>
@@ -326,6 +327,9 @@ export default function Dashboard() {
                     <Button variant="success" onClick={() => handleDownload('excel')}>
                       ↓ Download Excel
                     </Button>
+                    <Button variant="secondary" onClick={() => handleDownload('parquet')}>
+                      ↓ Download Parquet
+                    </Button>
                   </div>
                 </div>
 
@@ -7,13 +7,32 @@ const api = axios.create({
   timeout: 30000
 });
 
-export const uploadDataset = async (file) => {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Poll a background job until it finishes; resolves with its result
+export const waitForJob = async (jobId, onProgress) => {
+  for (;;) {
+    const { data: job } = await api.get(`/jobs/${jobId}`);
+    if (onProgress) onProgress(job);
+    if (job.status === 'completed') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+    if (job.status === 'cancelled') throw new Error('Job was cancelled');
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
+export const cancelJob = async (jobId) => {
+  const response = await api.delete(`/jobs/${jobId}`);
+  return response.data;
+};
+
+export const uploadDataset = async (file, onProgress) => {
   const formData = new FormData();
   formData.append('file', file);
-  const response = await api.post('/upload', formData, {
+  const response = await api.post('/upload?background=true', formData, {
     headers: { 'Content-Type': 'multipart/form-data' }
   });
-  return response.data;
+  return waitForJob(response.data.job_id, onProgress);
 };
 
 export const configureCleaning = async (sessionId, autoClean, operations = []) => {
@@ -25,9 +44,9 @@ export const configureCleaning = async (sessionId, autoClean, operations = []) =
   return response.data;
 };
 
-export const applyCleaning = async (sessionId) => {
-  const response = await api.post(`/clean?session_id=${sessionId}`);
-  return response.data;
+export const applyCleaning = async (sessionId, onProgress) => {
+  const response = await api.post(`/clean?session_id=${sessionId}&background=true`);
+  return waitForJob(response.data.job_id, onProgress);
 };
 
 export const getReport = async (sessionId) => {
@@ -35,11 +54,23 @@ export const getReport = async (sessionId) => {
   return response.data;
 };
 
-export const getDataPreview = async (sessionId, limit = 100) => {
-  const response = await api.get(`/preview/${sessionId}?limit=${limit}`);
+// Page through cleaned data; pass `cursor` from a previous page to continue the same query
+export const getDataPreview = async (sessionId, { limit = 100, offset = 0, cursor, sort, descending, filterColumn, filterOp, filterValue } = {}) => {
+  const params = cursor ? { limit, cursor } : {
+    limit,
+    offset,
+    sort,
+    descending,
+    filter_column: filterColumn,
+    filter_op: filterOp,
+    filter_value: filterValue
+  };
+  const response = await api.get(`/preview/${sessionId}`, { params });
   return response.data;
 };
 
+const DOWNLOAD_EXTENSIONS = { csv: 'csv', excel: 'xlsx', parquet: 'parquet', arrow: 'arrow' };
+
 export const downloadData = async (sessionId, format) => {
   try {
     const response = await api.post(`/download/${sessionId}/${format}`, {}, {
@@ -53,7 +84,7 @@ export const downloadData = async (sessionId, format) => {
     const url = URL.createObjectURL(response.data);
     const link = document.createElement('a');
     link.href = url;
-    link.download = format === 'csv' ? 'cleaned_data.csv' : 'cleaned_data.xlsx';
+    link.download = `cleaned_data.${DOWNLOAD_EXTENSIONS[format] || format}`;
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);